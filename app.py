@@ -1,9 +1,11 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, make_response
+from flask import Flask, render_template, stream_template, request, redirect, url_for, flash, jsonify, session, make_response, send_file, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from datetime import datetime
 import os
+import time
 from functools import wraps
+from urllib.parse import quote
 from config import Config
 
 app = Flask(__name__)
@@ -73,6 +75,16 @@ except Exception:
     # Non-fatal: proceed and let SQLAlchemy raise if anything else is wrong
     pass
 
+# Connection pool sizing; in-memory SQLite uses a per-thread pool without these knobs
+if ':memory:' not in (app.config.get('SQLALCHEMY_DATABASE_URI') or ''):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_recycle': app.config['DB_POOL_RECYCLE'],
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
 # Import db from models
 from models import db
 db.init_app(app)
@@ -80,35 +92,118 @@ migrate = Migrate(app, db)
 
 # Import models after db is initialized
 from models import Asset, Role, User, AssetType, AuditLog, MaintenanceRecord
+# ORM selects skip soft-deleted rows unless run with include_deleted=True
+from utils import soft_delete
+soft_delete.init_app(app)
+
+# Per-request query counting / N+1 detection (Server-Timing header + log line)
+from utils import sql_stats
+sql_stats.init_app(app)
+from utils import cache
+from utils.cache import get_cache
+cache.init_app(app)
+from utils.conditional import conditional
+from utils.queries import (TRASH_MODULES, KeysetPage, asset_facet_counts, asset_list_query, audit_log_query,
+                           due_within_query, maintenance_list_query, maintenance_window, month_range,
+                           overdue_query, schedule_missing_maintenance, trash_counts, year_range)
+
+# Prometheus metrics (latency histograms, in-flight requests, DB pool, exports)
+from utils import metrics
+metrics.init_app(app)
+
+# Slow-query log with asynchronous EXPLAIN capture (SLOW_QUERY_MS in .env)
+from utils import background, slow_queries
+background.init_app(app)
+slow_queries.init_app(app)
+
+# Admin-only cProfile report for any route via ?_profile=1
+from utils import profiler
+profiler.init_app(app)
+# Dashboard counters maintained on flush, reconciled by `flask reconcile-stats`
+from utils import counters
+counters.init_app(app)
+# {% cache %} template fragments keyed on role and data version stamps
+from utils import fragments
+fragments.init_app(app)
+# Jinja bytecode cache in instance/ and `flask precompile-templates`
+from utils import jinja_cache
+jinja_cache.init_app(app)
+# Hashed static files and vendored libraries from build_static.py (manifest)
+from utils import static_build
+static_build.init_app(app)
+# Cross-worker concurrency classes for expensive endpoints (exports, reports, lists)
+from utils import limiter
+from utils.limiter import limited
+limiter.init_app(app)
+# Concurrent identical computations (dashboard aggregates, auto-scheduling) run once
+from utils import singleflight
+singleflight.init_app(app)
+# Set-based restore / permanent delete of many trashed rows in one transaction,
+# and `flask purge-trash` for trash older than TRASH_RETENTION_DAYS
+from utils import trash as trash_ops
+trash_ops.init_app(app)
+# CSV/XLSX asset import (upload page and `flask import-assets`), batched inserts
+from utils import importer
+importer.init_app(app)
 
 # Lightweight health endpoint (no auth) to verify server and routing are up
 @app.route('/healthz', methods=['GET'])
 def healthz():
     return jsonify({'status': 'ok'}), 200
 
+# Prometheus text exposition. Nothing is computed here beyond reading the
+# counters already kept in memory (or the multiprocess files under gunicorn).
+# Optional METRICS_TOKEN in .env restricts scraping (?token=... or Bearer).
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    token_cfg = app.config.get('METRICS_TOKEN') or ''
+    if token_cfg:
+        auth = request.headers.get('Authorization', '')
+        token_req = auth[7:] if auth.startswith('Bearer ') else request.args.get('token', '')
+        if token_req != token_cfg:
+            return 'Unauthorized\n', 401
+    return metrics.render_metrics()
+
 # Quick diagnostics (no secrets), helps verify DB connectivity and basic models
 @app.route('/dev/diag')
 def dev_diag():
     try:
         role_count = Role.query.count()
-        user_count = User.query.count()
-        asset_type_count = AssetType.query.count()
-        asset_count = Asset.query.count()
-        maint_count = MaintenanceRecord.query.count()
+        # Counter table: excludes soft-deleted rows, no table scans
+        snapshot = counters.snapshot()
         return jsonify({
             'ok': True,
             'db_uri': ('sqlite' if app.config.get('SQLALCHEMY_DATABASE_URI','').startswith('sqlite') else 'non-sqlite'),
             'counts': {
                 'roles': role_count,
-                'users': user_count,
-                'asset_types': asset_type_count,
-                'assets': asset_count,
-                'maintenance': maint_count
-            }
+                'users': int(snapshot.get('users', 0)),
+                'asset_types': int(snapshot.get('asset_types', 0)),
+                'assets': int(snapshot.get('assets', 0)),
+                'maintenance': int(snapshot.get('maintenance', 0))
+            },
+            'counters': snapshot,
+            # Rolling per-endpoint SQL aggregates for this worker process
+            'pid': os.getpid(),
+            'sql_by_endpoint': sql_stats.endpoint_summary(),
+            # Hits (shared tier included), misses, evictions, tag invalidations per cache
+            'caches': cache.all_stats()
         }), 200
     except Exception as e:
         return jsonify({'ok': False, 'error': str(e)}), 500
 
+@app.route('/dev/slow-queries')
+def dev_slow_queries():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    if session.get('role') != 'admin':
+        flash('Chỉ admin mới được phép thực hiện.', 'error')
+        return redirect(url_for('index'))
+    threshold = app.config.get('SLOW_QUERY_MS', 0) or 0
+    return render_template('dev/slow_queries.html',
+                           enabled=threshold > 0,
+                           threshold_ms=threshold,
+                           offenders=slow_queries.top_offenders())
+
 # First-run bootstrap: create roles and an admin account without requiring login.
 # Protected by optional INIT_TOKEN; if INIT_TOKEN is set in .env, the same token
 # must be provided via querystring (?token=...). Safe to run multiple times (idempotent).
@@ -133,7 +228,8 @@ def dev_bootstrap():
     admin_username = app.config.get('ADMIN_USERNAME', 'admin')
     admin_email = app.config.get('ADMIN_EMAIL', 'admin@example.com')
     admin_password = app.config.get('ADMIN_PASSWORD', 'admin123')
-    if User.query.filter_by(username=admin_username).first() is None:
+    # A trashed admin still holds the UNIQUE username: restore it rather than recreate
+    if User.query.execution_options(include_deleted=True).filter_by(username=admin_username).first() is None:
         admin_role = Role.query.filter_by(name='admin').first()
         if not admin_role:
             admin_role = Role(name='admin', description='Quản trị')
@@ -205,6 +301,28 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def render_streamed(template_name, **context):
+    """stream_template for long lists: the header is sent before the rows are
+    queried, and rows (iterated from yield_per queries) leave in ~STREAM_CHUNK_BYTES
+    chunks instead of accumulating the whole page in memory."""
+    limit = app.config['STREAM_CHUNK_BYTES']
+
+    def chunks(parts):
+        buffer, size = [], 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= limit:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+
+    response = app.response_class(chunks(stream_template(template_name, **context)), mimetype='text/html')
+    # Let nginx pass chunks through instead of buffering the whole response
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # Login routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -265,139 +383,132 @@ def logout():
     flash('Bạn đã đăng xuất thành công!', 'info')
     return redirect(url_for('login'))
 
+def trash_load_options(module):
+    """Eager loads for the columns each trash table shows"""
+    return {
+        'assets': (db.joinedload(Asset.asset_type), db.lazyload(Asset.assigned_users)),
+        'asset_types': (),
+        'users': (db.joinedload(User.role), db.lazyload(User.assigned_assets)),
+        'maintenance': (db.joinedload(MaintenanceRecord.asset).lazyload(Asset.assigned_users),),
+    }[module]
+
 @app.route('/trash')
 @login_required
+@conditional('asset', 'asset_type', 'user', 'maintenance_record', 'role')
+@limited('list')
 def trash():
     """Thùng rác - hiển thị các bản ghi đã xóa mềm"""
     module = request.args.get('module', 'all')
-    assets = Asset.query.filter(Asset.deleted_at.isnot(None)).all()
-    asset_types = AssetType.query.filter(AssetType.deleted_at.isnot(None)).all()
-    users = User.query.filter(User.deleted_at.isnot(None)).all()
-    maintenance_records = MaintenanceRecord.query.filter(MaintenanceRecord.deleted_at.isnot(None)).all()
-    return render_template(
+    if module not in TRASH_MODULES:
+        module = 'all'
+    # One UNION ALL for every module badge; rows only for the selected module
+    counts = trash_counts()
+    page = None
+    if module != 'all':
+        page = KeysetPage(TRASH_MODULES[module], after=request.args.get('after'),
+                          per_page=app.config['TRASH_PAGE_SIZE'], options=trash_load_options(module))
+    return render_streamed(
         'trash/list.html',
         module=module,
-        assets=assets,
-        asset_types=asset_types,
-        users=users,
-        maintenance_records=maintenance_records
+        counts=counts,
+        page=page,
+        start=request.args.get('start', 0, type=int) if page and page.after else 0,
     )
 
+# Per-row forms post the singular names, the bulk toolbar the trash module keys
+TRASH_MODULE_ALIASES = {'asset': 'assets', 'asset_type': 'asset_types', 'user': 'users'}
+
+def _trash_selection():
+    """(module, ids) of a trash action; ids None = every trashed row of the module."""
+    module = request.form.get('module') or request.args.get('module')
+    module = TRASH_MODULE_ALIASES.get(module, module)
+    if module not in TRASH_MODULES:
+        return None, []
+    if request.form.get('all') == '1':
+        return module, None
+    values = request.form.getlist('ids') or [request.form.get('id') or request.args.get('id')]
+    try:
+        return module, [int(v) for v in values]
+    except (TypeError, ValueError):
+        return module, []
+
 @app.route('/trash/restore', methods=['POST'])
 @login_required
 def trash_restore():
-    """Khôi phục bản ghi đã xóa mềm"""
-    module = request.form.get('module') or request.args.get('module')
-    id_str = request.form.get('id') or request.args.get('id')
-    try:
-        entity_id = int(id_str)
-    except Exception:
-        flash('Yêu cầu không hợp lệ.', 'error')
-        return redirect(url_for('trash', module=module or 'all'))
-    model_map = {
-        'asset': Asset,
-        'asset_type': AssetType,
-        'user': User,
-        'maintenance': MaintenanceRecord
-    }
-    model = model_map.get(module)
-    if not model:
+    """Khôi phục bản ghi đã xóa mềm (một, nhiều hoặc tất cả)"""
+    module, ids = _trash_selection()
+    if module is None:
         flash('Phân hệ không hợp lệ.', 'error')
         return redirect(url_for('trash', module='all'))
-    obj = model.query.get(entity_id)
-    if not obj:
+    if ids == []:
+        flash('Yêu cầu không hợp lệ.', 'error')
+        return redirect(url_for('trash', module=module))
+    restored = trash_ops.restore(module, ids)
+    if not restored:
+        db.session.rollback()
         flash('Không tìm thấy bản ghi.', 'error')
         return redirect(url_for('trash', module=module))
-    if hasattr(obj, 'restore'):
-        obj.restore()
-        db.session.commit()
-        flash('Khôi phục thành công.', 'success')
-    else:
-        flash('Bản ghi không hỗ trợ khôi phục.', 'error')
+    trash_ops.audit(session.get('user_id'), 'restore', module, restored)
+    db.session.commit()
+    flash(f'Đã khôi phục {restored} bản ghi.', 'success')
     return redirect(url_for('trash', module=module))
 
 @app.route('/trash/permanent-delete', methods=['POST'])
 @login_required
 def trash_permanent_delete():
-    """Xóa vĩnh viễn bản ghi"""
-    module = request.form.get('module') or request.args.get('module')
-    id_str = request.form.get('id') or request.args.get('id')
-    try:
-        entity_id = int(id_str)
-    except Exception:
-        flash('Yêu cầu không hợp lệ.', 'error')
-        return redirect(url_for('trash', module=module or 'all'))
-    model_map = {
-        'asset': Asset,
-        'asset_type': AssetType,
-        'user': User,
-        'maintenance': MaintenanceRecord
-    }
-    model = model_map.get(module)
-    if not model:
+    """Xóa vĩnh viễn bản ghi (một, nhiều hoặc tất cả)"""
+    module, ids = _trash_selection()
+    if module is None:
         flash('Phân hệ không hợp lệ.', 'error')
         return redirect(url_for('trash', module='all'))
-    obj = model.query.get(entity_id)
-    if not obj:
+    if ids == []:
+        flash('Yêu cầu không hợp lệ.', 'error')
+        return redirect(url_for('trash', module=module))
+    result = trash_ops.purge(module, ids)
+    removed = result.get(TRASH_MODULES[module].__tablename__, 0)
+    if not removed and not result.get('skipped'):
+        db.session.rollback()
         flash('Không tìm thấy bản ghi.', 'error')
         return redirect(url_for('trash', module=module))
-    db.session.delete(obj)
+    trash_ops.audit(session.get('user_id'), 'purge', module, result)
     db.session.commit()
-    flash('Đã xóa vĩnh viễn.', 'success')
+    if removed:
+        flash(f'Đã xóa vĩnh viễn {removed} bản ghi.', 'success')
+    if result.get('skipped'):
+        flash(f"Giữ lại {result['skipped']} loại tài sản vẫn còn tài sản thuộc loại này.", 'warning')
     return redirect(url_for('trash', module=module))
 
 @app.route('/')
+@limited('report')
 def index():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    assets = Asset.query.all()
-    asset_types = AssetType.query.all()
-    users = User.query.all()
-    
+    snapshot = counters.request_snapshot()
     stats = {
-        'total_assets': len(assets),
-        'total_asset_types': len(asset_types),
-        'total_users': len(users),
-        'active_assets': len([a for a in assets if a.status == 'active'])
+        'total_assets': int(snapshot.get('assets', 0)),
+        'total_asset_types': int(snapshot.get('asset_types', 0)),
+        'total_users': int(snapshot.get('users', 0)),
+        'active_assets': int(snapshot.get('assets.status:active', 0))
     }
     
     # Auto schedule yearly maintenance and show due soon list
     from datetime import timedelta
     today = datetime.utcnow().date()
 
-    # Ensure each asset has a next scheduled maintenance (yearly)
-    for a in assets:
-        last = MaintenanceRecord.query.filter_by(asset_id=a.id).order_by(MaintenanceRecord.next_due_date.desc()).first()
-        next_due = None
-        if last and last.next_due_date:
-            next_due = last.next_due_date
-        # if no future schedule, create one a year from today or from last due date passed
-        need_create = False
-        if not next_due:
-            need_create = True
-        elif next_due < today:
-            need_create = True
-        if need_create:
-            try:
-                rec = MaintenanceRecord(
-                    asset_id=a.id,
-                    maintenance_date=today,
-                    type='maintenance',
-                    description='Lịch bảo trì định kỳ (tự động)',
-                    vendor=None,
-                    person_in_charge='System',
-                    cost=0,
-                    next_due_date=today + timedelta(days=365),
-                    status='scheduled'
-                )
-                db.session.add(rec)
-            except Exception:
-                db.session.rollback()
-    try:
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+    # Ensure each asset has a next scheduled maintenance (yearly). Everyone
+    # opening / at once shares one run, so the same rows are not inserted twice
+    def _schedule():
+        try:
+            created = schedule_missing_maintenance(today)
+            db.session.commit()
+            return created
+        except Exception:
+            db.session.rollback()
+            return 0
+
+    singleflight.do(('schedule_missing_maintenance', today, counters.request_version(['asset', 'maintenance_record'])),
+                    _schedule)
 
     # Due soon/overdue notifications and list (30 days window)
     due_window = today + timedelta(days=30)
@@ -413,32 +524,48 @@ def index():
     elif due_soon:
         flash(f'{due_soon} thiết bị sắp đến hạn bảo trì trong 30 ngày.', 'info')
 
-    return render_template('index.html', assets=assets, stats=stats, asset_types=asset_types, due_records=due_records, today=today)
+    recent_assets = Asset.query.filter(Asset.deleted_at.is_(None)) \
+        .options(db.joinedload(Asset.asset_type), db.joinedload(Asset.user), db.lazyload(Asset.assigned_users)) \
+        .order_by(Asset.id.desc()).limit(10).all()
+    return render_template('index.html', assets=recent_assets, stats=stats, due_records=due_records, today=today)
 
 @app.route('/assets')
 @login_required
+@conditional('asset', 'asset_type', 'user')
+@limited('list')
 def assets():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
     type_id = request.args.get('type_id', type=int)
     status = request.args.get('status', type=str)
+    condition = request.args.get('condition', type=str)
+    year = request.args.get('year', type=int)
+    filters = {'search': search, 'type_id': type_id, 'status': status, 'condition': condition, 'year': year}
 
-    query = Asset.query
-    if search:
-        query = query.filter(Asset.name.ilike(f'%{search}%'))
-    if type_id:
-        query = query.filter(Asset.asset_type_id == type_id)
-    if status:
-        query = query.filter(Asset.status == status)
-
-    assets = query.paginate(page=page, per_page=10, error_out=False)
+    assets = asset_list_query(**filters).paginate(page=page, per_page=10, error_out=False)
     asset_types = AssetType.query.all()
-    return render_template('assets/list.html', assets=assets, asset_types=asset_types, search=search, type_id=type_id, status=status)
+    # Facet counts per filter signature; the asset version stamp in the key
+    # retires entries as soon as any asset is written
+    facet_cache = get_cache('asset_facets', app.config['FACET_CACHE_SIZE'], app.config['FACET_CACHE_TTL'], shared=True)
+    facet_key = (counters.request_version(['asset']), search, type_id, status, condition, year)
+    facets = facet_cache.get_or_set(facet_key, lambda: asset_facet_counts(**filters), tags=('asset',))
+    return render_template('assets/list.html', assets=assets, asset_types=asset_types, facets=facets,
+                           type_names={t.id: t.name for t in asset_types}, filters=filters, **filters)
 
 @app.route('/assets/export/<string:fmt>')
 @login_required
+@limited('export')
 def export_assets(fmt: str):
     fmt = (fmt or '').lower()
+    started = time.perf_counter()
+    try:
+        return _export_assets(fmt)
+    finally:
+        # Keep label cardinality bounded: unknown formats share one series
+        label = fmt if fmt in ('csv', 'xlsx', 'excel', 'json', 'docx', 'pdf') else 'other'
+        metrics.observe_export(label, time.perf_counter() - started)
+
+def _export_assets(fmt: str):
     # Common, normalized dataset
     assets = Asset.query.filter(Asset.deleted_at.is_(None)).order_by(Asset.id.asc()).all()
     rows = []
@@ -471,38 +598,59 @@ def export_assets(fmt: str):
     }
     ordered_fields = list(headers_vi.keys())
 
+    def _export_path(filename: str) -> str:
+        export_dir = app.config.get('EXPORT_DIR', 'instance/exports')
+        # Normalize to absolute path relative to app.root_path if needed
+        if not os.path.isabs(export_dir):
+            export_dir = os.path.join(app.root_path, export_dir)
+        os.makedirs(export_dir, exist_ok=True)
+        ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+        base, ext = os.path.splitext(filename)
+        return os.path.join(export_dir, f"{base}_{ts}{ext}")
+
+    def _file_response(out_path: str, filename: str, content_type: str):
+        # Served by path, never held in the worker: nginx reads the file itself
+        # (X-Accel-Redirect to an internal location) or send_file streams it
+        # (os.sendfile under gunicorn); both answer Range requests
+        accel_prefix = app.config.get('EXPORT_ACCEL_REDIRECT')
+        if accel_prefix:
+            response = make_response('')
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(os.path.basename(out_path))
+            response.headers['Content-Type'] = content_type
+            response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+            return response
+        return send_file(out_path, mimetype=content_type, as_attachment=True,
+                         download_name=filename, conditional=True, max_age=0)
+
     def _save_and_response(data_bytes: bytes, filename: str, content_type: str):
-        # Persist a copy to EXPORT_DIR
+        # Persist to EXPORT_DIR and serve the file from there
         try:
-            export_dir = app.config.get('EXPORT_DIR', 'instance/exports')
-            # Normalize to absolute path relative to app.root_path if needed
-            if not os.path.isabs(export_dir):
-                export_dir = os.path.join(app.root_path, export_dir)
-            os.makedirs(export_dir, exist_ok=True)
-            ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            base, ext = os.path.splitext(filename)
-            server_filename = f"{base}_{ts}{ext}"
-            out_path = os.path.join(export_dir, server_filename)
-            with open(out_path, 'wb') as f:
+            out_path = _export_path(filename)
+            tmp_path = out_path + '.part'
+            with open(tmp_path, 'wb') as f:
                 f.write(data_bytes)
-        except Exception:
-            # Non-fatal: logging to console; still return download
+            os.replace(tmp_path, out_path)
+        except OSError:
+            # Non-fatal: logging to console; still return download from memory
             print('[Export] Failed to persist exported file to disk.')
-        response = make_response(data_bytes)
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        response.headers['Content-Type'] = content_type
-        return response
+            response = make_response(data_bytes)
+            response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+            response.headers['Content-Type'] = content_type
+            return response
+        return _file_response(out_path, filename, content_type)
 
     if fmt == 'csv':
         import csv
-        import io
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow([headers_vi[f] for f in ordered_fields])
-        for r in rows:
-            writer.writerow([r[f] for f in ordered_fields])
-        csv_data = output.getvalue().encode('utf-8-sig')
-        return _save_and_response(csv_data, 'tai_san.csv', 'text/csv; charset=utf-8')
+        # Rows go straight to the file; the CSV never exists as one byte string
+        out_path = _export_path('tai_san.csv')
+        tmp_path = out_path + '.part'
+        with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow([headers_vi[f] for f in ordered_fields])
+            for r in rows:
+                writer.writerow([r[f] for f in ordered_fields])
+        os.replace(tmp_path, out_path)
+        return _file_response(out_path, 'tai_san.csv', 'text/csv; charset=utf-8')
     elif fmt in ('xlsx', 'excel'):
         # Use pandas/openpyxl
         import pandas as pd  # type: ignore
@@ -540,6 +688,8 @@ def export_assets(fmt: str):
 # Maintenance module
 @app.route('/maintenance')
 @login_required
+@conditional('maintenance_record', 'asset', daily=True)
+@limited('list')
 def maintenance_list():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
@@ -548,30 +698,14 @@ def maintenance_list():
     year = request.args.get('year', type=int)
     overdue_flag = request.args.get('overdue', type=int)
     due30_flag = request.args.get('due_30', type=int)
+    status = request.args.get('status', '', type=str)
+    has_cost = request.args.get('has_cost', type=int)
 
-    query = MaintenanceRecord.query
-    if asset_id:
-        query = query.filter(MaintenanceRecord.asset_id == asset_id)
-    if search:
-        like = f'%{search}%'
-        query = query.filter((MaintenanceRecord.description.ilike(like)) | (MaintenanceRecord.vendor.ilike(like)) | (MaintenanceRecord.person_in_charge.ilike(like)))
-    if month:
-        query = query.filter(db.extract('month', MaintenanceRecord.maintenance_date) == month)
-    if year:
-        query = query.filter(db.extract('year', MaintenanceRecord.maintenance_date) == year)
-    # Additional filters for next due date
-    if overdue_flag:
-        today = datetime.utcnow().date()
-        query = query.filter(MaintenanceRecord.next_due_date != None, MaintenanceRecord.next_due_date < today)
-    if due30_flag:
-        from datetime import timedelta
-        today = datetime.utcnow().date()
-        query = query.filter(
-            MaintenanceRecord.next_due_date != None,
-            MaintenanceRecord.next_due_date.between(today, today + timedelta(days=30))
-        )
-
-    records = query.order_by(MaintenanceRecord.maintenance_date.desc()).paginate(page=page, per_page=10, error_out=False)
+    query = maintenance_list_query(
+        search=search, asset_id=asset_id, month=month, year=year,
+        overdue=bool(overdue_flag), due_30=bool(due30_flag), status=status, has_cost=bool(has_cost)
+    )
+    records = query.paginate(page=page, per_page=10, error_out=False)
     assets = Asset.query.all()
     return render_template(
         'maintenance/list.html',
@@ -582,7 +716,9 @@ def maintenance_list():
         month=month,
         year=year,
         overdue=overdue_flag,
-        due_30=due30_flag
+        due_30=due30_flag,
+        status=status,
+        has_cost=has_cost
     )
 
 @app.route('/maintenance/add', methods=['GET','POST'])
@@ -614,7 +750,7 @@ def maintenance_add():
         db.session.commit()
         flash('Đã ghi nhận bảo trì/sửa chữa.', 'success')
         return redirect(url_for('maintenance_list'))
-    assets = Asset.query.all()
+    assets = Asset.query.with_entities(Asset.id, Asset.name).order_by(Asset.id)
     return render_template('maintenance/add.html', assets=assets)
 
 @app.route('/maintenance/edit/<int:id>', methods=['GET','POST'])
@@ -649,44 +785,40 @@ def maintenance_view(id):
 @login_required
 def maintenance_delete(id):
     rec = MaintenanceRecord.query.get_or_404(id)
-    db.session.delete(rec)
+    rec.soft_delete()
     db.session.commit()
-    flash('Đã xóa bản ghi bảo trì.', 'success')
+    flash('Đã chuyển bản ghi bảo trì vào thùng rác.', 'success')
     return redirect(url_for('maintenance_list'))
 
 @app.route('/maintenance/report')
 @login_required
+@limited('report')
 def maintenance_report():
     # Simple aggregation by month/year
     year = request.args.get('year', type=int)
     if not year:
         year = datetime.utcnow().year
+    start, end = year_range(year)
     rows = db.session.query(
         db.extract('month', MaintenanceRecord.maintenance_date).label('month'),
         db.func.sum(MaintenanceRecord.cost).label('total')
-    ).filter(db.extract('year', MaintenanceRecord.maintenance_date) == year)
+    ).filter(MaintenanceRecord.maintenance_date >= start, MaintenanceRecord.maintenance_date < end)
     rows = rows.group_by('month').order_by('month').all()
     data = [{'month': int(r.month), 'total': float(r.total or 0)} for r in rows]
     total_year = sum(d['total'] for d in data)
     return render_template('maintenance/report.html', year=year, data=data, total_year=total_year)
 
-@app.route('/maintenance/dashboard')
-@login_required
-def maintenance_dashboard():
-    from datetime import timedelta, date
-    today = datetime.utcnow().date()
+def maintenance_kpis(today):
+    """Year/month figures and due counts shown on the maintenance dashboard."""
     year = today.year
     month = today.month
-    # KPIs (avoid db.extract for SQLite compatibility)
-    start_year = date(year, 1, 1)
-    end_year = date(year, 12, 31)
-    total_records_year = MaintenanceRecord.query \
-        .filter(MaintenanceRecord.maintenance_date >= start_year, MaintenanceRecord.maintenance_date <= end_year).count()
-    total_cost_year = db.session.query(db.func.sum(MaintenanceRecord.cost)) \
-        .filter(MaintenanceRecord.maintenance_date >= start_year, MaintenanceRecord.maintenance_date <= end_year).scalar() or 0
+    # KPIs (date ranges, not db.extract, so the maintenance_date index is used)
+    start_year, end_year = year_range(year)
+    total_records_year = maintenance_window(start_year, end_year).count()
+    total_cost_year = maintenance_window(start_year, end_year) \
+        .with_entities(db.func.sum(MaintenanceRecord.cost)).scalar() or 0
     # Detailed year stats
-    year_records = MaintenanceRecord.query \
-        .filter(MaintenanceRecord.maintenance_date >= start_year, MaintenanceRecord.maintenance_date <= end_year).all()
+    year_records = maintenance_window(start_year, end_year).all()
     completed_year = sum(1 for r in year_records if (r.status or '').lower() == 'completed')
     scheduled_year = sum(1 for r in year_records if (r.status or '').lower() == 'scheduled')
     in_progress_year = sum(1 for r in year_records if (r.status or '').lower() == 'in_progress')
@@ -698,15 +830,7 @@ def maintenance_dashboard():
     completion_rate = round((completed_year / total_records_year) * 100, 1) if total_records_year else 0
     avg_cost_per_record = round(total_cost_year / total_records_year) if total_records_year else 0
     # Month stats (current month)
-    start_month = date(year, month, 1)
-    # Compute end of month safely
-    if month == 12:
-        start_next_month = date(year + 1, 1, 1)
-    else:
-        start_next_month = date(year, month + 1, 1)
-    end_month = start_next_month - timedelta(days=1)
-    month_records = MaintenanceRecord.query \
-        .filter(MaintenanceRecord.maintenance_date >= start_month, MaintenanceRecord.maintenance_date <= end_month).all()
+    month_records = maintenance_window(*month_range(year, month)).all()
     total_records_month = len(month_records)
     total_cost_month = sum(float(r.cost or 0) for r in month_records)
     records_with_cost_month = sum(1 for r in month_records if (r.cost or 0) > 0)
@@ -716,50 +840,48 @@ def maintenance_dashboard():
     completed_month = sum(1 for r in month_records if (r.status or '').lower() == 'completed')
     in_progress_month = sum(1 for r in month_records if (r.status or '').lower() == 'in_progress')
     # Overdue lists and counts
-    overdue = MaintenanceRecord.query\
-        .filter(MaintenanceRecord.next_due_date != None, MaintenanceRecord.next_due_date < today).count()
-    overdue_records = MaintenanceRecord.query\
-        .filter(MaintenanceRecord.next_due_date != None, MaintenanceRecord.next_due_date < today)\
-        .order_by(MaintenanceRecord.next_due_date.asc()).limit(10).all()
-    due_30 = MaintenanceRecord.query\
-        .filter(MaintenanceRecord.next_due_date != None, MaintenanceRecord.next_due_date.between(today, today + timedelta(days=30))).count()
-
-    # Recent / upcoming
+    overdue = overdue_query(today).count()
+    due_30 = due_within_query(today).count()
+    return dict(year=year, month=month,
+                total_records_year=total_records_year, total_cost_year=total_cost_year,
+                completed_year=completed_year, scheduled_year=scheduled_year,
+                in_progress_year=in_progress_year, cancelled_year=cancelled_year,
+                records_with_cost_year=records_with_cost_year, max_cost_year=max_cost_year,
+                min_cost_year=min_cost_year, completion_rate=completion_rate,
+                avg_cost_per_record=avg_cost_per_record, total_records_month=total_records_month,
+                total_cost_month=total_cost_month, records_with_cost_month=records_with_cost_month,
+                max_cost_month=max_cost_month, min_cost_month=min_cost_month,
+                completed_month=completed_month, in_progress_month=in_progress_month,
+                overdue=overdue, due_30=due_30)
+
+@app.route('/maintenance/dashboard')
+@login_required
+@conditional('maintenance_record', 'asset', daily=True)
+@limited('report')
+def maintenance_dashboard():
+    today = datetime.utcnow().date()
+    # Aggregates are computed once per day and data version, however many
+    # users open the dashboard at the same moment
+    kpis = singleflight.do(('maintenance_dashboard', today, counters.request_version(['maintenance_record', 'asset'])),
+                           lambda: maintenance_kpis(today))
+    # Lists are passed as unexecuted queries: the template iterates them inside
+    # {% cache %} blocks, so they only hit the database when the fragment is stale
+    overdue_records = overdue_query(today) \
+        .options(db.joinedload(MaintenanceRecord.asset).lazyload(Asset.assigned_users)) \
+        .order_by(MaintenanceRecord.next_due_date.asc()).limit(10)
+
+    # Recent / upcoming (unbounded: streamed in yield_per batches)
     recent = MaintenanceRecord.query.order_by(MaintenanceRecord.maintenance_date.desc()).limit(8).all()
-    upcoming = MaintenanceRecord.query \
-        .filter(
-            MaintenanceRecord.next_due_date != None,
-            MaintenanceRecord.next_due_date.between(today, today + timedelta(days=30))
-        ) \
-        .order_by(MaintenanceRecord.next_due_date.asc()).all()
-
-    return render_template('maintenance/dashboard.html',
+    upcoming = due_within_query(today) \
+        .options(db.joinedload(MaintenanceRecord.asset).lazyload(Asset.assigned_users)) \
+        .order_by(MaintenanceRecord.next_due_date.asc()).yield_per(500)
+
+    return render_streamed('maintenance/dashboard.html',
                            today=today,
-                           year=year,
-                           month=month,
-                           total_records_year=total_records_year,
-                           total_cost_year=total_cost_year,
-                           completed_year=completed_year,
-                           scheduled_year=scheduled_year,
-                           in_progress_year=in_progress_year,
-                           cancelled_year=cancelled_year,
-                           records_with_cost_year=records_with_cost_year,
-                           max_cost_year=max_cost_year,
-                           min_cost_year=min_cost_year,
-                           completion_rate=completion_rate,
-                           avg_cost_per_record=avg_cost_per_record,
-                           total_records_month=total_records_month,
-                           total_cost_month=total_cost_month,
-                           records_with_cost_month=records_with_cost_month,
-                           max_cost_month=max_cost_month,
-                           min_cost_month=min_cost_month,
-                           completed_month=completed_month,
-                           in_progress_month=in_progress_month,
-                           overdue=overdue,
-                           due_30=due_30,
                            overdue_records=overdue_records,
                            recent=recent,
-                           upcoming=upcoming)
+                           upcoming=upcoming,
+                           **kpis)
 
 @app.route('/assets/add', methods=['GET', 'POST'])
 @login_required
@@ -844,10 +966,42 @@ def add_asset():
         flash('Tài sản đã được thêm thành công!', 'success')
         return redirect(url_for('assets'))
     
-    asset_types = AssetType.query.all()
-    users = User.query.all()
+    # Unexecuted: the option lists are {% cache %} fragments keyed on table versions
+    asset_types = AssetType.query.with_entities(AssetType.id, AssetType.name).order_by(AssetType.id)
+    users = User.query.with_entities(User.id, User.username, User.email).order_by(User.id)
     return render_template('assets/add.html', asset_types=asset_types, users=users)
 
+@app.route('/assets/import', methods=['GET', 'POST'])
+@login_required
+def import_assets():
+    """Nhập tài sản hàng loạt từ tệp CSV/XLSX"""
+    if request.method == 'GET':
+        return render_template('assets/import.html', result=None)
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Vui lòng chọn tệp CSV hoặc Excel (.xlsx).', 'error')
+        return redirect(url_for('import_assets'))
+    try:
+        result = importer.import_assets(upload.stream, upload.filename, user_id=session.get('user_id'))
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return redirect(url_for('import_assets'))
+    if result['imported']:
+        flash(f"Đã nhập {result['imported']} tài sản.", 'success')
+    if result['errors']:
+        flash(f"{result['errors']} dòng bị bỏ qua, xem báo cáo lỗi.", 'warning')
+    return render_template('assets/import.html', result=result)
+
+@app.route('/assets/import/errors/<path:name>')
+@login_required
+def import_error_report(name):
+    path = importer.report_path(name)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/csv; charset=utf-8', as_attachment=True, download_name=name, max_age=0)
+
 @app.route('/assets/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit_asset(id):
@@ -928,7 +1082,7 @@ def edit_asset(id):
 @login_required
 def delete_asset(id):
     asset = Asset.query.get_or_404(id)
-    db.session.delete(asset)
+    asset.soft_delete()
     db.session.commit()
     try:
         uid = session.get('user_id')
@@ -937,11 +1091,13 @@ def delete_asset(id):
             db.session.commit()
     except Exception:
         db.session.rollback()
-    flash('Tài sản đã được xóa thành công!', 'success')
+    flash('Tài sản đã được chuyển vào thùng rác!', 'success')
     return redirect(url_for('assets'))
 
 @app.route('/asset-types')
 @login_required
+@conditional('asset_type', 'asset')
+@limited('list')
 def asset_types():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
@@ -1038,7 +1194,7 @@ def delete_asset_type(id):
         if asset_type.assets:
             return jsonify({'success': False, 'message': 'Không thể xóa loại tài sản đang được sử dụng!'})
         
-        db.session.delete(asset_type)
+        asset_type.soft_delete()
         db.session.commit()
         try:
             uid = session.get('user_id')
@@ -1048,13 +1204,34 @@ def delete_asset_type(id):
         except Exception:
             db.session.rollback()
         
-        return jsonify({'success': True, 'message': 'Loại tài sản đã được xóa thành công!'})
+        return jsonify({'success': True, 'message': 'Loại tài sản đã được chuyển vào thùng rác!'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Lỗi: {str(e)}'})
 
+def _taken_user_message(username, email, exclude_id=None):
+    """Message for a username/email already held by another user, None if both are free.
+
+    username and email stay UNIQUE for trashed users, so those are checked too
+    (include_deleted) and the admin is told to restore or purge the holder first.
+    """
+    for column, value, label in ((User.username, username, 'Tên đăng nhập'), (User.email, email, 'Email')):
+        query = User.query.execution_options(include_deleted=True).filter(column == value)
+        if exclude_id is not None:
+            query = query.filter(User.id != exclude_id)
+        holder = query.first()
+        if holder is None:
+            continue
+        if holder.deleted_at is not None:
+            return (f'{label} "{value}" thuộc người dùng "{holder.username}" đang nằm trong thùng rác. '
+                    'Hãy khôi phục hoặc xóa vĩnh viễn người dùng đó trước.')
+        return f'{label} đã tồn tại.'
+    return None
+
 @app.route('/users')
 @login_required
+@conditional('user', 'role')
+@limited('list')
 def users():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
@@ -1085,12 +1262,9 @@ def edit_user(id):
         password = request.form.get('password')
         is_active = True if request.form.get('is_active') == 'on' else False
 
-        if User.query.filter(User.username == username, User.id != id).first():
-            flash('Tên đăng nhập đã tồn tại!', 'error')
-            roles = Role.query.all()
-            return render_template('users/edit.html', user=user, roles=roles)
-        if User.query.filter(User.email == email, User.id != id).first():
-            flash('Email đã tồn tại!', 'error')
+        taken = _taken_user_message(username, email, exclude_id=id)
+        if taken:
+            flash(taken, 'error')
             roles = Role.query.all()
             return render_template('users/edit.html', user=user, roles=roles)
 
@@ -1132,7 +1306,7 @@ def delete_user(id):
         if user.assets:
             flash('Không thể xóa người dùng đang sở hữu tài sản!', 'error')
             return redirect(url_for('users'))
-        db.session.delete(user)
+        user.soft_delete()
         db.session.commit()
         try:
             uid = session.get('user_id')
@@ -1141,7 +1315,7 @@ def delete_user(id):
                 db.session.commit()
         except Exception:
             db.session.rollback()
-        flash('Đã xóa người dùng!', 'success')
+        flash('Đã chuyển người dùng vào thùng rác!', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Lỗi: {str(e)}', 'error')
@@ -1149,6 +1323,8 @@ def delete_user(id):
 
 @app.route('/audit-logs')
 @login_required
+@conditional('audit_log', 'user')
+@limited('list')
 def audit_logs():
     page = request.args.get('page', 1, type=int)
     search_user = request.args.get('user_id', type=int)
@@ -1156,21 +1332,13 @@ def audit_logs():
     date_from = request.args.get('date_from', '', type=str)
     date_to = request.args.get('date_to', '', type=str)
 
-    query = AuditLog.query.order_by(AuditLog.created_at.desc())
-    if search_user:
-        query = query.filter(AuditLog.user_id == search_user)
-    if module:
-        query = query.filter(AuditLog.module == module)
-    try:
-        if date_from:
-            start = datetime.strptime(date_from, '%Y-%m-%d')
-            query = query.filter(AuditLog.created_at >= start)
-        if date_to:
-            end = datetime.strptime(date_to + ' 23:59:59', '%Y-%m-%d %H:%M:%S')
-            query = query.filter(AuditLog.created_at <= end)
-    except Exception:
-        pass
+    def _parse_day(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            return None
 
+    query = audit_log_query(search_user, module, _parse_day(date_from), _parse_day(date_to))
     logs = query.paginate(page=page, per_page=10, error_out=False)
     users = User.query.all()
     modules = ['assets', 'asset_types', 'users']
@@ -1203,11 +1371,9 @@ def add_user():
         if not re.match(email_regex, email):
             flash('Email không hợp lệ.', 'error')
             return redirect(url_for('add_user'))
-        if User.query.filter_by(username=username).first():
-            flash('Tên đăng nhập đã tồn tại.', 'error')
-            return redirect(url_for('add_user'))
-        if User.query.filter_by(email=email).first():
-            flash('Email đã tồn tại.', 'error')
+        taken = _taken_user_message(username, email)
+        if taken:
+            flash(taken, 'error')
             return redirect(url_for('add_user'))
         
         user = User(
@@ -1262,7 +1428,7 @@ def seed_sample():
             if current_users >= 25:
                 break
             username = f"{prefix}{idx}"
-            if not User.query.filter_by(username=username).first():
+            if not User.query.execution_options(include_deleted=True).filter_by(username=username).first():
                 u = User(username=username, email=email_tpl.format(idx), role_id=role_id, is_active=True)
                 u.set_password(pwd + '123')
                 db.session.add(u)
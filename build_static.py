@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Đóng gói file tĩnh: tải thư viện CDN về static/vendor, minify + gắn hash nội dung
+cho static/css/custom.css và static/js/custom.js (static/dist), tạo .gz/.br và manifest.
+Run: python build_static.py [--no-vendor]
+"""
+
+import argparse
+import os
+import sys
+import io
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+from utils.static_build import build
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build static: vendor, minify, hash, nén sẵn')
+    parser.add_argument('--static-dir', default=STATIC_DIR, help='Thư mục static (mặc định ./static)')
+    parser.add_argument('--no-vendor', action='store_true',
+                        help='Không tải lại thư viện (giữ bản đã tải ở lần build trước, nếu có)')
+    args = parser.parse_args(argv)
+
+    manifest = build(args.static_dir, vendor=not args.no_vendor)
+    print(f"Manifest: {len(manifest)} mục -> {os.path.join(args.static_dir, 'dist', 'manifest.json')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,22 @@
 import os
+from typing import Dict
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env file (does not override existing env)
 load_dotenv()
 
+
+def parse_counts(value: str) -> Dict[str, int]:
+    """'export=2,report=4,list=16' -> {'export': 2, 'report': 4, 'list': 16}; empty -> {}."""
+    counts = {}
+    for item in (value or '').split(','):
+        name, _, size = item.partition('=')
+        if name.strip() and size.strip():
+            counts[name.strip()] = int(size)
+    return counts
+
+
 class Config:
     # Provide sensible local defaults so the app can boot for development
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key')
@@ -11,8 +24,83 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ('1', 'true', 'yes')
     EXPORT_DIR = os.getenv('EXPORT_DIR', 'instance/exports')
+    # Internal nginx location mapped onto EXPORT_DIR; when set, export downloads
+    # are handed to nginx with X-Accel-Redirect instead of being sent by Flask
+    EXPORT_ACCEL_REDIRECT = os.getenv('EXPORT_ACCEL_REDIRECT', '')
     # Optional bootstrap config for first-run initialization
     INIT_TOKEN = os.getenv('INIT_TOKEN', '')
     ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'admin123')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@example.com')
+    # Production WSGI server (gunicorn) settings, read by gunicorn.conf.py
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '0'))  # 0 = auto (2 * CPU + 1)
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '60'))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+    WEB_KEEPALIVE = int(os.getenv('WEB_KEEPALIVE', '5'))
+    WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', '1000'))
+    WEB_MAX_REQUESTS_JITTER = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '100'))
+    # SQLAlchemy connection pool per worker process (size it against WEB_THREADS)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    # Per-request SQL instrumentation (utils/sql_stats.py)
+    SQL_STATS_ENABLED = os.getenv('SQL_STATS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '10'))
+    SQL_STATS_WINDOW = int(os.getenv('SQL_STATS_WINDOW', '100'))
+    # Prometheus /metrics endpoint (utils/metrics.py); empty token = no auth
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+    # Slow-query log with EXPLAIN capture (utils/slow_queries.py); 0 = off
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '0'))
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'instance/logs/slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', '3'))
+    SLOW_QUERY_EXPLAIN_TTL = int(os.getenv('SLOW_QUERY_EXPLAIN_TTL', '600'))
+    # Threads per process for work kept off the request path (slow-query EXPLAIN)
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '2'))
+    # On-demand request profiler for admins (?_profile=1)
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'instance/profiles')
+    # Asset list facet counts, cached per filter signature in each worker (utils/cache.py)
+    FACET_CACHE_SIZE = int(os.getenv('FACET_CACHE_SIZE', '256'))
+    FACET_CACHE_TTL = int(os.getenv('FACET_CACHE_TTL', '300'))
+    # Cache backend (utils/cache.py): optional shared tier on a Redis-protocol server;
+    # without it, tag versions are shared by the workers through files in CACHE_TAG_DIR
+    # (empty = per process). Workers re-read tag versions every CACHE_TAG_POLL_INTERVAL s
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+    CACHE_TAG_DIR = os.getenv('CACHE_TAG_DIR')
+    CACHE_TAG_POLL_INTERVAL = float(os.getenv('CACHE_TAG_POLL_INTERVAL', '1.0'))
+    # Rendered {% cache %} template fragments per worker; 0 disables (utils/fragments.py)
+    FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', '512'))
+    FRAGMENT_CACHE_TTL = int(os.getenv('FRAGMENT_CACHE_TTL', '600'))
+    # Concurrency classes shared by all workers: class=slots (empty disables).
+    # Over the limit, requests wait CONCURRENCY_QUEUE_TIMEOUT seconds for a slot,
+    # then get 503 with Retry-After; /healthz and cheap pages are never limited
+    CONCURRENCY_LIMITS = os.getenv('CONCURRENCY_LIMITS', 'export=2,report=4,list=16')
+    CONCURRENCY_QUEUE_TIMEOUT = float(os.getenv('CONCURRENCY_QUEUE_TIMEOUT', '2.0'))
+    CONCURRENCY_RETRY_AFTER = int(os.getenv('CONCURRENCY_RETRY_AFTER', '5'))
+    CONCURRENCY_LOCK_DIR = os.getenv('CONCURRENCY_LOCK_DIR', '')
+    # Single-flight: identical concurrent computations run once (utils/singleflight.py).
+    # Workers coordinate through lock/result files in SINGLE_FLIGHT_DIR (default
+    # instance/singleflight, mode 0700: results are pickled, so the directory
+    # must be private to the app's user); empty dir = coalesce within each worker only
+    SINGLE_FLIGHT_DIR = os.getenv('SINGLE_FLIGHT_DIR')
+    SINGLE_FLIGHT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_TIMEOUT', '30'))
+    # Streamed list pages are flushed to the client in chunks of about this size
+    STREAM_CHUNK_BYTES = int(os.getenv('STREAM_CHUNK_BYTES', '16384'))
+    # Rows per page of a trash module (cursor pagination, newest deletion first)
+    TRASH_PAGE_SIZE = int(os.getenv('TRASH_PAGE_SIZE', '50'))
+    # Days a trashed row is kept before `flask purge-trash` deletes it for good;
+    # a module left out (or 0) is kept forever. Purged in batches of
+    # TRASH_PURGE_BATCH_SIZE rows, one short transaction each, TRASH_PURGE_PAUSE s apart
+    TRASH_RETENTION_DAYS = parse_counts(os.getenv('TRASH_RETENTION_DAYS', 'assets=90,asset_types=90,users=180,maintenance=90'))
+    TRASH_PURGE_BATCH_SIZE = int(os.getenv('TRASH_PURGE_BATCH_SIZE', '200'))
+    TRASH_PURGE_PAUSE = float(os.getenv('TRASH_PURGE_PAUSE', '0.5'))
+    # Compiled Jinja templates shared by all workers (utils/jinja_cache.py); empty = off
+    TEMPLATE_BYTECODE_CACHE_DIR = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR', 'instance/jinja_cache')
+    # Compile all templates before serving (gunicorn master / worker boot)
+    TEMPLATE_WARMUP = os.getenv('TEMPLATE_WARMUP', 'True').lower() in ('1', 'true', 'yes')
+    # Cache lifetime for static/dist (content-hashed) and static/vendor (versioned) files
+    STATIC_IMMUTABLE_MAX_AGE = int(os.getenv('STATIC_IMMUTABLE_MAX_AGE', str(365 * 24 * 3600)))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sinh dữ liệu lớn (10k - 5M bản ghi bảo trì) để benchmark, dùng insert theo lô / COPY.
+Run: python generate_fixtures.py --scale 1m [--seed 42] [--batch 20000] [--reset]
+"""
+
+import argparse
+import sys
+import io
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+from app import app, db
+from utils.fixtures import SCALES, generate, parse_scale, plan_counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sinh dữ liệu mẫu quy mô lớn cho benchmark')
+    parser.add_argument('--scale', default='10k',
+                        help=f"Số bản ghi bảo trì: {', '.join(SCALES)} hoặc số cụ thể (mặc định 10k)")
+    parser.add_argument('--seed', type=int, default=42, help='Seed ngẫu nhiên cố định (mặc định 42)')
+    parser.add_argument('--batch', type=int, default=20_000, help='Số dòng mỗi lô insert')
+    parser.add_argument('--reset', action='store_true', help='Xóa và tạo lại toàn bộ bảng trước khi sinh')
+    args = parser.parse_args(argv)
+
+    maintenance = parse_scale(args.scale)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        print(f"Dự kiến: {plan_counts(maintenance)}")
+        generate(db.engine, maintenance, seed=args.seed, batch_size=args.batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Cấu hình gunicorn cho production. Mọi tham số đọc từ .env qua config.Config.
+Chạy: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from config import Config
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+workers = Config.WEB_WORKERS or (multiprocessing.cpu_count() * 2 + 1)
+threads = Config.WEB_THREADS
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = Config.WEB_KEEPALIVE
+
+# Recycle workers periodically to bound memory growth; jitter avoids all
+# workers restarting at the same moment
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS_JITTER
+
+# Load the app in the master so workers share its memory copy-on-write
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+
+# Multiprocess metrics: each worker writes its samples to files in this
+# directory and /metrics aggregates them. Must exist before the app (and
+# prometheus_client) is imported, which preload_app does right after this
+# file is read, so it is reset here rather than in on_starting. Samples from
+# a previous run would otherwise be summed into the new one.
+if Config.METRICS_ENABLED:
+    metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'qlts-prometheus'))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # With preload_app the templates were compiled in the master (wsgi.py) and
+    # this finds them already loaded; without it, each worker compiles them
+    # here, from the bytecode cache, before accepting its first request.
+    if Config.TEMPLATE_WARMUP:
+        from utils.jinja_cache import warm_up
+        count, elapsed_ms = warm_up(server.app.wsgi())
+        server.log.info('Worker %s: %s templates ready in %.0f ms', worker.pid, count, elapsed_ms)
+
+
+def child_exit(server, worker):
+    from utils.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Let queued background work (slow-query EXPLAIN capture) finish. The
+    # master SIGKILLs the worker graceful_timeout seconds after SIGTERM and
+    # in-flight requests have used part of that, so only wait for a share of
+    # it. Tasks already running are not interrupted.
+    from utils.background import drain
+    unfinished = drain(timeout=max(graceful_timeout - 5, 1))
+    if unfinished:
+        server.log.warning('Worker %s exited with %s unfinished background task(s)', worker.pid, unfinished)
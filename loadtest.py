@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kiểm thử tải cục bộ: nhiều người dùng đăng nhập và thao tác như giờ hành chính.
+Run: python loadtest.py --url http://localhost --users nv0000002..nv0000201 --concurrency 50 --duration 120
+"""
+
+import argparse
+import sys
+import io
+
+# Fix encoding for Windows console
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+from utils.loadtest import DEFAULT_MIX, dump, format_report, parse_users, run
+
+
+def parse_mix(spec):
+    """'dashboard=10,assets_list=30' ghi đè trọng số của kịch bản mặc định."""
+    weights = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, value = part.partition('=')
+        if name not in weights:
+            raise SystemExit(f"Hành động không hợp lệ: {name}. Có: {', '.join(weights)}")
+        weights[name] = int(value)
+    return [(name, w) for name, w in weights.items() if w > 0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sinh tải giả lập người dùng văn phòng')
+    parser.add_argument('--url', default='http://localhost', help='Địa chỉ gốc (nginx hoặc gunicorn)')
+    parser.add_argument('--users', default='nv0000002..nv0000101',
+                        help="Tài khoản: 'a,b,c' hoặc dải 'nv0000002..nv0000201' (từ generate_fixtures.py)")
+    parser.add_argument('--password', default='password123', help='Mật khẩu chung của tài khoản sinh sẵn')
+    parser.add_argument('--concurrency', type=int, default=20, help='Số người dùng đồng thời')
+    parser.add_argument('--duration', type=float, default=60, help='Thời gian đo (giây), sau ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Thời gian tăng dần số người dùng (giây)')
+    parser.add_argument('--think', type=float, default=1.0, help='Thời gian nghỉ trung bình giữa thao tác (giây, 0 = liên tục)')
+    parser.add_argument('--mix', default='', help="Trọng số, ví dụ 'export_csv=0,dashboard=20'")
+    parser.add_argument('--seed', type=int, default=1, help='Seed cho chuỗi thao tác')
+    parser.add_argument('--json', help='Ghi báo cáo JSON để so sánh các cấu hình')
+    parser.add_argument('--label', default='', help="Nhãn lưu trong JSON, ví dụ 'workers=4,pool=10'")
+    args = parser.parse_args(argv)
+
+    users = parse_users(args.users)
+    report = run(
+        args.url, users, args.password,
+        concurrency=args.concurrency, duration=args.duration, ramp_up=args.ramp_up,
+        think=args.think, mix=parse_mix(args.mix), seed=args.seed,
+    )
+    print(format_report(report))
+    if args.json:
+        dump(report, args.json, label=args.label, settings=vars(args))
+    return 1 if report['total']['requests'] == 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
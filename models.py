@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -11,6 +12,33 @@ asset_user = db.Table(
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True)
 )
 
+# Partial indexes: hot list/dashboard queries only read live rows (the ORM adds
+# deleted_at IS NULL, see utils/soft_delete.py), so trashed rows never bloat
+# them; the trash has its own small index on deleted_at
+LIVE_ROWS = text('deleted_at IS NULL')
+TRASHED_ROWS = text('deleted_at IS NOT NULL')
+
+
+def live_index(name, *columns):
+    return db.Index(name, *columns, sqlite_where=LIVE_ROWS, postgresql_where=LIVE_ROWS)
+
+
+def trash_index(name):
+    # (deleted_at, id) is the order and the cursor of the paginated trash
+    return db.Index(name, 'deleted_at', 'id', sqlite_where=TRASHED_ROWS, postgresql_where=TRASHED_ROWS)
+
+
+class SoftDeleteMixin:
+    """Rows with deleted_at set are in the trash and skipped by ORM queries
+    unless they run with execution_options(include_deleted=True)."""
+
+    def soft_delete(self):
+        self.deleted_at = datetime.utcnow()
+
+    def restore(self):
+        self.deleted_at = None
+
+
 class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
@@ -24,7 +52,7 @@ class Role(db.Model):
     def __repr__(self):
         return f'<Role {self.name}>'
 
-class User(db.Model):
+class User(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), nullable=False, unique=True)
     password_hash = db.Column(db.String(120), nullable=False)
@@ -35,6 +63,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+
+    __table_args__ = (
+        trash_index('ix_user_trash_order'),
+    )
     
     # Relationship
     # Owner relationship (legacy single owner)
@@ -66,7 +98,7 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
-class AssetType(db.Model):
+class AssetType(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -74,21 +106,17 @@ class AssetType(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        trash_index('ix_asset_type_trash_order'),
+    )
+
     # Relationship
     assets = db.relationship('Asset', backref='asset_type', lazy=True)
     
-    def soft_delete(self):
-        """Soft delete asset type"""
-        self.deleted_at = datetime.utcnow()
-    
-    def restore(self):
-        """Restore deleted asset type"""
-        self.deleted_at = None
-    
     def __repr__(self):
         return f'<AssetType {self.name}>'
 
-class Asset(db.Model):
+class Asset(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -105,6 +133,12 @@ class Asset(db.Model):
     deleted_at = db.Column(db.DateTime, nullable=True)  # Soft delete
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        live_index('ix_asset_live_status', 'status'),
+        live_index('ix_asset_live_type_status', 'asset_type_id', 'status'),
+        trash_index('ix_asset_trash_order'),
+    )
     
     # Assigned users (many-to-many)
     assigned_users = db.relationship(
@@ -136,7 +170,12 @@ class AuditLog(db.Model):
     action = db.Column(db.String(20), nullable=False)   # create, update, delete
     entity_id = db.Column(db.Integer)
     details = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_audit_log_user_created', 'user_id', 'created_at'),
+        db.Index('ix_audit_log_module_created', 'module', 'created_at'),
+    )
 
     user = db.relationship('User', backref=db.backref('audit_logs', lazy=True))
 
@@ -144,7 +183,7 @@ class AuditLog(db.Model):
         return f'<AuditLog {self.module}:{self.action}#{self.entity_id}>'
 
 # IT Maintenance record
-class MaintenanceRecord(db.Model):
+class MaintenanceRecord(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False)
     maintenance_date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
@@ -159,15 +198,26 @@ class MaintenanceRecord(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        live_index('ix_maintenance_record_live_date', 'maintenance_date'),
+        live_index('ix_maintenance_record_live_next_due', 'next_due_date'),
+        live_index('ix_maintenance_record_live_asset_date', 'asset_id', 'maintenance_date'),
+        trash_index('ix_maintenance_record_trash_order'),
+    )
+
     asset = db.relationship('Asset', backref=db.backref('maintenance_records', lazy=True))
-    
-    def soft_delete(self):
-        """Soft delete maintenance record"""
-        self.deleted_at = datetime.utcnow()
-    
-    def restore(self):
-        """Restore deleted maintenance record"""
-        self.deleted_at = None
 
     def __repr__(self):
         return f'<Maintenance #{self.id} asset={self.asset_id}>'
+
+
+# Denormalised dashboard counters and per-table version stamps (utils/counters.py)
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counter'
+
+    key = db.Column(db.String(120), primary_key=True)  # e.g. assets, assets.status:active, version:asset
+    value = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StatCounter {self.key}={self.value}>'
@@ -10,8 +10,11 @@ try:
 except ImportError:
     ensure_asset_columns = None
 from models import Asset, Role, User, AssetType
+from utils import cache, counters
 
-if __name__ == '__main__':
+
+def bootstrap_database():
+    """Tạo bảng, bổ sung cột thiếu và tài khoản admin mặc định (idempotent)."""
     with app.app_context():
         # Tạo bảng database nếu chưa tồn tại
         db.create_all()
@@ -93,6 +96,23 @@ if __name__ == '__main__':
         except Exception:
             # Non-fatal: continue startup
             pass
+        # create_all() skips existing tables, so indexes added later are created here
+        # (CREATE INDEX IF NOT EXISTS semantics via checkfirst)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(db.engine, checkfirst=True)
+                except Exception as e:
+                    print(f"Index {index.name} not created:", e)
+        # Dashboard counters start from a full recount on databases that predate them
+        try:
+            if counters.is_empty():
+                with db.engine.begin() as conn:
+                    drift = counters.reconcile(conn)
+                if drift:
+                    cache.invalidate_tags(cache.tags_for_tables(counters.COUNTED_TABLES))
+        except Exception as e:
+            print("Counter reconcile error:", e)
         # Auto-bootstrap minimal data so login always works on first run
         try:
             if Role.query.count() == 0:
@@ -107,7 +127,8 @@ if __name__ == '__main__':
             admin_username = app.config.get('ADMIN_USERNAME', 'admin')
             admin_email = app.config.get('ADMIN_EMAIL', 'admin@example.com')
             admin_password = app.config.get('ADMIN_PASSWORD', 'admin123')
-            if User.query.filter_by(username=admin_username).first() is None:
+            # A trashed admin still holds the UNIQUE username: restore it rather than recreate
+            if User.query.execution_options(include_deleted=True).filter_by(username=admin_username).first() is None:
                 admin_role = Role.query.filter_by(name='admin').first()
                 if not admin_role:
                     admin_role = Role(name='admin', description='Quản trị')
@@ -126,6 +147,10 @@ if __name__ == '__main__':
                 ensure_asset_columns()
             except Exception:
                 pass
+
+
+if __name__ == '__main__':
+    bootstrap_database()
     import os
     # Avoid emojis to prevent UnicodeEncodeError on some Windows consoles
     host = os.getenv('HOST', '0.0.0.0')
@@ -0,0 +1,13 @@
+"""
+Thiết lập chung cho mọi test: thư mục gốc trong sys.path và database SQLite tạm
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Assigned, never setdefault: the tests drop_all(), so they must not reach the
+# DATABASE_URL of the environment (compose points it at the real Postgres).
+# Set before any test module imports app: the engine is created at import time.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='qlts-test-'), 'qlts_test.db')
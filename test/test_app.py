@@ -4,114 +4,105 @@ Test cases cho ứng dụng quản lý tài sản
 """
 
 import unittest
-import os
-import sys
-
-# Thêm thư mục gốc vào Python path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app, db
-from models import Category, Employee, Asset
+from models import AssetType, Asset, Role, User
 
 class TestAssetManagement(unittest.TestCase):
     """Test cases cho hệ thống quản lý tài sản"""
-    
+
     def setUp(self):
         """Thiết lập test environment"""
         app.config['TESTING'] = True
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         self.app = app.test_client()
-        
+
         with app.app_context():
+            db.drop_all()
             db.create_all()
-    
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.commit()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
     def tearDown(self):
         """Dọn dẹp sau mỗi test"""
         with app.app_context():
             db.session.remove()
             db.drop_all()
-    
+
+    def login(self):
+        """Đăng nhập bằng tài khoản admin tạo trong setUp"""
+        return self.app.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    def test_homepage_requires_login(self):
+        """Test trang chủ chuyển hướng khi chưa đăng nhập"""
+        response = self.app.get('/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login', response.headers['Location'])
+
     def test_homepage(self):
         """Test trang chủ"""
+        self.login()
         response = self.app.get('/')
         self.assertEqual(response.status_code, 200)
-        self.assertIn('Dashboard', response.get_data(as_text=True))
-    
+        self.assertIn('Tổng quan', response.get_data(as_text=True))
+
     def test_assets_page(self):
         """Test trang danh sách tài sản"""
+        self.login()
         response = self.app.get('/assets')
         self.assertEqual(response.status_code, 200)
         self.assertIn('Tài sản', response.get_data(as_text=True))
-    
-    def test_categories_page(self):
-        """Test trang danh sách danh mục"""
-        response = self.app.get('/categories')
+
+    def test_asset_types_page(self):
+        """Test trang danh sách loại tài sản"""
+        self.login()
+        response = self.app.get('/asset-types')
         self.assertEqual(response.status_code, 200)
-        self.assertIn('Danh mục', response.get_data(as_text=True))
-    
-    def test_employees_page(self):
-        """Test trang danh sách nhân viên"""
-        response = self.app.get('/employees')
+        self.assertIn('Loại tài sản', response.get_data(as_text=True))
+
+    def test_users_page(self):
+        """Test trang danh sách người dùng"""
+        self.login()
+        response = self.app.get('/users')
         self.assertEqual(response.status_code, 200)
-        self.assertIn('Nhân viên', response.get_data(as_text=True))
-    
-    def test_add_category(self):
-        """Test thêm danh mục"""
-        with app.app_context():
-            category = Category(name="Test Category", description="Test Description")
-            db.session.add(category)
-            db.session.commit()
-            
-            saved_category = Category.query.filter_by(name="Test Category").first()
-            self.assertIsNotNone(saved_category)
-            self.assertEqual(saved_category.name, "Test Category")
-    
-    def test_add_employee(self):
-        """Test thêm nhân viên"""
+        self.assertIn('admin', response.get_data(as_text=True))
+
+    def test_add_asset_type(self):
+        """Test thêm loại tài sản"""
+        self.login()
+        response = self.app.post('/asset-types/add', data={'name': 'Test Type', 'description': 'Test Description'})
+        self.assertTrue(response.get_json()['success'])
         with app.app_context():
-            employee = Employee(
-                name="Test Employee",
-                email="test@example.com",
-                department="IT",
-                position="Developer"
-            )
-            db.session.add(employee)
-            db.session.commit()
-            
-            saved_employee = Employee.query.filter_by(email="test@example.com").first()
-            self.assertIsNotNone(saved_employee)
-            self.assertEqual(saved_employee.name, "Test Employee")
-    
+            saved_type = AssetType.query.filter_by(name="Test Type").first()
+            self.assertIsNotNone(saved_type)
+            self.assertEqual(saved_type.description, "Test Description")
+
     def test_add_asset(self):
         """Test thêm tài sản"""
+        self.login()
         with app.app_context():
-            # Tạo danh mục và nhân viên trước
-            category = Category(name="Test Category", description="Test Description")
-            employee = Employee(name="Test Employee", email="test@example.com", department="IT", position="Developer")
-            
-            db.session.add(category)
-            db.session.add(employee)
+            asset_type = AssetType(name="Test Type", description="Test Description")
+            db.session.add(asset_type)
             db.session.commit()
-            
-            # Tạo tài sản
-            from datetime import date
-            asset = Asset(
-                name="Test Asset",
-                description="Test Asset Description",
-                category_id=category.id,
-                employee_id=employee.id,
-                purchase_date=date.today(),
-                purchase_price=1000000,
-                status="active"
-            )
-            
-            db.session.add(asset)
-            db.session.commit()
-            
+            type_id = asset_type.id
+        response = self.app.post('/assets/add', data={
+            'name': 'Test Asset',
+            'price': '1000000',
+            'quantity': '2',
+            'asset_type_id': str(type_id),
+            'status': 'active'
+        })
+        self.assertEqual(response.status_code, 302)
+        with app.app_context():
             saved_asset = Asset.query.filter_by(name="Test Asset").first()
             self.assertIsNotNone(saved_asset)
-            self.assertEqual(saved_asset.name, "Test Asset")
-            self.assertEqual(saved_asset.purchase_price, 1000000)
+            self.assertEqual(saved_asset.price, 1000000)
+            self.assertEqual(saved_asset.quantity, 2)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test cho cache nhiều tầng: tầng dùng chung (Redis), invalidation theo tag khi commit (utils/cache.py)
+"""
+
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import date
+
+from app import app, db
+from models import Asset, AssetType, MaintenanceRecord
+from utils import cache
+from utils.cache import FileTags, LocalTags, LRUCache, RedisTags, RedisTier
+
+
+class StandInRedis:
+    """The few Redis commands the cache uses, in memory (stands in for a server)."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        if ex:
+            self.expires[key] = time.time() + ex
+
+    def incr(self, key):
+        self.data[key] = int(self.get(key) or 0) + 1
+        return self.data[key]
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def incr(self, key):
+                self.calls.append(key)
+
+            def execute(self):
+                return [redis.incr(k) for k in self.calls]
+
+        return Pipeline()
+
+
+class TestCacheTiers(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_backend = cache._backend
+        self.tag_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        cache._backend = self.saved_backend
+        shutil.rmtree(self.tag_dir, ignore_errors=True)
+
+    def test_entry_from_one_worker_serves_another(self):
+        server = StandInRedis()
+        cache.configure(RedisTags(server), RedisTier(server), poll_interval=0)
+        worker_a = LRUCache('facets_test', shared=True)
+        worker_b = LRUCache('facets_test', shared=True)
+        worker_a.set(('k', 1), {'active': 3}, tags=('asset',))
+        self.assertEqual(worker_b.get(('k', 1)), {'active': 3})
+        self.assertEqual(worker_b.stats()['shared_hits'], 1)
+        # Invalidated through the tag: the shared copy is refused as well
+        cache.invalidate_tags(['asset'])
+        self.assertIsNone(LRUCache('facets_test', shared=True).get(('k', 1)))
+        self.assertIsNone(worker_b.get(('k', 1)))
+
+    def test_other_worker_invalidation_seen_within_poll_interval(self):
+        cache.configure(FileTags(self.tag_dir), None, poll_interval=0.05)
+        local = LRUCache('tagged_test')
+        local.set('k', 'v', tags=('asset',))
+        # Another process commits an asset write: it bumps the same tag file
+        FileTags(self.tag_dir).bump(['asset'])
+        time.sleep(0.06)
+        self.assertIsNone(local.get('k'))
+        self.assertEqual(local.stats()['invalidations'], 1)
+
+    def test_evictions_counted(self):
+        small = LRUCache('small_test', maxsize=2)
+        for i in range(5):
+            small.set(i, i)
+        stats = small.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 3))
+
+
+class TestCommitInvalidation(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.saved_backend = cache._backend
+        cache.configure(LocalTags(), None, poll_interval=60)
+        self.cache = cache.get_cache('commit_test')
+        self.cache.clear()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add(pc)
+            db.session.commit()
+            self.type_id = pc.id
+
+    def tearDown(self):
+        cache._backend = self.saved_backend
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_commit_fires_table_tags(self):
+        self.cache.set('assets', 1, tags=('asset',))
+        self.cache.set('plan', 2, tags=('maintenance',))
+        with app.app_context():
+            asset = Asset(name='PC-1', price=1, asset_type_id=self.type_id)
+            db.session.add(asset)
+            db.session.flush()
+            # Not committed yet: entries stay
+            self.assertEqual(self.cache.get('assets'), 1)
+            db.session.commit()
+            self.assertIsNone(self.cache.get('assets'))
+            self.assertEqual(self.cache.get('plan'), 2)
+            db.session.add(MaintenanceRecord(asset_id=asset.id, maintenance_date=date.today(), type='maintenance',
+                                             description='Kiểm tra', cost=0, status='scheduled'))
+            db.session.commit()
+            self.assertIsNone(self.cache.get('plan'))
+
+    def test_rollback_keeps_entries(self):
+        self.cache.set('assets', 1, tags=('asset',))
+        with app.app_context():
+            db.session.add(Asset(name='PC-1', price=1, asset_type_id=self.type_id))
+            db.session.flush()
+            db.session.rollback()
+            db.session.commit()
+        self.assertEqual(self.cache.get('assets'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test cho ETag / If-None-Match theo phiên bản dữ liệu (utils/conditional.py)
+"""
+
+import unittest
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            db.session.add(Asset(name='PC-1', price=1, asset_type_id=pc.id))
+            db.session.commit()
+            self.user_id, self.type_id = user.id, pc.id
+        self.login()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, user_id=None, role='admin'):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user_id or self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = role
+
+    def test_unchanged_page_returns_304_without_rendering(self):
+        first = self.client.get('/assets')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            second = self.client.get('/assets', headers={'If-None-Match': etag})
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.get_data(), b'')
+        self.assertEqual(len(statements), 1)
+        self.assertIn('stat_counter', statements[0])
+
+    def test_tag_changes_with_data_params_and_viewer(self):
+        etag = self.client.get('/assets').headers['ETag']
+        self.assertNotEqual(self.client.get('/assets?status=active').headers['ETag'], etag)
+        self.login(role='user')
+        self.assertNotEqual(self.client.get('/assets').headers['ETag'], etag)
+        self.login()
+        self.assertEqual(self.client.get('/assets').headers['ETag'], etag)
+        with app.app_context():
+            db.session.add(Asset(name='PC-2', price=1, asset_type_id=self.type_id))
+            db.session.commit()
+        response = self.client.get('/assets', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('PC-2', response.get_data(as_text=True))
+
+    def test_pending_flash_is_not_cached(self):
+        etag = self.client.get('/asset-types').headers['ETag']
+        with self.client.session_transaction() as sess:
+            sess['_flashes'] = [('success', 'Đã lưu')]
+        response = self.client.get('/asset-types', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Đã lưu', response.get_data(as_text=True))
+        self.assertNotIn('ETag', response.headers)
+
+    def test_streamed_dashboard_is_tagged(self):
+        etag = self.client.get('/maintenance/dashboard').headers['ETag']
+        response = self.client.get('/maintenance/dashboard', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
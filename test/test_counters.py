@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test cho bảng đếm thống kê dashboard (utils/counters.py)
+"""
+
+import unittest
+from datetime import datetime
+
+from app import app, db
+from models import Asset, AssetType, MaintenanceRecord, Role, User
+from utils import cache, counters
+
+
+class TestCounters(unittest.TestCase):
+    """Bộ đếm tăng/giảm theo thao tác ORM và khớp với đếm lại từ bảng gốc"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            t1, t2 = AssetType(name='Máy tính'), AssetType(name='Máy in')
+            db.session.add_all([user, t1, t2])
+            db.session.flush()
+            db.session.add_all([
+                Asset(name='PC-1', price=1000, quantity=2, asset_type_id=t1.id),
+                Asset(name='PC-2', price=500, asset_type_id=t1.id, status='maintenance'),
+                Asset(name='Printer', price=300, asset_type_id=t2.id),
+            ])
+            db.session.commit()
+            self.user_id, self.t1, self.t2 = user.id, t1.id, t2.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assertConsistent(self):
+        with db.engine.connect() as conn:
+            actual = counters.compute(conn)
+        stored = {k: v for k, v in counters.snapshot().items() if not k.startswith(counters.VERSION_PREFIX)}
+        self.assertEqual({k: v for k, v in actual.items() if v}, {k: v for k, v in stored.items() if v})
+
+    def test_inserts_counted(self):
+        with app.app_context():
+            snap = counters.snapshot()
+            self.assertEqual(snap['assets'], 3)
+            self.assertEqual(snap['assets.status:active'], 2)
+            self.assertEqual(snap[f'assets.type:{self.t1}'], 2)
+            self.assertEqual(snap['assets.value'], 2800)
+            self.assertEqual(snap['users'], 1)
+            self.assertEqual(snap['asset_types'], 2)
+            self.assertConsistent()
+
+    def test_updates_soft_delete_and_delete(self):
+        with app.app_context():
+            before = counters.version(['asset'])
+            pc1 = Asset.query.filter_by(name='PC-1').one()
+            pc1.status = 'maintenance'
+            pc1.asset_type_id = self.t2
+            pc1.price = 2000
+            db.session.commit()
+            printer = Asset.query.filter_by(name='Printer').one()
+            printer.soft_delete()
+            db.session.commit()
+            db.session.delete(Asset.query.filter_by(name='PC-2').one())
+            db.session.commit()
+            snap = counters.snapshot()
+            self.assertEqual(snap['assets'], 1)
+            self.assertEqual(snap['assets.status:maintenance'], 1)
+            self.assertEqual(snap['assets.value'], 4000)
+            self.assertNotEqual(counters.version(['asset']), before)
+            self.assertConsistent()
+            printer = Asset.query.execution_options(include_deleted=True).filter_by(name='Printer').one()
+            printer.restore()
+            db.session.commit()
+            self.assertEqual(counters.snapshot()['assets'], 2)
+            self.assertConsistent()
+
+    def test_rollback_discards_deltas(self):
+        with app.app_context():
+            db.session.add(Asset(name='Tmp', price=1, asset_type_id=self.t1))
+            db.session.flush()
+            db.session.rollback()
+            self.assertEqual(counters.snapshot()['assets'], 3)
+
+    def test_reconcile_fixes_bulk_sql_drift(self):
+        with app.app_context():
+            Asset.query.filter_by(name='Printer').update({'deleted_at': datetime.utcnow()})
+            db.session.commit()
+            self.assertEqual(counters.snapshot()['assets'], 3)
+            with db.engine.begin() as conn:
+                drift = counters.reconcile(conn)
+            self.assertEqual(drift['assets'], -1)
+            self.assertEqual(counters.snapshot()['assets'], 2)
+            with db.engine.begin() as conn:
+                self.assertEqual(counters.reconcile(conn), {})
+
+    def test_cli_command(self):
+        result = app.test_cli_runner().invoke(args=['reconcile-stats'])
+        self.assertIn('Counters reconciled', result.output)
+
+    def test_cli_reconcile_invalidates_cached_entries(self):
+        with app.app_context():
+            Asset.query.filter_by(name='Printer').update({'deleted_at': datetime.utcnow()})
+            db.session.commit()
+        # Cached after the bulk update: only the recount can retire it
+        fragment = cache.get_cache('reconcile_test')
+        fragment.set('assets', 3, tags=('asset',))
+        result = app.test_cli_runner().invoke(args=['reconcile-stats'])
+        self.assertIn("'assets': -1", result.output)
+        self.assertIsNone(fragment.get('assets'))
+        with app.app_context():
+            # Nothing left pending on the app's session either
+            self.assertNotIn('cache_tags', db.session().info)
+
+    def test_index_uses_counters_and_schedules_once(self):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.client.get('/')
+        with app.app_context():
+            self.assertEqual(MaintenanceRecord.query.filter_by(status='scheduled').count(), 3)
+            self.assertEqual(counters.snapshot()['maintenance'], 3)
+            self.assertConsistent()
+        diag = self.client.get('/dev/diag').get_json()
+        self.assertEqual(diag['counts']['assets'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
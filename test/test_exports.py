@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test cho tải file export theo đường dẫn (send_file / X-Accel-Redirect, Range)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+
+
+class TestExportDownloads(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.export_dir = tempfile.mkdtemp()
+        self._old_export_dir = app.config.get('EXPORT_DIR')
+        app.config['EXPORT_DIR'] = self.export_dir
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            db.session.add_all([Asset(name=f'PC-{i}', price=i, asset_type_id=pc.id) for i in range(50)])
+            db.session.commit()
+            user_id = user.id
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        app.config['EXPORT_DIR'] = self._old_export_dir
+        app.config['EXPORT_ACCEL_REDIRECT'] = ''
+        shutil.rmtree(self.export_dir, ignore_errors=True)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def exported_file(self):
+        names = os.listdir(self.export_dir)
+        self.assertEqual(len(names), 1, names)
+        return os.path.join(self.export_dir, names[0])
+
+    def test_csv_is_sent_from_export_dir(self):
+        response = self.client.get('/assets/export/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertIn('tai_san.csv', response.headers['Content-Disposition'])
+        body = response.get_data()
+        response.close()
+        with open(self.exported_file(), 'rb') as f:
+            self.assertEqual(f.read(), body)
+        self.assertTrue(body.startswith('﻿ID,'.encode('utf-8')))
+        self.assertIn('PC-49', body.decode('utf-8-sig'))
+
+    def test_range_request_resumes_download(self):
+        full = self.client.get('/assets/export/json')
+        data = full.get_data()
+        full.close()
+        os.remove(self.exported_file())
+        response = self.client.get('/assets/export/json', headers={'Range': 'bytes=100-'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), data[100:])
+        self.assertEqual(response.headers['Content-Range'], f'bytes 100-{len(data) - 1}/{len(data)}')
+        response.close()
+
+    def test_accel_redirect_hands_file_to_nginx(self):
+        app.config['EXPORT_ACCEL_REDIRECT'] = '/_exports/'
+        response = self.client.get('/assets/export/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'')
+        name = os.path.basename(self.exported_file())
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/_exports/' + name)
+        self.assertEqual(response.headers['Content-Type'], 'application/json; charset=utf-8')
+        self.assertIn('tai_san.json', response.headers['Content-Disposition'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test cho số đếm theo facet của danh sách tài sản và cache LRU (utils/cache.py)
+"""
+
+import unittest
+from datetime import date
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+from utils.cache import LRUCache, get_cache
+from utils.queries import asset_facet_counts
+
+
+class TestAssetFacets(unittest.TestCase):
+    """Facet loại trừ bộ lọc của chính nó và được đếm trong một truy vấn"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        get_cache('asset_facets').clear()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc, printer = AssetType(name='Máy tính'), AssetType(name='Máy in')
+            db.session.add_all([user, pc, printer])
+            db.session.flush()
+            db.session.add_all([
+                Asset(name='Laptop A', price=1, asset_type_id=pc.id, status='active',
+                      condition_label='Còn tốt', purchase_date=date(2022, 5, 1)),
+                Asset(name='Laptop B', price=1, asset_type_id=pc.id, status='maintenance',
+                      condition_label='Còn tốt', purchase_date=date(2023, 1, 1)),
+                Asset(name='Laptop C', price=1, asset_type_id=printer.id, status='active',
+                      purchase_date=date(2023, 2, 1)),
+                Asset(name='Printer', price=1, asset_type_id=printer.id, status='active'),
+            ])
+            db.session.commit()
+            self.user_id, self.pc, self.printer = user.id, pc.id, printer.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def test_counts_exclude_own_facet(self):
+        with app.app_context():
+            facets = asset_facet_counts(search='Laptop', type_id=self.pc)
+        # Type facet ignores type_id=pc; other facets are restricted to it
+        self.assertEqual(dict(facets['type']), {str(self.pc): 2, str(self.printer): 1})
+        self.assertEqual(dict(facets['status']), {'active': 1, 'maintenance': 1})
+        self.assertEqual(dict(facets['condition']), {'Còn tốt': 2})
+        self.assertEqual(dict(facets['year']), {'2022': 1, '2023': 1})
+
+    def test_page_uses_cache_and_write_invalidates(self):
+        self.login()
+        cache = get_cache('asset_facets')
+        base = cache.stats()
+        body = self.client.get('/assets?status=active').get_data(as_text=True)
+        self.assertIn('asset-facet-count', body)
+        self.assertIn('Năm mua', body)
+        self.client.get('/assets?status=active')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'] - base['hits'], stats['misses'] - base['misses']), (1, 1))
+        with app.app_context():
+            Asset.query.filter_by(name='Printer').one().status = 'maintenance'
+            db.session.commit()
+        self.client.get('/assets?status=active')
+        self.assertEqual(cache.stats()['misses'] - base['misses'], 2)
+
+    def test_single_facet_query(self):
+        self.login()
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            self.assertEqual(self.client.get('/assets?search=Laptop').status_code, 200)
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        counting = [s for s in statements if 'count(' in s.lower()]
+        # Pagination total + one UNION ALL for all four facets
+        self.assertEqual(len(counting), 2, counting)
+        self.assertEqual(sum('UNION ALL' in s for s in statements), 1)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LRUCache('t', maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        expired = LRUCache('e', ttl=-1)
+        expired.set('x', 1)
+        self.assertIsNone(expired.get('x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test cho bộ sinh dữ liệu lớn (utils/fixtures.py)
+"""
+
+import unittest
+
+from app import app, db
+from models import Asset, AuditLog, MaintenanceRecord, User
+from utils import fixtures
+
+
+class TestFixtures(unittest.TestCase):
+    """Kiểm tra số lượng, tính tất định và dữ liệu đọc lại được qua ORM"""
+
+    def setUp(self):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_parse_scale(self):
+        self.assertEqual(fixtures.parse_scale('10k'), 10_000)
+        self.assertEqual(fixtures.parse_scale('2.5m'), 2_500_000)
+        self.assertEqual(fixtures.parse_scale('1234'), 1234)
+
+    def test_generate_counts_and_orm_roundtrip(self):
+        with app.app_context():
+            result = fixtures.generate(db.engine, 2_000, seed=7, password_hash='x', log=lambda m: None)
+            counts = fixtures.plan_counts(2_000)
+            self.assertEqual(result['maintenance'], 2_000)
+            # Fixtures include trashed rows, which ORM queries skip by default
+            self.assertEqual(MaintenanceRecord.query.execution_options(include_deleted=True).count(), 2_000)
+            self.assertEqual(Asset.query.execution_options(include_deleted=True).count(), counts['assets'])
+            self.assertEqual(User.query.execution_options(include_deleted=True).count(), counts['users'])
+            self.assertEqual(AuditLog.query.count(), counts['audit_logs'])
+            rec = MaintenanceRecord.query.first()
+            self.assertIsNotNone(rec.maintenance_date.year)
+            self.assertIsNotNone(rec.created_at.year)
+
+    def test_same_seed_same_data(self):
+        with app.app_context():
+            fixtures.generate(db.engine, 500, seed=3, password_hash='x', log=lambda m: None)
+            first = [(r.asset_id, r.maintenance_date, r.cost) for r in MaintenanceRecord.query.order_by(MaintenanceRecord.id).limit(50)]
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            fixtures.generate(db.engine, 500, seed=3, password_hash='x', log=lambda m: None)
+            second = [(r.asset_id, r.maintenance_date, r.cost) for r in MaintenanceRecord.query.order_by(MaintenanceRecord.id).limit(50)]
+            self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test cho cache fragment template {% cache %} (utils/fragments.py)
+"""
+
+import unittest
+from datetime import date, timedelta
+
+from flask import g, session
+from sqlalchemy import event
+
+from app import app, db
+from models import Asset, AssetType, MaintenanceRecord, Role, User
+from utils.cache import get_cache
+
+
+def get_counting_queries(client, path):
+    """(body, statements run) for a GET, including queries of a streamed body."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        body = client.get(path).get_data(as_text=True)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return body, len(statements)
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        get_cache('fragments').clear()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            asset = Asset(name='PC-1', price=1, asset_type_id=pc.id)
+            db.session.add(asset)
+            db.session.flush()
+            db.session.add(MaintenanceRecord(asset_id=asset.id, maintenance_date=date.today(),
+                                             next_due_date=date.today() + timedelta(days=5),
+                                             type='maintenance', status='scheduled'))
+            db.session.commit()
+            self.user_id, self.asset_id = user.id, asset.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, role='admin'):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = role
+
+    def render(self, source, **context):
+        with app.test_request_context('/'):
+            session['role'] = context.pop('role', 'admin')
+            return app.jinja_env.from_string(source).render(**context)
+
+    def test_block_keyed_on_parts_role_and_version(self):
+        source = "{% cache 'x', n, tables=['asset'] %}{{ calls.append(1) or n }}{% endcache %}"
+        calls = []
+        self.assertEqual(self.render(source, n=1, calls=calls), '1')
+        self.assertEqual(self.render(source, n=1, calls=calls), '1')
+        self.assertEqual(len(calls), 1)
+        self.render(source, n=2, calls=calls)
+        self.render(source, n=1, calls=calls, role='user')
+        self.assertEqual(len(calls), 3)
+        with app.app_context():
+            db.session.get(Asset, self.asset_id).name = 'PC-2'
+            db.session.commit()
+        self.render(source, n=1, calls=calls)
+        self.assertEqual(len(calls), 4)
+
+    def test_version_snapshot_read_once_per_request(self):
+        with app.test_request_context('/'):
+            app.jinja_env.from_string(
+                "{% cache 'a', tables=['asset'] %}a{% endcache %}{% cache 'b', tables=['user'] %}b{% endcache %}"
+            ).render()
+            self.assertIn('stat_snapshot', g)
+
+    def test_dashboard_lists_skip_queries_when_cached(self):
+        self.login()
+        body, first = get_counting_queries(self.client, '/maintenance/dashboard')
+        self.assertIn('PC-1', body)
+        body, second = get_counting_queries(self.client, '/maintenance/dashboard')
+        self.assertIn('PC-1', body)
+        # The overdue list is served from the fragment cache
+        self.assertEqual(first - second, 1)
+        with app.app_context():
+            db.session.get(Asset, self.asset_id).name = 'PC-renamed'
+            db.session.commit()
+        self.assertIn('PC-renamed', self.client.get('/maintenance/dashboard').get_data(as_text=True))
+
+    def test_disabled_by_config(self):
+        app.config['FRAGMENT_CACHE_SIZE'] = 0
+        try:
+            calls = []
+            source = "{% cache 'x' %}{{ calls.append(1) or '' }}{% endcache %}"
+            self.render(source, calls=calls)
+            self.render(source, calls=calls)
+            self.assertEqual(len(calls), 2)
+        finally:
+            app.config['FRAGMENT_CACHE_SIZE'] = 512
+
+
+if __name__ == '__main__':
+    unittest.main()
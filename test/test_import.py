@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test cho nhập tài sản từ CSV/XLSX (utils/importer.py): đọc theo luồng, tra cứu tên theo lô,
+chèn hàng loạt, báo cáo lỗi
+"""
+
+import csv
+import io
+import re
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+from openpyxl import Workbook
+from sqlalchemy import event
+
+from app import app, db
+from models import Asset, AssetType, AuditLog, Role, User
+from utils import counters, importer
+
+HEADER = ['Tên tài sản', 'Loại', 'Giá', 'Số lượng', 'Ngày mua', 'Người sử dụng', 'Trạng thái']
+
+
+def csv_file(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    writer.writerows(rows)
+    return io.BytesIO(out.getvalue().encode('utf-8-sig'))
+
+
+class TestImportAssets(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.report_dir = tempfile.mkdtemp()
+        self.saved_export_dir = app.config.get('EXPORT_DIR')
+        app.config['EXPORT_DIR'] = self.report_dir
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            admin = User(username='admin', email='admin@example.com', role_id=role.id)
+            admin.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            printer = AssetType(name='Máy in', description='Máy in laser')
+            db.session.add_all([admin, pc, printer])
+            db.session.flush()
+            db.session.add(Asset(name='PC-existing', price=1, asset_type_id=pc.id))
+            db.session.commit()
+            self.ids = {'admin': admin.id, 'pc': pc.id, 'printer': printer.id}
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.ids['admin']
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        app.config['EXPORT_DIR'] = self.saved_export_dir
+        shutil.rmtree(self.report_dir, ignore_errors=True)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_batches_use_one_lookup_and_insert_each(self):
+        rows = [[f'PC-{i:03d}', 'Máy tính' if i % 2 else 'Máy in', 100, 1, '01/02/2024', 'admin', 'active']
+                for i in range(25)]
+        with app.app_context():
+            engine = db.engine
+            statements = []
+            record = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+            event.listen(engine, 'before_cursor_execute', record)
+            try:
+                result = importer.import_assets(csv_file(rows), 'tai_san.csv', user_id=self.ids['admin'],
+                                                batch_size=10)
+                db.session.commit()
+            finally:
+                event.remove(engine, 'before_cursor_execute', record)
+            self.assertEqual((result['imported'], result['errors'], result['report']), (25, 0, None))
+            # Names are looked up once: later batches reuse them
+            self.assertEqual(len([s for s in statements if s.startswith('SELECT asset_type.name')]), 1)
+            self.assertEqual(len([s for s in statements if s.startswith('SELECT user.username')]), 1)
+            self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO asset ')]), 3)
+            imported = Asset.query.filter_by(name='PC-001').one()
+            self.assertEqual((imported.asset_type_id, imported.user_id, imported.purchase_date),
+                             (self.ids['pc'], self.ids['admin'], date(2024, 2, 1)))
+            self.assertEqual(counters.snapshot()['assets'], 26)
+            [entry] = AuditLog.query.filter_by(action='import').all()
+            self.assertEqual(entry.details, 'file=tai_san.csv; imported=25, errors=0')
+
+    def test_invalid_rows_go_to_error_report(self):
+        rows = [
+            ['PC-new', 'Máy tính', 100, 2, '', '', 'Đang sử dụng'],
+            ['PC-existing', 'Máy tính', 100, 1, '', '', ''],
+            ['PC-new', 'Máy tính', 100, 1, '', '', ''],
+            ['Fax', 'Máy fax', 100, 1, '', '', ''],
+            ['PC-cheap', 'Máy tính', 0, 1, '', '', ''],
+            ['PC-ghost', 'Máy tính', 100, 1, '', 'ghost', ''],
+            ['PC-date', 'Máy tính', 100, 1, '31/02/2024', '', ''],
+        ]
+        response = self.client.post('/assets/import', data={'file': (csv_file(rows), 'tai_san.csv')},
+                                    content_type='multipart/form-data')
+        body = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<strong>1</strong> tài sản', body)
+        link = re.search(r'href="(/assets/import/errors/[^"]+)"', body).group(1)
+        response = self.client.get(link)
+        report = list(csv.reader(io.StringIO(response.get_data().decode('utf-8-sig'))))
+        response.close()
+        self.assertEqual(report[0], HEADER + ['Dòng', 'Lỗi'])
+        self.assertEqual([(r[0], r[-2]) for r in report[1:]],
+                         [('PC-existing', '3'), ('PC-new', '4'), ('Fax', '5'), ('PC-cheap', '6'),
+                          ('PC-ghost', '7'), ('PC-date', '8')])
+        self.assertIn("Không có loại tài sản 'Máy fax'", report[3][-1])
+        with app.app_context():
+            self.assertEqual(Asset.query.filter_by(name='PC-new').one().quantity, 2)
+
+    def test_export_file_imports_again(self):
+        response = self.client.get('/assets/export/csv')
+        exported = io.BytesIO(response.get_data())
+        response.close()
+        with app.app_context():
+            Asset.query.filter_by(name='PC-existing').one().soft_delete()
+            db.session.commit()
+            result = importer.import_assets(exported, 'tai_san.csv')
+            db.session.commit()
+            self.assertEqual((result['imported'], result['errors']), (1, 0))
+            self.assertEqual(Asset.query.one().name, 'PC-existing')
+
+    def test_streams_xlsx_rows(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['name', 'asset_type', 'price', 'purchase_date', 'device_code'])
+        sheet.append(['PC-xlsx', 'Máy in', 250.5, date(2024, 3, 4), 12345])
+        buf = io.BytesIO()
+        workbook.save(buf)
+        buf.seek(0)
+        with app.app_context():
+            result = importer.import_assets(buf, 'may_in.xlsx')
+            db.session.commit()
+            asset = Asset.query.filter_by(name='PC-xlsx').one()
+            self.assertEqual((result['imported'], asset.device_code, asset.purchase_date, asset.quantity),
+                             (1, '12345', date(2024, 3, 4), 1))
+
+    def test_missing_columns_or_bad_file_rejected(self):
+        response = self.client.post('/assets/import', data={'file': (io.BytesIO(b'foo,bar\n1,2\n'), 'x.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post('/assets/import', data={'file': (io.BytesIO(b'not a zip'), 'x.xlsx')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get('/assets/import/errors/..%2Fapp.py').status_code, 404)
+        with app.app_context():
+            self.assertEqual(Asset.query.count(), 1)
+            self.assertFalse(AuditLog.query.filter_by(action='import').all())
+
+
+if __name__ == '__main__':
+    unittest.main()
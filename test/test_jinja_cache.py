@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test cho bytecode cache Jinja và lệnh `flask precompile-templates` (utils/jinja_cache.py)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from jinja2 import FileSystemBytecodeCache
+
+from app import app
+from utils.jinja_cache import warm_up
+
+
+class TestTemplatePrecompile(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.saved = app.jinja_env.bytecode_cache
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.cache_dir)
+        app.jinja_env.cache.clear()
+
+    def tearDown(self):
+        app.jinja_env.bytecode_cache = self.saved
+        app.jinja_env.cache.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_cli_writes_bytecode_for_every_template(self):
+        result = app.test_cli_runner().invoke(args=['precompile-templates'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        html = [n for n in app.jinja_env.list_templates() if n.endswith('.html')]
+        self.assertIn(f'Compiled {len(html)} templates', result.output)
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(html))
+
+    def test_cold_process_loads_from_bytecode(self):
+        warm_up(app)
+        app.jinja_env.cache.clear()
+        # A new worker has an empty in-memory cache; sources must not be recompiled
+        compiled = []
+        original = app.jinja_env.compile
+
+        def compile_spy(*args, **kwargs):
+            compiled.append(args)
+            return original(*args, **kwargs)
+
+        app.jinja_env.compile = compile_spy
+        try:
+            count, _ = warm_up(app)
+        finally:
+            del app.jinja_env.compile
+        self.assertGreater(count, 0)
+        self.assertEqual(compiled, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test cho giới hạn đồng thời giữa các worker (utils/limiter.py)
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+from config import parse_counts
+from utils.limiter import FileSemaphore
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.lock_dir = tempfile.mkdtemp()
+        self.export_dir = tempfile.mkdtemp()
+        self.saved = (app.extensions['concurrency'], app.extensions['concurrency_users'],
+                      app.config['CONCURRENCY_LOCK_DIR'], app.config['CONCURRENCY_QUEUE_TIMEOUT'],
+                      app.config.get('EXPORT_DIR'))
+        app.extensions['concurrency'] = {name: FileSemaphore(self.lock_dir, name, 1) for name in ('export', 'list')}
+        app.extensions['concurrency_users'] = {}
+        app.config['CONCURRENCY_LOCK_DIR'] = self.lock_dir
+        app.config['CONCURRENCY_QUEUE_TIMEOUT'] = 0.05
+        app.config['EXPORT_DIR'] = self.export_dir
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            db.session.add(Asset(name='PC-1', price=1, asset_type_id=pc.id, deleted_at=db.func.now()))
+            db.session.commit()
+            self.user_id = user.id
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        (app.extensions['concurrency'], app.extensions['concurrency_users'], app.config['CONCURRENCY_LOCK_DIR'],
+         app.config['CONCURRENCY_QUEUE_TIMEOUT'], app.config['EXPORT_DIR']) = self.saved
+        shutil.rmtree(self.lock_dir, ignore_errors=True)
+        shutil.rmtree(self.export_dir, ignore_errors=True)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def hold(self, name, size=1):
+        # Another worker process holding the slot: a separate flock on the same file
+        semaphore = FileSemaphore(self.lock_dir, name, size)
+        token = semaphore.try_acquire()
+        self.assertIsNotNone(token)
+        return semaphore, token
+
+    def test_parse_limits(self):
+        self.assertEqual(parse_counts('export=2, report=4,list=16'), {'export': 2, 'report': 4, 'list': 16})
+        self.assertEqual(parse_counts(''), {})
+
+    def test_full_class_gets_503_with_retry_after(self):
+        semaphore, token = self.hold('export')
+        try:
+            started = time.perf_counter()
+            response = self.client.get('/assets/export/json')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '5')
+            self.assertLess(time.perf_counter() - started, 1.0)
+            # Other classes and /healthz are unaffected
+            self.assertEqual(self.client.get('/healthz').status_code, 200)
+        finally:
+            semaphore.release(token)
+        self.assertEqual(self.client.get('/assets/export/json').status_code, 200)
+
+    def test_user_with_running_export_gets_429(self):
+        semaphore, token = self.hold(f'export.user.{self.user_id}')
+        try:
+            response = self.client.get('/assets/export/json')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response.headers)
+        finally:
+            semaphore.release(token)
+
+    def test_queued_request_runs_when_slot_frees(self):
+        app.config['CONCURRENCY_QUEUE_TIMEOUT'] = 2.0
+        semaphore, token = self.hold('export')
+        timer = threading.Timer(0.1, semaphore.release, args=(token,))
+        timer.start()
+        try:
+            self.assertEqual(self.client.get('/assets/export/json').status_code, 200)
+        finally:
+            timer.join()
+
+    def test_streamed_page_releases_slot_after_body(self):
+        response = self.client.get('/trash?module=assets')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('PC-1', response.get_data(as_text=True))
+        semaphore, token = self.hold('list')
+        semaphore.release(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
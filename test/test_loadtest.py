@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test cho bộ sinh tải cục bộ (utils/loadtest.py) chạy với server WSGI thật
+"""
+
+import tempfile
+import threading
+import unittest
+
+from werkzeug.serving import make_server
+
+from app import app, db
+from utils.fixtures import generate
+from utils.loadtest import format_report, parse_users, run
+
+
+class TestLoadTest(unittest.TestCase):
+    """Kiểm tra đăng nhập, kịch bản thao tác và báo cáo theo endpoint"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self._old_export_dir = app.config.get('EXPORT_DIR')
+        app.config['EXPORT_DIR'] = tempfile.mkdtemp()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            generate(db.engine, 500, seed=7, log=lambda msg: None)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        app.config['EXPORT_DIR'] = self._old_export_dir
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_parse_users(self):
+        self.assertEqual(parse_users('nv0000002..nv0000004,admin'), ['nv0000002', 'nv0000003', 'nv0000004', 'admin'])
+
+    def test_run_reports_each_endpoint(self):
+        report = run(self.url, parse_users('nv0000001..nv0000003'), 'password123',
+                     concurrency=3, duration=2, ramp_up=0, think=0, log=lambda msg: None)
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertEqual(report['total']['errors'], 0, report['error_samples'])
+        self.assertIn('assets_list', report['endpoints'])
+        self.assertIsNotNone(report['endpoints']['assets_list']['avg_queries'])
+        self.assertIn('TOTAL', format_report(report))
+
+    def test_bad_password_fails_fast(self):
+        with self.assertRaises(RuntimeError):
+            run(self.url, ['nv0000001'], 'wrong', concurrency=1, duration=1, log=lambda msg: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
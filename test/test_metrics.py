@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test cho endpoint /metrics (utils/metrics.py)
+"""
+
+import unittest
+
+from app import app, db
+from utils import metrics
+
+
+@unittest.skipIf(metrics.prometheus_client is None, 'prometheus_client chưa được cài')
+class TestMetricsEndpoint(unittest.TestCase):
+    """Kiểm tra histogram theo endpoint và token bảo vệ /metrics"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        app.config['METRICS_TOKEN'] = ''
+
+    def test_latency_histogram_labelled_by_endpoint(self):
+        self.client.get('/healthz')
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('qlts_http_request_duration_seconds_count{endpoint="healthz",method="GET",status="200"}', body)
+        self.assertIn('qlts_http_requests_in_progress', body)
+        self.assertIn('qlts_db_pool_checked_out', body)
+
+    def test_export_duration_recorded(self):
+        metrics.observe_export('csv', 0.2)
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('qlts_export_duration_seconds_count{format="csv"}', body)
+
+    def test_token_required_when_configured(self):
+        app.config['METRICS_TOKEN'] = 'secret'
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
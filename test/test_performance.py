@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark theo route với ngân sách độ trễ, số truy vấn và bộ nhớ (test/perf_budgets.json)
+
+Biến môi trường:
+    PERF_SCALES          Danh sách quy mô dữ liệu, ví dụ "2k,100k" (mặc định "2k")
+    PERF_ITERATIONS      Số lần đo mỗi route (mặc định 5)
+    PERF_LATENCY_SLACK   Hệ số nhân ngân sách độ trễ cho máy chậm (mặc định 1.0)
+    PERF_REPORT          Ghi kết quả đo ra file JSON
+    PERF_UPDATE_BUDGETS  =1 để ghi lại ngân sách từ kết quả đo (kèm biên an toàn)
+"""
+
+import gc
+import importlib.util
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from flask import has_request_context
+from sqlalchemy import event
+
+from app import app, db
+from models import Role, User
+from utils.fixtures import parse_scale, generate
+
+BUDGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perf_budgets.json')
+SCALES = [s.strip() for s in os.getenv('PERF_SCALES', '2k').split(',') if s.strip()]
+ITERATIONS = max(int(os.getenv('PERF_ITERATIONS', '5')), 1)
+LATENCY_SLACK = float(os.getenv('PERF_LATENCY_SLACK', '1.0'))
+
+ROUTES = [
+    '/',
+    '/assets',
+    '/maintenance',
+    '/maintenance/dashboard',
+    '/maintenance/report',
+    '/audit-logs',
+    '/trash',
+    '/assets/export/csv',
+    '/assets/export/json',
+]
+# Export formats backed by optional libraries are only measured when installed
+OPTIONAL_ROUTES = {
+    '/assets/export/xlsx': 'pandas',
+    '/assets/export/docx': 'docx',
+    '/assets/export/pdf': 'reportlab',
+}
+
+
+
+class QueryCounter:
+    """Statements run inside request handling, including streamed bodies
+    (the Server-Timing header is sent before a streamed body runs its queries)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile (ms)."""
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def load_budgets():
+    with open(BUDGETS_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class TestRouteBudgets(unittest.TestCase):
+    """Đo p50/p95, số truy vấn và bộ nhớ đỉnh cho từng route ở mỗi quy mô dữ liệu"""
+
+    results = {}
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['TESTING'] = True
+        cls.export_dir = tempfile.mkdtemp()
+        cls._old_export_dir = app.config.get('EXPORT_DIR')
+        app.config['EXPORT_DIR'] = cls.export_dir
+        cls.budgets = load_budgets()
+
+    @classmethod
+    def tearDownClass(cls):
+        app.config['EXPORT_DIR'] = cls._old_export_dir
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        report = os.getenv('PERF_REPORT')
+        if report:
+            with open(report, 'w', encoding='utf-8') as f:
+                json.dump(cls.results, f, ensure_ascii=False, indent=2)
+        if os.getenv('PERF_UPDATE_BUDGETS') == '1' and cls.results:
+            cls._write_budgets()
+
+    @classmethod
+    def _write_budgets(cls):
+        budgets = load_budgets()
+        for scale, routes in cls.results.items():
+            budgets[scale] = {
+                path: {
+                    # Latency and memory vary between runs; query counts are deterministic
+                    'p95_ms': round(max(r['p95_ms'] * 3, 20), 1),
+                    'queries': r['queries'],
+                    'peak_kb': int(max(r['peak_kb'] * 1.5, 256)),
+                }
+                for path, r in routes.items()
+            }
+        with open(BUDGETS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(budgets, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def load_dataset(self, scale):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            generate(db.engine, parse_scale(scale), seed=42, password_hash='x', log=lambda msg: None)
+            admin_role = Role.query.filter_by(name='admin').first()
+            user = User(username='perf_admin', email='perf_admin@example.com', role_id=admin_role.id)
+            user.set_password('admin123')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    def routes(self):
+        paths = list(ROUTES)
+        for path, module in OPTIONAL_ROUTES.items():
+            if importlib.util.find_spec(module) is not None:
+                paths.append(path)
+        return paths
+
+    def measure(self, client, path):
+        # Warm-up: template compilation and the dashboard's one-off auto-scheduling
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        samples = []
+        queries = 0
+        with app.app_context():
+            engine = db.engine
+        # Collections triggered by garbage left over from earlier tests are the
+        # main source of outliers; like timeit, keep the collector out of samples
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(ITERATIONS):
+                with QueryCounter(engine) as counter:
+                    started = time.perf_counter()
+                    client.get(path).get_data()
+                    samples.append((time.perf_counter() - started) * 1000)
+                queries = max(queries, counter.count)
+        finally:
+            gc.enable()
+        tracemalloc.start()
+        try:
+            client.get(path).get_data()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'queries': queries,
+            'peak_kb': peak // 1024,
+        }
+
+    def check_scale(self, scale):
+        user_id = self.load_dataset(scale)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = 'perf_admin'
+            sess['role'] = 'admin'
+
+        budgets = self.budgets.get(scale, {})
+        measured = self.results.setdefault(scale, {})
+        for path in self.routes():
+            result = measured[path] = self.measure(client, path)
+            budget = budgets.get(path)
+            if budget is None or os.getenv('PERF_UPDATE_BUDGETS') == '1':
+                continue
+            with self.subTest(scale=scale, path=path):
+                self.assertLessEqual(result['queries'], budget['queries'], f'{path}: {result}')
+                self.assertLessEqual(result['p95_ms'], budget['p95_ms'] * LATENCY_SLACK, f'{path}: {result}')
+                self.assertLessEqual(result['peak_kb'], budget['peak_kb'], f'{path}: {result}')
+
+
+def _make_test(scale):
+    def test(self):
+        self.check_scale(scale)
+    test.__doc__ = f'Ngân sách hiệu năng ở quy mô {scale}'
+    return test
+
+
+for _scale in SCALES:
+    setattr(TestRouteBudgets, f'test_budgets_{_scale}', _make_test(_scale))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test cho profiler theo yêu cầu (?_profile=1, chỉ admin)
+"""
+
+import os
+import tempfile
+import unittest
+
+from app import app, db
+from models import Role, User
+
+
+class TestProfiler(unittest.TestCase):
+    """Kiểm tra báo cáo profile cho admin và bỏ qua với người dùng thường"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.profile_dir = tempfile.mkdtemp()
+        app.config['PROFILE_DIR'] = self.profile_dir
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+    def tearDown(self):
+        app.config['PROFILE_DIR'] = 'instance/profiles'
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, role):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = role
+
+    def test_admin_gets_report_and_files_saved(self):
+        self.login('admin')
+        response = self.client.get('/assets?_profile=1')
+        body = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Flame graph', body)
+        self.assertIn('SELECT', body)
+        saved = os.listdir(self.profile_dir)
+        self.assertTrue(any(f.endswith('.prof') for f in saved))
+        self.assertTrue(any(f.endswith('.html') for f in saved))
+
+    def test_streamed_pages_are_profiled(self):
+        self.login('admin')
+        for path in ('/trash', '/trash?module=assets', '/maintenance/dashboard'):
+            response = self.client.get(path + ('&' if '?' in path else '?') + '_profile=1')
+            body = response.get_data(as_text=True)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertIn('Flame graph', body, path)
+            # The template ran while profiling: its queries are in the report
+            self.assertIn('SELECT', body, path)
+
+    def test_non_admin_is_ignored(self):
+        self.login('user')
+        response = self.client.get('/assets?_profile=1')
+        self.assertNotIn('Flame graph', response.get_data(as_text=True))
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test cho gộp các tính toán giống nhau đang chạy đồng thời (utils/singleflight.py)
+"""
+
+import fcntl
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from app import app
+from utils import singleflight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.saved = app.config['SINGLE_FLIGHT_DIR']
+        app.config['SINGLE_FLIGHT_DIR'] = self.directory
+        self.calls = 0
+
+    def tearDown(self):
+        app.config['SINGLE_FLIGHT_DIR'] = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def compute(self, value='computed', delay=0.0):
+        self.calls += 1
+        time.sleep(delay)
+        return {'value': value}
+
+    def run_threads(self, count, target):
+        results = [None] * count
+
+        def worker(i):
+            with app.app_context():
+                try:
+                    results[i] = target()
+                except Exception as exc:  # noqa: BLE001 - collected for the assertion
+                    results[i] = exc
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_callers_share_one_computation(self):
+        results = self.run_threads(8, lambda: singleflight.do(('dashboard', 1), lambda: self.compute(delay=0.2)))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'value': 'computed'}] * 8)
+        # The flight has landed: a later caller computes again (no caching)
+        with app.app_context():
+            singleflight.do(('dashboard', 1), self.compute)
+        self.assertEqual(self.calls, 2)
+
+    def test_waiters_get_the_error(self):
+        def fail():
+            self.calls += 1
+            time.sleep(0.2)
+            raise ValueError('boom')
+
+        results = self.run_threads(4, lambda: singleflight.do('failing', fail))
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_result_from_other_worker_is_shared(self):
+        key = ('schedule', 7)
+        path = os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+        # Another worker is computing this key: it holds the lock file
+        fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.call_in_app(key)))
+        thread.start()
+        time.sleep(0.1)
+        with open(path, 'wb') as f:
+            pickle.dump({'value': 'from other worker'}, f)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        thread.join()
+        self.assertEqual(results, [{'value': 'from other worker'}])
+        self.assertEqual(self.calls, 0)
+
+    def test_result_of_earlier_flight_is_ignored(self):
+        key = ('schedule', 8)
+        path = os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+        with open(path, 'wb') as f:
+            pickle.dump({'value': 'stale'}, f)
+        past = time.time() - 5
+        os.utime(path, (past, past))
+        self.assertEqual(self.call_in_app(key), {'value': 'computed'})
+        self.assertEqual(self.calls, 1)
+
+    def test_shared_directory_open_to_others_is_not_trusted(self):
+        os.chmod(self.directory, 0o777)
+        key = ('schedule', 9)
+        path = os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+        # Another local user plants a result while we wait: it is never unpickled
+        with open(path, 'wb') as f:
+            pickle.dump({'value': 'planted'}, f)
+        os.utime(path, (time.time() + 60, time.time() + 60))
+        with self.assertLogs('qlts.singleflight', 'WARNING'):
+            self.assertEqual(self.call_in_app(key), {'value': 'computed'})
+        self.assertEqual(self.calls, 1)
+
+    def test_default_directory_is_private_under_instance(self):
+        app.config['SINGLE_FLIGHT_DIR'] = None
+        singleflight.init_app(app)
+        directory = app.config['SINGLE_FLIGHT_DIR']
+        self.assertEqual(os.path.dirname(directory), app.instance_path)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+    def call_in_app(self, key):
+        with app.app_context():
+            return singleflight.do(key, self.compute)
+
+
+if __name__ == '__main__':
+    unittest.main()
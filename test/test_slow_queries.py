@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test cho nhật ký truy vấn chậm và EXPLAIN (utils/slow_queries.py)
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+from utils import background, slow_queries
+
+
+class TestSlowQueries(unittest.TestCase):
+    """Kiểm tra ghi log truy vấn vượt ngưỡng kèm kế hoạch thực thi"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.log_dir = tempfile.mkdtemp()
+        app.config['SLOW_QUERY_MS'] = 0.0001
+        app.config['SLOW_QUERY_LOG'] = os.path.join(cls.log_dir, 'slow.log')
+        slow_queries.init_app(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        slow_queries._threshold_ms = 0
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            t = AssetType(name='Máy tính')
+            db.session.add_all([user, t])
+            db.session.flush()
+            db.session.add(Asset(name='TS-1', price=1000, quantity=1, asset_type_id=t.id))
+            db.session.commit()
+            self.user_id = user.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self, role='admin'):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = role
+
+    def test_param_shapes_hide_values(self):
+        self.assertEqual(slow_queries.param_shapes((1, 'x')), ['int', 'str'])
+        self.assertEqual(slow_queries.param_shapes({'a': 1.5}), {'a': 'float'})
+        self.assertEqual(slow_queries.param_shapes([(1,), (2,)], True), {'rows': 2, 'row': ['int']})
+
+    def test_slow_statement_logged_with_plan(self):
+        self.login()
+        self.client.get('/assets?type_id=1')
+        background.drain(timeout=10)
+        with open(app.config['SLOW_QUERY_LOG'], encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        selects = [r for r in records if r['sql'].startswith('SELECT') and r['route'] == 'assets']
+        self.assertTrue(selects)
+        self.assertTrue(any(r['plan'] for r in selects))
+        self.assertTrue(slow_queries.top_offenders())
+
+    def test_pool_size_from_config(self):
+        background.drain(timeout=10)
+        saved = app.config['BACKGROUND_WORKERS']
+        app.config['BACKGROUND_WORKERS'] = 3
+        try:
+            background.init_app(app)
+            self.assertEqual(background.submit(lambda: 1).result(timeout=5), 1)
+            self.assertEqual(background._executor._max_workers, 3)
+        finally:
+            background.drain(timeout=10)
+            app.config['BACKGROUND_WORKERS'] = saved
+            background.init_app(app)
+
+    def test_admin_page_requires_admin(self):
+        self.login(role='user')
+        self.assertEqual(self.client.get('/dev/slow-queries').status_code, 302)
+        self.login()
+        response = self.client.get('/dev/slow-queries')
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test cho lớp truy vấn bỏ qua bản ghi đã xóa mềm (utils/soft_delete.py) và index một phần
+"""
+
+import unittest
+from datetime import date
+
+from app import app, db
+from models import Asset, AssetType, MaintenanceRecord, Role, User
+from utils import queries, soft_delete
+
+
+class TestSoftDelete(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            live = Asset(name='PC-live', price=1, asset_type_id=pc.id)
+            gone = Asset(name='PC-gone', price=1, asset_type_id=pc.id)
+            db.session.add_all([live, gone])
+            db.session.flush()
+            record = MaintenanceRecord(asset_id=gone.id, maintenance_date=date.today(), type='maintenance',
+                                       description='Kiểm tra', cost=0, status='completed')
+            db.session.add(record)
+            gone.soft_delete()
+            db.session.commit()
+            self.ids = {'user': user.id, 'type': pc.id, 'live': live.id, 'gone': gone.id, 'record': record.id}
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.ids['user']
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_queries_skip_trashed_rows(self):
+        with app.app_context():
+            self.assertEqual([a.name for a in queries.asset_list_query().all()], ['PC-live'])
+            self.assertEqual(Asset.query.count(), 1)
+            self.assertEqual(Asset.query.filter(Asset.price > 0).count(), 1)
+            self.assertIsNone(db.session.get(Asset, self.ids['gone']))
+            self.assertEqual(queries.asset_facet_counts()['status'], [('active', 1)])
+
+    def test_include_deleted_opts_in(self):
+        with app.app_context():
+            query = Asset.query.execution_options(include_deleted=True)
+            self.assertEqual(query.count(), 2)
+            gone = db.session.get(Asset, self.ids['gone'], execution_options={'include_deleted': True})
+            self.assertEqual(gone.name, 'PC-gone')
+
+    def test_collections_hide_trashed_but_references_resolve(self):
+        with app.app_context():
+            pc = db.session.get(AssetType, self.ids['type'])
+            self.assertEqual([a.name for a in pc.assets], ['PC-live'])
+            # A live record of a trashed asset still shows which asset it was
+            record = db.session.get(MaintenanceRecord, self.ids['record'])
+            self.assertEqual(record.asset.name, 'PC-gone')
+
+    def test_delete_route_moves_to_trash(self):
+        response = self.client.get(f"/assets/delete/{self.ids['live']}")
+        self.assertEqual(response.status_code, 302)
+        with app.app_context():
+            asset = db.session.get(Asset, self.ids['live'], execution_options={'include_deleted': True})
+            self.assertIsNotNone(asset.deleted_at)
+            self.assertEqual(Asset.query.count(), 0)
+        # Its type now has no live assets and may be deleted as well
+        response = self.client.post(f"/asset-types/delete/{self.ids['type']}")
+        self.assertTrue(response.get_json()['success'])
+        response = self.client.get('/trash?module=assets')
+        self.assertIn('PC-live', response.get_data(as_text=True))
+
+    def test_name_of_trashed_user_is_reported_not_a_crash(self):
+        form = {'username': 'bob', 'email': 'bob@example.com', 'password': 'bob12345', 'role_id': '1'}
+        self.client.post('/users/add', data=form)
+        with app.app_context():
+            bob = User.query.filter_by(username='bob').one()
+            bob_id = bob.id
+        self.client.post(f'/users/delete/{bob_id}')
+        # UNIQUE still holds for the trashed row: the admin is told what to do
+        response = self.client.post('/users/add', data=form, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('thùng rác', response.get_data(as_text=True))
+        response = self.client.post(f"/users/edit/{self.ids['user']}", data={
+            'username': 'admin', 'email': 'bob@example.com', 'role_id': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('thùng rác', response.get_data(as_text=True))
+        with app.app_context():
+            self.assertEqual(User.query.execution_options(include_deleted=True).filter_by(username='bob').count(), 1)
+            self.assertEqual(db.session.get(User, self.ids['user']).email, 'admin@example.com')
+
+    def test_live_queries_use_partial_index(self):
+        with app.app_context():
+            statement = soft_delete.live_only(queries.asset_list_query(status='active').statement)
+            sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+            self.assertIn('deleted_at IS NULL', sql)
+            plan = [row[-1] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + sql))]
+        self.assertTrue(any('ix_asset_live_status' in line for line in plan), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
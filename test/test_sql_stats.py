@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test cho bộ đếm truy vấn SQL theo request (utils/sql_stats.py)
+"""
+
+import unittest
+
+from app import app, db
+from models import Asset, AssetType, Role, User
+from utils import sql_stats
+
+
+class TestSqlStats(unittest.TestCase):
+    """Kiểm tra Server-Timing, phát hiện N+1 và tổng hợp trong /dev/diag"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            t = AssetType(name='Máy tính')
+            db.session.add_all([user, t])
+            db.session.flush()
+            for i in range(3):
+                db.session.add(Asset(name=f'TS-{i}', price=1000, quantity=1, asset_type_id=t.id, user_id=user.id))
+            db.session.commit()
+            self.user_id = user.id
+        sql_stats.reset()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def login(self):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def test_fingerprint_collapses_literals(self):
+        a = sql_stats.fingerprint("SELECT * FROM asset WHERE id = 5 AND name = 'x'")
+        b = sql_stats.fingerprint("SELECT *  FROM asset WHERE id = 42 AND name = 'yy'")
+        self.assertEqual(a, b)
+        self.assertEqual(sql_stats.fingerprint('SELECT 1 WHERE id IN (?, ?, ?)'),
+                         sql_stats.fingerprint('SELECT 1 WHERE id IN (?)'))
+
+    def test_server_timing_header(self):
+        self.login()
+        response = self.client.get('/assets')
+        self.assertEqual(response.status_code, 200)
+        header = response.headers.get('Server-Timing', '')
+        self.assertIn('db;dur=', header)
+        self.assertIn('queries', header)
+
+    def test_repeated_statements_detected(self):
+        stats = sql_stats.RequestQueryStats()
+        for i in range(12):
+            stats.record(f'SELECT * FROM maintenance_record WHERE asset_id = {i}', 0.1)
+        stats.record('SELECT count(*) FROM asset', 0.1)
+        repeated = stats.repeated(10)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][1], 12)
+
+    def test_diag_lists_endpoint_aggregates(self):
+        self.login()
+        self.client.get('/assets')
+        self.client.get('/assets')
+        data = self.client.get('/dev/diag').get_json()
+        self.assertIn('assets', data['sql_by_endpoint'])
+        self.assertEqual(data['sql_by_endpoint']['assets']['requests'], 2)
+        self.assertGreater(data['sql_by_endpoint']['assets']['avg_queries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
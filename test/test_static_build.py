@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test cho đóng gói static: hash nội dung, nén sẵn, manifest và vendor_url (utils/static_build.py)
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string, url_for
+
+from app import app as main_app
+from utils import static_build
+
+FONT_CSS = b"@font-face{src:url(../webfonts/fa.woff2) format('woff2'),url('https://fonts.example/s/a.ttf')}"
+
+
+def fake_fetch(url):
+    if url.endswith('.css') or 'fonts.googleapis' in url:
+        return FONT_CSS
+    return b'/* ' + url.encode('ascii') + b' */'
+
+
+class TestStaticBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = os.path.join(tempfile.mkdtemp(), 'static')
+        shutil.copytree(main_app.static_folder, self.static_dir,
+                        ignore=shutil.ignore_patterns('dist', 'vendor'))
+        self.fetched = []
+
+        def fetch(url):
+            self.fetched.append(url)
+            return fake_fetch(url)
+
+        self.manifest = static_build.build(self.static_dir, fetch=fetch, log=lambda message: None)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.static_dir), ignore_errors=True)
+
+    def make_app(self, debug=False):
+        app = Flask(__name__, static_folder=self.static_dir)
+        app.debug = debug
+        static_build.init_app(app)
+        return app
+
+    def test_bundles_are_hashed_minified_and_precompressed(self):
+        hashed = self.manifest['css/custom.css']
+        self.assertRegex(hashed, r'^dist/css/custom\.[0-9a-f]{10}\.css$')
+        path = os.path.join(self.static_dir, hashed)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertLess(len(data), os.path.getsize(os.path.join(self.static_dir, 'css/custom.css')))
+        self.assertNotIn(b'/*', data)
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), data)
+        # Same sources, same names: rebuilding does not bust browser caches
+        again = static_build.build(self.static_dir, vendor=False, log=lambda message: None)
+        self.assertEqual(again['css/custom.css'], hashed)
+
+    def test_vendor_css_references_are_downloaded(self):
+        css_path = os.path.join(self.static_dir, self.manifest['vendor:fontawesome.css'])
+        with open(css_path, encoding='utf-8') as f:
+            css = f.read()
+        self.assertIn('url(../webfonts/fa.woff2)', css)
+        self.assertIn('url(files/a.ttf)', css)
+        self.assertIn('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/webfonts/fa.woff2', self.fetched)
+        vendor_root = os.path.join(self.static_dir, 'vendor', 'font-awesome', '6.0.0')
+        self.assertTrue(os.path.exists(os.path.join(vendor_root, 'webfonts', 'fa.woff2')))
+        self.assertTrue(os.path.exists(os.path.join(vendor_root, 'css', 'files', 'a.ttf.gz')))
+
+    def test_url_for_and_vendor_url_use_manifest(self):
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(url_for('static', filename='js/custom.js'), '/static/' + self.manifest['js/custom.js'])
+            self.assertEqual(url_for('static', filename='img/logo.png'), '/static/img/logo.png')
+            html = render_template_string("{{ vendor_url('jquery.js') }}")
+            self.assertEqual(html, '/static/vendor/jquery/3.6.0/jquery.min.js')
+        client = app.test_client()
+        response = client.get('/static/' + self.manifest['js/custom.js'])
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        response.close()
+        # Debug serves the sources being edited, not the last build
+        with self.make_app(debug=True).test_request_context():
+            self.assertEqual(url_for('static', filename='js/custom.js'), '/static/js/custom.js')
+
+    def test_unbuilt_tree_falls_back_to_sources_and_cdn(self):
+        shutil.rmtree(os.path.join(self.static_dir, 'dist'))
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(url_for('static', filename='js/custom.js'), '/static/js/custom.js')
+            self.assertEqual(render_template_string("{{ vendor_url('jquery.js') }}"),
+                             static_build.VENDOR['jquery.js'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test cho render dạng stream của các trang danh sách dài (/trash, dashboard bảo trì)
+"""
+
+import re
+import unittest
+from datetime import date, timedelta
+
+from app import app, db
+from models import Asset, AssetType, MaintenanceRecord, Role, User
+from utils import sql_stats
+
+
+class TestStreamedPages(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        sql_stats.reset()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            assets = [Asset(name=f'PC-{i:03d}', price=1, asset_type_id=pc.id) for i in range(120)]
+            db.session.add_all(assets)
+            db.session.flush()
+            for i, asset in enumerate(assets):
+                db.session.add(MaintenanceRecord(asset_id=asset.id, maintenance_date=date.today(),
+                                                 next_due_date=date.today() + timedelta(days=1 + i % 20),
+                                                 type='maintenance', status='scheduled'))
+                if i % 2:
+                    asset.soft_delete()
+            db.session.commit()
+            self.user_id = user.id
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_trash_is_streamed_in_chunks(self):
+        app.config['STREAM_CHUNK_BYTES'] = 4096
+        try:
+            response = self.client.get('/trash?module=assets', buffered=False)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(response.headers['X-Accel-Buffering'], 'no')
+            chunks = list(response.response)
+            response.close()
+        finally:
+            app.config['STREAM_CHUNK_BYTES'] = 16384
+        body = b''.join(chunks).decode()
+        self.assertGreater(len(chunks), 3)
+        self.assertIn('Tài sản (60)', body)
+        # First page of the cursor pagination (TRASH_PAGE_SIZE)
+        self.assertEqual(body.count('action="/trash/restore?module=asset&amp;id='), 50)
+        self.assertIn('</html>', body)
+
+    def test_sql_log_counts_queries_of_streamed_body(self):
+        response = self.client.get('/trash?module=assets')
+        response.get_data()
+        response.close()
+        header = int(re.search(r'"(\d+) queries"', response.headers['Server-Timing']).group(1))
+        logged = sql_stats.endpoint_summary()['trash']['max_queries']
+        # The header only covers the count queries run before the first byte
+        self.assertGreater(logged, header)
+
+    def test_dashboard_streams_upcoming_list(self):
+        response = self.client.get('/maintenance/dashboard')
+        self.assertTrue(response.is_streamed)
+        body = response.get_data(as_text=True)
+        # The upcoming list has no LIMIT: every record due within 30 days is rendered
+        self.assertEqual(body.count('Còn '), 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
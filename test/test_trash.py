@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Test cho thùng rác: phân trang theo cursor, đếm badge bằng một truy vấn, chỉ tải phân hệ đang chọn,
+khôi phục / xóa vĩnh viễn hàng loạt bằng SQL theo tập, xóa theo hạn lưu giữ (flask purge-trash)
+"""
+
+import re
+import unittest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Asset, AssetType, AuditLog, MaintenanceRecord, Role, User
+from utils import counters, trash
+from utils.queries import KeysetPage, trash_counts
+
+
+class TestTrash(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            user = User(username='admin', email='admin@example.com', role_id=role.id)
+            user.set_password('admin123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add_all([user, pc])
+            db.session.flush()
+            base = datetime(2024, 5, 1, 8, 0)
+            for i in range(25):
+                # Pairs share a deletion time: the id breaks the tie
+                db.session.add(Asset(name=f'PC-{i:02d}', price=1, asset_type_id=pc.id,
+                                     deleted_at=base + timedelta(minutes=i // 2)))
+            db.session.add(Asset(name='PC-live', price=1, asset_type_id=pc.id))
+            db.session.commit()
+            self.user_id = user.id
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def statements_of(self, path):
+        with app.app_context():
+            engine = db.engine
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get(path)
+            body = response.get_data(as_text=True)
+            response.close()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return body, statements
+
+    def test_cursor_pages_cover_trash_once_newest_first(self):
+        names, after = [], None
+        with app.app_context():
+            while True:
+                page = KeysetPage(Asset, after=after, per_page=10)
+                names.extend(a.name for a in page.rows)
+                after = page.next_cursor
+                if not after:
+                    break
+        self.assertEqual(names, [f'PC-{i:02d}' for i in range(24, -1, -1)])
+
+    def test_counts_in_one_query(self):
+        with app.app_context():
+            self.assertEqual(trash_counts(), {'assets': 25, 'asset_types': 0, 'users': 0, 'maintenance': 0})
+        body, statements = self.statements_of('/trash')
+        self.assertIn('Tài sản (25)', body)
+        self.assertEqual(len([s for s in statements if 'UNION ALL' in s]), 1)
+        # The overview loads no rows of any module
+        self.assertFalse([s for s in statements if re.match(r'SELECT asset\.id', s)])
+
+    def test_next_page_link_continues_after_last_row(self):
+        app.config['TRASH_PAGE_SIZE'] = 10
+        try:
+            body, _ = self.statements_of('/trash?module=assets')
+            self.assertIn('PC-24', body)
+            self.assertNotIn('PC-14', body)
+            link = re.search(r'href="(/trash\?[^"]*after=[^"]+)"', body).group(1).replace('&amp;', '&')
+            body, statements = self.statements_of(link)
+        finally:
+            app.config['TRASH_PAGE_SIZE'] = 50
+        self.assertIn('PC-14', body)
+        self.assertNotIn('PC-15', body)
+        self.assertIn('11–20 / 25', body)
+        page_sql = [s for s in statements if re.match(r'SELECT asset\.id', s)][0]
+        with app.app_context(), db.engine.connect() as conn:
+            # The plan does not depend on the bound values
+            params = (None,) * page_sql.count('?')
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + page_sql, params)]
+        self.assertTrue(any('ix_asset_trash_order' in line for line in plan), plan)
+
+    def test_bad_cursor_shows_first_page(self):
+        body, _ = self.statements_of('/trash?module=assets&after=garbage&start=40')
+        self.assertIn('PC-24', body)
+        self.assertIn('<td>1</td>', body)
+
+
+
+class TestBulkTrashActions(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            role = Role(name='admin', description='Quản trị')
+            db.session.add(role)
+            db.session.flush()
+            admin = User(username='admin', email='admin@example.com', role_id=role.id)
+            admin.set_password('admin123')
+            former = User(username='former', email='former@example.com', role_id=role.id)
+            former.set_password('former123')
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            unused = AssetType(name='Máy fax', description='Không còn dùng')
+            db.session.add_all([admin, former, pc, unused])
+            db.session.flush()
+            assets = [Asset(name=f'PC-{i:02d}', price=100, asset_type_id=pc.id, user_id=former.id) for i in range(12)]
+            db.session.add_all(assets)
+            db.session.flush()
+            for asset in assets:
+                asset.assigned_users.append(former)
+                db.session.add(MaintenanceRecord(asset_id=asset.id, maintenance_date=date.today(), type='maintenance',
+                                                 description='Kiểm tra', cost=0, status='completed'))
+            db.session.add(AuditLog(user_id=former.id, module='assets', action='create', entity_id=assets[0].id))
+            db.session.flush()
+            for asset in assets[:10]:
+                asset.soft_delete()
+            former.soft_delete()
+            pc.soft_delete()
+            unused.soft_delete()
+            db.session.commit()
+            self.ids = {'admin': admin.id, 'former': former.id, 'pc': pc.id, 'unused': unused.id,
+                        'assets': [a.id for a in assets]}
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.ids['admin']
+            sess['username'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assertConsistent(self):
+        with db.engine.connect() as conn:
+            actual = counters.compute(conn)
+        stored = {k: v for k, v in counters.snapshot().items() if not k.startswith(counters.VERSION_PREFIX)}
+        self.assertEqual({k: v for k, v in actual.items() if v}, {k: v for k, v in stored.items() if v})
+
+    def trash_entries(self):
+        return AuditLog.query.filter_by(module='trash').all()
+
+    def test_restore_checked_rows(self):
+        chosen = self.ids['assets'][:3]
+        response = self.client.post('/trash/restore', data={'module': 'assets', 'ids': [str(i) for i in chosen]})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('module=assets', response.headers['Location'])
+        with app.app_context():
+            restored = Asset.query.filter(Asset.id.in_(chosen)).all()
+            self.assertEqual(len(restored), 3)
+            self.assertTrue(all(a.status == 'active' for a in restored))
+            self.assertEqual(trash_counts()['assets'], 7)
+            self.assertConsistent()
+            [entry] = self.trash_entries()
+            self.assertEqual((entry.action, entry.details), ('restore', 'module=assets; assets=3'))
+
+    def test_restore_mixed_selection_counts_only_trashed_rows(self):
+        live, trashed = self.ids['assets'][10], self.ids['assets'][0]
+        response = self.client.post('/trash/restore', data={'module': 'assets', 'ids': [str(live), str(trashed)]})
+        self.assertEqual(response.status_code, 302)
+        with app.app_context():
+            self.assertEqual(counters.snapshot()['assets'], 3)
+            self.assertConsistent()
+            [entry] = self.trash_entries()
+            self.assertEqual(entry.details, 'module=assets; assets=1')
+
+    def test_purge_all_is_set_based_and_removes_children(self):
+        with app.app_context():
+            engine = db.engine
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.post('/trash/permanent-delete', data={'module': 'assets', 'all': '1'})
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 302)
+        # One batch: a fixed number of statements, not one round-trip per asset
+        self.assertLess(len(statements), 30)
+        with app.app_context():
+            self.assertEqual(Asset.query.execution_options(include_deleted=True).count(), 2)
+            self.assertEqual(MaintenanceRecord.query.count(), 2)
+            self.assertConsistent()
+            [entry] = self.trash_entries()
+            self.assertEqual(entry.details, 'module=assets; asset=10, maintenance_record=10')
+
+    def test_asset_type_in_use_is_kept(self):
+        self.client.post('/trash/permanent-delete', data={'module': 'asset_types', 'all': '1'})
+        with app.app_context():
+            kept = AssetType.query.execution_options(include_deleted=True).all()
+            self.assertEqual([t.id for t in kept], [self.ids['pc']])
+            self.assertIn('skipped=1', self.trash_entries()[0].details)
+
+    def test_purged_user_leaves_no_references(self):
+        response = self.client.post('/trash/permanent-delete', data={'module': 'user', 'id': str(self.ids['former'])})
+        self.assertEqual(response.status_code, 302)
+        with app.app_context():
+            self.assertIsNone(db.session.get(User, self.ids['former'], execution_options={'include_deleted': True}))
+            assets = Asset.query.execution_options(include_deleted=True).all()
+            self.assertTrue(all(a.user_id is None and not a.assigned_users for a in assets))
+            self.assertIsNone(AuditLog.query.filter_by(module='assets').one().user_id)
+
+
+class TestTrashRetention(unittest.TestCase):
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.now = datetime(2024, 9, 1, 2, 0)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            pc = AssetType(name='Máy tính', description='Máy tính để bàn')
+            db.session.add(pc)
+            db.session.flush()
+            for i in range(7):
+                # 5 assets trashed 120 days ago, 2 trashed last week
+                age = 120 if i < 5 else 7
+                asset = Asset(name=f'PC-{i}', price=10, asset_type_id=pc.id)
+                db.session.add(asset)
+                db.session.flush()
+                db.session.add(MaintenanceRecord(asset_id=asset.id, maintenance_date=date(2024, 1, 10),
+                                                 type='maintenance', description='Kiểm tra', cost=0,
+                                                 status='completed'))
+                asset.soft_delete()
+                asset.deleted_at = self.now - timedelta(days=age)
+            db.session.add(Asset(name='PC-live', price=10, asset_type_id=pc.id))
+            # Old trash, but its type is still used by the assets above: kept
+            pc.soft_delete()
+            pc.deleted_at = self.now - timedelta(days=400)
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def remaining(self):
+        return (Asset.query.execution_options(include_deleted=True).count(),
+                MaintenanceRecord.query.execution_options(include_deleted=True).count())
+
+    def test_expired_rows_purged_in_batches_with_children(self):
+        with app.app_context():
+            commits = []
+            record = lambda session: commits.append(session)  # noqa: E731
+            event.listen(db.session, 'after_commit', record)
+            try:
+                result = trash.purge_expired({'assets': 90, 'asset_types': 90}, batch_size=2, pause=0,
+                                             now=self.now)
+            finally:
+                event.remove(db.session, 'after_commit', record)
+            self.assertEqual(result, {'asset': 5, 'maintenance_record': 5, 'skipped': 1})
+            # 3 short transactions for the 5 assets, 1 for the asset type
+            self.assertEqual(len(commits), 4)
+            self.assertEqual(self.remaining(), (3, 2))
+            self.assertEqual(AssetType.query.execution_options(include_deleted=True).count(), 1)
+            # Live records of the 2 recently trashed assets remain counted
+            with db.engine.connect() as conn:
+                self.assertEqual(counters.compute(conn)['maintenance'], 2)
+            self.assertEqual(counters.snapshot()['maintenance'], 2)
+
+    def test_module_without_retention_is_kept(self):
+        with app.app_context():
+            self.assertEqual(trash.purge_expired({'assets': 0, 'users': 30}, pause=0, now=self.now), {})
+            self.assertEqual(self.remaining(), (8, 7))
+
+    def test_cli_dry_run_then_purge(self):
+        runner = app.test_cli_runner()
+        saved = app.config['TRASH_PURGE_PAUSE']
+        app.config['TRASH_PURGE_PAUSE'] = 0
+        try:
+            # The cron job runs on the real clock: everything above is long expired
+            output = runner.invoke(args=['purge-trash', '--dry-run']).output
+            self.assertIn('Would purge: asset=7', output)
+            with app.app_context():
+                self.assertEqual(self.remaining(), (8, 7))
+            output = runner.invoke(args=['purge-trash']).output
+        finally:
+            app.config['TRASH_PURGE_PAUSE'] = saved
+        self.assertIn('Purged: asset=7, maintenance_record=7, skipped=1', output)
+        with app.app_context():
+            self.assertEqual(self.remaining(), (1, 0))
+            [entry] = AuditLog.query.filter_by(module='trash').all()
+            self.assertEqual(entry.action, 'retention')
+            self.assertIn('asset=7', entry.details)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Smoke test cho entry point production (wsgi.py / run.bootstrap_database)
+"""
+
+import os
+import unittest
+
+import wsgi
+from app import app, db
+from run import bootstrap_database
+from models import Role, User
+
+
+class TestWsgiEntryPoint(unittest.TestCase):
+    """Kiểm tra wsgi import được và bootstrap chạy lại nhiều lần không lỗi"""
+
+    def test_wsgi_exposes_app(self):
+        self.assertIs(wsgi.app, app)
+        response = app.test_client().get('/healthz')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bootstrap_is_idempotent(self):
+        bootstrap_database()
+        with app.app_context():
+            roles = Role.query.count()
+            users = User.query.count()
+        bootstrap_database()
+        with app.app_context():
+            self.assertEqual(Role.query.count(), roles)
+            self.assertEqual(User.query.count(), users)
+            admin = User.query.filter_by(username=app.config.get('ADMIN_USERNAME', 'admin')).first()
+            self.assertIsNotNone(admin)
+
+    def test_gunicorn_config_reads_env(self):
+        import runpy
+        saved_env = dict(os.environ)
+        self.addCleanup(lambda: (os.environ.clear(), os.environ.update(saved_env)))
+        conf = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py'))
+        self.assertTrue(conf['preload_app'])
+        self.assertGreaterEqual(conf['workers'], 1)
+        self.assertEqual(conf['max_requests'], app.config['WEB_MAX_REQUESTS'])
+
+
+if __name__ == '__main__':
+    unittest.main()
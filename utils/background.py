@@ -0,0 +1,66 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Set
+
+from flask import Flask
+
+# Small per-process thread pool for work that must not delay the response
+# (currently: EXPLAIN capture for slow queries). Created lazily so that a
+# pool started in the gunicorn master is never inherited by forked workers.
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_owner_pid: Optional[int] = None
+_pending: Set[Future] = set()
+_max_workers = 2
+
+
+def submit(fn: Callable, *args, **kwargs) -> Future:
+	"""Run fn(*args, **kwargs) in the background pool of the current process."""
+	global _executor, _owner_pid
+	with _lock:
+		if _executor is None or _owner_pid != os.getpid():
+			_executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='qlts-bg')
+			_owner_pid = os.getpid()
+			_pending.clear()
+		# Registered under the same lock as the executor lookup so that a
+		# concurrent drain() either sees this future or refuses the task.
+		future = _executor.submit(fn, *args, **kwargs)
+		_pending.add(future)
+	future.add_done_callback(_discard)
+	return future
+
+
+def _discard(future: Future) -> None:
+	with _lock:
+		_pending.discard(future)
+
+
+def pending_count() -> int:
+	with _lock:
+		return len(_pending)
+
+
+def drain(timeout: Optional[float] = None) -> int:
+	"""Wait up to `timeout` seconds for queued work, then stop the pool.
+
+	Tasks that have not started by then are cancelled. Tasks already running
+	cannot be interrupted: the interpreter still joins their threads at exit,
+	so keep background tasks short. Returns the number of unfinished tasks.
+	"""
+	global _executor
+	with _lock:
+		executor = _executor if _owner_pid == os.getpid() else None
+		futures = list(_pending)
+		_executor = None
+	if executor is None:
+		return 0
+	_, not_done = wait(futures, timeout=timeout)
+	executor.shutdown(wait=False, cancel_futures=True)
+	return len(not_done)
+
+
+def init_app(app: Flask) -> None:
+	"""Pool size from config (BACKGROUND_WORKERS); the pool itself starts on first submit."""
+	global _max_workers
+	_max_workers = max(1, int(app.config.get('BACKGROUND_WORKERS', 2)))
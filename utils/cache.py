@@ -0,0 +1,367 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utils import metrics
+
+# redis is optional: without CACHE_REDIS_URL (or the package) entries stay in
+# each worker and tag versions are shared through files in CACHE_TAG_DIR.
+try:
+	import redis  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+	redis = None
+
+logger = logging.getLogger('qlts.cache')
+
+_MISSING = object()
+# Tables whose writes fire a tag under another name; the rest use the table name
+TABLE_TAGS = {'maintenance_record': 'maintenance'}
+
+
+class LocalTags:
+	"""Tag versions for a single process (tests, dev server)."""
+
+	def __init__(self):
+		self._versions: Dict[str, int] = {}
+		self._lock = threading.Lock()
+
+	def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+		with self._lock:
+			return tuple(self._versions.get(t, 0) for t in tags)
+
+	def bump(self, tags: Iterable[str]) -> None:
+		with self._lock:
+			for tag in tags:
+				self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class FileTags:
+	"""Tag versions shared by the workers of one host: the mtime (ns) of
+	<directory>/<tag>. Reading is one stat() per tag."""
+
+	def __init__(self, directory: str):
+		os.makedirs(directory, exist_ok=True)
+		self.directory = directory
+
+	def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+		result = []
+		for tag in tags:
+			try:
+				result.append(os.stat(os.path.join(self.directory, tag)).st_mtime_ns)
+			except FileNotFoundError:
+				result.append(0)
+		return tuple(result)
+
+	def bump(self, tags: Iterable[str]) -> None:
+		for tag in tags:
+			path = os.path.join(self.directory, tag)
+			with open(path, 'a'):
+				pass
+			previous = os.stat(path).st_mtime_ns
+			now = max(time.time_ns(), previous + 1)
+			os.utime(path, ns=(now, now))
+
+
+class RedisTags:
+	"""Tag versions as integer keys on a Redis-protocol server (all hosts)."""
+
+	def __init__(self, client, prefix: str = 'qlts:tag:'):
+		self.client = client
+		self.prefix = prefix
+
+	def versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+		values = self.client.mget([self.prefix + t for t in tags])
+		return tuple(int(v or 0) for v in values)
+
+	def bump(self, tags: Iterable[str]) -> None:
+		pipe = self.client.pipeline()
+		for tag in tags:
+			pipe.incr(self.prefix + tag)
+		pipe.execute()
+
+
+class RedisTier:
+	"""Shared second tier: pickled entries with the server doing expiry."""
+
+	def __init__(self, client, prefix: str = 'qlts:cache:'):
+		self.client = client
+		self.prefix = prefix
+
+	def _key(self, name: str, key: Hashable) -> str:
+		return f"{self.prefix}{name}:{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()}"
+
+	def get(self, name: str, key: Hashable) -> Optional[bytes]:
+		return self.client.get(self._key(name, key))
+
+	def set(self, name: str, key: Hashable, payload: bytes, ttl: float) -> None:
+		self.client.set(self._key(name, key), payload, ex=max(1, int(ttl)))
+
+
+class _Backend:
+	"""Where tag versions live, the optional shared tier, and how often a
+	worker re-reads tag versions (the bound on cross-worker staleness)."""
+
+	def __init__(self, tags=None, shared=None, poll_interval: float = 1.0):
+		self.tags = tags or LocalTags()
+		self.shared = shared
+		self.poll_interval = poll_interval
+		self._seen: Dict[str, Tuple[float, int]] = {}
+		self._lock = threading.Lock()
+
+	def current(self, tags: Sequence[str]) -> Optional[Tuple[int, ...]]:
+		"""Versions of tags, re-read at most every poll_interval; None if unknown."""
+		now = time.monotonic()
+		with self._lock:
+			stale = [t for t in tags if t not in self._seen or now - self._seen[t][0] >= self.poll_interval]
+		if stale:
+			try:
+				fresh = self.tags.versions(stale)
+			except Exception:
+				logger.warning('Cache tag versions unavailable', exc_info=True)
+				return None
+			with self._lock:
+				for tag, version in zip(stale, fresh):
+					self._seen[tag] = (now, version)
+		with self._lock:
+			return tuple(self._seen[t][1] for t in tags)
+
+	def bump(self, tags: Sequence[str]) -> None:
+		try:
+			self.tags.bump(tags)
+		except Exception:
+			logger.warning('Cache tag invalidation not shared: %s', ', '.join(tags), exc_info=True)
+		with self._lock:
+			for tag in tags:
+				self._seen.pop(tag, None)
+
+
+_backend = _Backend()
+
+
+class LRUCache:
+	"""Thread-safe in-process LRU with a per-entry TTL; one instance per worker.
+
+	Keys should embed a data version (utils.counters.version) so writes make old
+	entries unreachable; the TTL only bounds how long a stale entry can linger
+	when a write bypassed the version stamps. Entries may also carry tags
+	(e.g. 'asset'): a commit writing the tagged table drops them here at once
+	and in other workers within CACHE_TAG_POLL_INTERVAL. With shared=True and a
+	shared tier configured (CACHE_REDIS_URL), entries are also written there,
+	so one worker's result serves the others.
+	"""
+
+	def __init__(self, name: str, maxsize: int = 256, ttl: float = 300.0, shared: bool = False):
+		self.name = name
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.shared = shared
+		self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.shared_hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	def get(self, key: Hashable, default: Any = None) -> Any:
+		now = time.monotonic()
+		with self._lock:
+			entry = self._data.get(key)
+		value = _MISSING
+		if entry is not None:
+			expires, cached, tags, stamp = entry
+			if expires > now and (not tags or _backend.current(tags) == stamp):
+				value = cached
+			else:
+				with self._lock:
+					if self._data.get(key) is entry:
+						del self._data[key]
+						if expires > now:
+							self.invalidations += 1
+		if value is _MISSING and self.shared and _backend.shared is not None:
+			value = self._get_shared(key)
+		with self._lock:
+			if value is _MISSING:
+				self.misses += 1
+			else:
+				self.hits += 1
+				if key in self._data:
+					self._data.move_to_end(key)
+		metrics.observe_cache(self.name, value is not _MISSING)
+		return default if value is _MISSING else value
+
+	def _get_shared(self, key: Hashable) -> Any:
+		try:
+			payload = _backend.shared.get(self.name, key)
+			if payload is None:
+				return _MISSING
+			expires_at, tags, stamp, value = pickle.loads(payload)
+		except Exception:
+			logger.warning('Shared cache read failed (%s)', self.name, exc_info=True)
+			return _MISSING
+		remaining = expires_at - time.time()
+		if remaining <= 0 or (tags and _backend.current(tags) != stamp):
+			return _MISSING
+		self._store(key, value, remaining, tags, stamp)
+		with self._lock:
+			self.shared_hits += 1
+		return value
+
+	def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Sequence[str] = (),
+			stamp: Optional[tuple] = None) -> None:
+		"""Store value; stamp is the tag versions read before computing it (default: now)."""
+		ttl = self.ttl if ttl is None else ttl
+		tags = tuple(tags)
+		if stamp is None:
+			stamp = _backend.current(tags) if tags else ()
+		if stamp is None:
+			# Tag versions unknown: the entry could not be invalidated, so skip it
+			return
+		self._store(key, value, ttl, tags, stamp)
+		if self.shared and _backend.shared is not None:
+			try:
+				payload = pickle.dumps((time.time() + ttl, tags, stamp, value), protocol=pickle.HIGHEST_PROTOCOL)
+				_backend.shared.set(self.name, key, payload, ttl)
+			except Exception:
+				logger.warning('Shared cache write failed (%s)', self.name, exc_info=True)
+
+	def _store(self, key: Hashable, value: Any, ttl: float, tags: tuple, stamp: tuple) -> None:
+		with self._lock:
+			self._data[key] = (time.monotonic() + ttl, value, tags, stamp)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+				self.evictions += 1
+			size = len(self._data)
+		metrics.set_cache_entries(self.name, size)
+
+	def get_or_set(self, key: Hashable, compute: Callable[[], Any], tags: Sequence[str] = ()) -> Any:
+		value = self.get(key, _MISSING)
+		if value is _MISSING:
+			# Versions read before computing: a commit landing meanwhile makes
+			# the new entry stale instead of hiding behind it
+			stamp = _backend.current(tuple(tags)) if tags else ()
+			value = compute()
+			if stamp is not None:
+				self.set(key, value, tags=tags, stamp=stamp)
+		return value
+
+	def invalidate(self, tags: Iterable[str]) -> int:
+		"""Drop local entries carrying any of tags; returns how many."""
+		tags = set(tags)
+		with self._lock:
+			doomed = [k for k, entry in self._data.items() if tags.intersection(entry[2])]
+			for key in doomed:
+				del self._data[key]
+			self.invalidations += len(doomed)
+			size = len(self._data)
+		if doomed:
+			metrics.set_cache_entries(self.name, size)
+		return len(doomed)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+		metrics.set_cache_entries(self.name, 0)
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			total = self.hits + self.misses
+			return {
+				'entries': len(self._data),
+				'maxsize': self.maxsize,
+				'hits': self.hits,
+				'shared_hits': self.shared_hits,
+				'misses': self.misses,
+				'evictions': self.evictions,
+				'invalidations': self.invalidations,
+				'hit_ratio': round(self.hits / total, 3) if total else None,
+			}
+
+
+_caches: Dict[str, LRUCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name: str, maxsize: int = 256, ttl: float = 300.0, shared: bool = False) -> LRUCache:
+	"""Named cache, created on first use; later calls return the same instance."""
+	with _registry_lock:
+		cache = _caches.get(name)
+		if cache is None:
+			cache = _caches[name] = LRUCache(name, maxsize, ttl, shared)
+		return cache
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+	with _registry_lock:
+		caches = list(_caches.values())
+	return {c.name: c.stats() for c in caches}
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+	"""Invalidate tags everywhere: at once in this worker, and through the tag
+	store for the others (they notice within CACHE_TAG_POLL_INTERVAL)."""
+	tags = sorted(set(tags))
+	if not tags:
+		return
+	_backend.bump(tags)
+	with _registry_lock:
+		caches = list(_caches.values())
+	for cache in caches:
+		cache.invalidate(tags)
+
+
+def tags_for_tables(tables: Iterable[str]) -> set:
+	return {TABLE_TAGS.get(t, t) for t in tables}
+
+
+def mark_written(session: Session, tables: Iterable[str]) -> None:
+	"""Record tables written in session's transaction; their tags fire on commit."""
+	session.info.setdefault('cache_tags', set()).update(tags_for_tables(tables))
+
+
+def _after_commit(session: Session) -> None:
+	tags = session.info.pop('cache_tags', None)
+	if tags:
+		invalidate_tags(tags)
+
+
+def _after_rollback(session: Session) -> None:
+	session.info.pop('cache_tags', None)
+
+
+def configure(tags=None, shared=None, poll_interval: float = 1.0) -> None:
+	"""Swap the backend (tag store, shared tier); init_app calls this from config."""
+	global _backend
+	_backend = _Backend(tags, shared, poll_interval)
+
+
+def init_app(app: Flask) -> None:
+	"""Pick the tag store / shared tier from config and fire tags on commit."""
+	url = app.config.get('CACHE_REDIS_URL')
+	poll_interval = app.config.get('CACHE_TAG_POLL_INTERVAL', 1.0)
+	if url and redis is not None:
+		client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+		configure(RedisTags(client), RedisTier(client), poll_interval)
+	else:
+		if url:
+			logger.warning('CACHE_REDIS_URL is set but the redis package is not installed; caches stay per worker')
+		directory = app.config.get('CACHE_TAG_DIR')
+		if directory is None:
+			directory = os.path.join(tempfile.gettempdir(), 'qlts-cache-tags')
+		configure(FileTags(directory) if directory else LocalTags(), None, poll_interval)
+
+	if not getattr(init_app, '_listening', False):
+		event.listen(Session, 'after_commit', _after_commit)
+		event.listen(Session, 'after_rollback', _after_rollback)
+		init_app._listening = True
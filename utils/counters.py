@@ -0,0 +1,243 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import click
+from flask import Flask, g, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from models import Asset, AssetType, MaintenanceRecord, StatCounter, User, db
+from utils import cache
+
+logger = logging.getLogger('qlts.counters')
+
+# Columns whose old value is needed to compute a delta. Registering a "set"
+# listener with active_history makes SQLAlchemy load the previous value even
+# when the attribute was expired at the time it is assigned.
+_TRACKED = {
+	Asset: ('status', 'asset_type_id', 'price', 'quantity', 'deleted_at'),
+	AssetType: ('deleted_at',),
+	User: ('deleted_at',),
+	MaintenanceRecord: ('deleted_at',),
+}
+VERSION_PREFIX = 'version:'
+# Tables the counters are computed from (stamps bumped by reconcile)
+COUNTED_TABLES = tuple(m.__tablename__ for m in (Asset, AssetType, User, MaintenanceRecord))
+
+
+def _contribution(model, values: dict) -> Counter:
+	"""Counters one row adds to the totals; soft-deleted rows add nothing."""
+	if values.get('deleted_at') is not None:
+		return Counter()
+	if model is Asset:
+		return Counter({
+			'assets': 1,
+			f"assets.status:{values.get('status') or 'active'}": 1,
+			f"assets.type:{values.get('asset_type_id')}": 1,
+			'assets.value': float(values.get('price') or 0) * (values.get('quantity') or 1),
+		})
+	if model is AssetType:
+		return Counter({'asset_types': 1})
+	if model is User:
+		return Counter({'users': 1})
+	return Counter({'maintenance': 1})
+
+
+def _values(obj, columns, old: bool) -> dict:
+	values = {}
+	for name in columns:
+		history = db.inspect(obj).attrs[name].history
+		if old and history.deleted:
+			values[name] = history.deleted[0]
+		elif old and history.added and not history.unchanged:
+			values[name] = None
+		else:
+			values[name] = getattr(obj, name)
+	return values
+
+
+def _add(totals: Counter, delta: Counter, sign: int) -> None:
+	for key, value in delta.items():
+		totals[key] += sign * value
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+	deltas: Counter = Counter()
+	touched = set()
+	for obj in session.new:
+		model = type(obj)
+		if model in _TRACKED:
+			_add(deltas, _contribution(model, _values(obj, _TRACKED[model], old=False)), 1)
+		touched.add(obj.__table__.name)
+	for obj in session.dirty:
+		if not session.is_modified(obj, include_collections=False):
+			continue
+		model = type(obj)
+		if model in _TRACKED:
+			columns = _TRACKED[model]
+			_add(deltas, _contribution(model, _values(obj, columns, old=False)), 1)
+			_add(deltas, _contribution(model, _values(obj, columns, old=True)), -1)
+		touched.add(obj.__table__.name)
+	for obj in session.deleted:
+		model = type(obj)
+		if model in _TRACKED:
+			_add(deltas, _contribution(model, _values(obj, _TRACKED[model], old=True)), -1)
+		touched.add(obj.__table__.name)
+	touched.discard(StatCounter.__tablename__)
+	if deltas or touched:
+		apply(session.connection(), deltas, touched, session)
+		if has_app_context():
+			g.pop('stat_snapshot', None)
+
+
+def apply(conn, deltas: Dict[str, float], tables: Iterable[str] = (), session: Optional[Session] = None) -> None:
+	"""Add deltas and bump version stamps in the caller's transaction (for bulk SQL).
+
+	With the session owning conn, the tables' cache tags fire when it commits.
+	On a bare connection (engine.begin()) the caller invalidates them after
+	its block with cache.invalidate_tags(cache.tags_for_tables(tables)).
+	"""
+	tables = tuple(tables)
+	if tables and session is not None:
+		cache.mark_written(session, tables)
+	rows = [{'key': k, 'value': v} for k, v in deltas.items() if v]
+	rows += [{'key': VERSION_PREFIX + t, 'value': 1} for t in sorted(tables)]
+	if not rows:
+		return
+	table = StatCounter.__table__
+	now = datetime.utcnow()
+	dialect = conn.dialect.name
+	if dialect in ('sqlite', 'postgresql'):
+		if dialect == 'sqlite':
+			from sqlalchemy.dialects.sqlite import insert
+		else:
+			from sqlalchemy.dialects.postgresql import insert
+		stmt = insert(table).values(updated_at=now)
+		stmt = stmt.on_conflict_do_update(
+			index_elements=[table.c.key],
+			set_={'value': table.c.value + stmt.excluded.value, 'updated_at': now},
+		)
+		conn.execute(stmt, rows)
+		return
+	# Other backends: update, then insert keys that did not exist yet
+	for row in rows:
+		result = conn.execute(
+			table.update().where(table.c.key == row['key']).values(value=table.c.value + row['value'], updated_at=now)
+		)
+		if not result.rowcount:
+			conn.execute(table.insert().values(key=row['key'], value=row['value'], updated_at=now))
+
+
+def snapshot() -> Dict[str, float]:
+	"""All counters in one small query."""
+	return dict(db.session.execute(select(StatCounter.key, StatCounter.value)).all())
+
+
+def version(tables: Iterable[str], counters: Optional[Dict[str, float]] = None) -> str:
+	"""Combined version stamp of the given tables, e.g. '12.4' for ('asset', 'user')."""
+	counters = snapshot() if counters is None else counters
+	return '.'.join(str(int(counters.get(VERSION_PREFIX + t, 0))) for t in tables)
+
+
+def request_snapshot() -> Dict[str, float]:
+	"""snapshot() read once per request (dropped again on flush)."""
+	if 'stat_snapshot' not in g:
+		g.stat_snapshot = snapshot()
+	return g.stat_snapshot
+
+
+def request_version(tables: Iterable[str]) -> str:
+	"""version() from the per-request snapshot."""
+	return version(tables, request_snapshot())
+
+
+def _totals(conn, model, *criteria) -> Counter:
+	"""Counters contributed by the live rows of model matching criteria (GROUP BY, no row loading)."""
+	totals: Counter = Counter()
+	t = model.__table__
+	where = (t.c.deleted_at.is_(None),) + criteria
+	if model is not Asset:
+		key = {AssetType: 'asset_types', User: 'users', MaintenanceRecord: 'maintenance'}[model]
+		totals[key] = conn.execute(select(func.count()).select_from(t).where(*where)).scalar()
+		return totals
+	a = t.c
+	row = conn.execute(select(func.count(), func.sum(a.price * func.coalesce(a.quantity, 1))).where(*where)).one()
+	totals['assets'] = row[0]
+	totals['assets.value'] = float(row[1] or 0)
+	for status, n in conn.execute(select(func.coalesce(a.status, 'active'), func.count()).where(*where).group_by(func.coalesce(a.status, 'active'))):
+		totals[f'assets.status:{status}'] = n
+	for type_id, n in conn.execute(select(a.asset_type_id, func.count()).where(*where).group_by(a.asset_type_id)):
+		totals[f'assets.type:{type_id}'] = n
+	return totals
+
+
+def compute(conn) -> Counter:
+	"""Counters recomputed from the base tables (GROUP BY, no row loading)."""
+	totals: Counter = Counter()
+	for model in (Asset, AssetType, User, MaintenanceRecord):
+		totals.update(_totals(conn, model))
+	return totals
+
+
+def subset(conn, model, ids) -> Counter:
+	"""Counters the given rows of model contribute while live (deltas of set-based writes)."""
+	return _totals(conn, model, model.__table__.c.id.in_(ids))
+
+
+def added(model, rows: Iterable[dict]) -> Counter:
+	"""Counters the given rows add once inserted by bulk SQL (deltas for apply())."""
+	totals: Counter = Counter()
+	for values in rows:
+		_add(totals, _contribution(model, values), 1)
+	return totals
+
+
+def reconcile(conn) -> Dict[str, float]:
+	"""Rewrite counters from the base tables; returns the drift that was corrected.
+
+	Needed after writes that bypass the ORM (bulk SQL, fixtures, manual fixes).
+	Version stamps are bumped rather than reset so cached pages are invalidated.
+	On drift, invalidate the cache tags of COUNTED_TABLES once conn commits.
+	"""
+	table = StatCounter.__table__
+	actual = compute(conn)
+	stored = {k: v for k, v in conn.execute(select(table.c.key, table.c.value)) if not k.startswith(VERSION_PREFIX)}
+	drift = {}
+	for key in set(stored) | set(actual):
+		diff = actual.get(key, 0) - stored.get(key, 0)
+		if abs(diff) > 1e-6:
+			drift[key] = diff
+	conn.execute(table.delete().where(~table.c.key.startswith(VERSION_PREFIX)))
+	now = datetime.utcnow()
+	rows = [{'key': k, 'value': v, 'updated_at': now} for k, v in actual.items() if v]
+	if rows:
+		conn.execute(table.insert(), rows)
+	if drift:
+		apply(conn, {}, COUNTED_TABLES)
+	return drift
+
+
+def is_empty() -> bool:
+	return db.session.query(StatCounter.key).first() is None
+
+
+def init_app(app: Flask) -> None:
+	"""Keep counters in step with ORM writes and add `flask reconcile-stats`."""
+	if not getattr(init_app, '_listening', False):
+		for model, columns in _TRACKED.items():
+			for name in columns:
+				event.listen(getattr(model, name), 'set', lambda *args: None, active_history=True)
+		event.listen(Session, 'before_flush', _before_flush)
+		init_app._listening = True
+
+	@app.cli.command('reconcile-stats')
+	def reconcile_stats_command():
+		"""Recount dashboard counters from the base tables (run periodically, e.g. cron)."""
+		with db.engine.begin() as conn:
+			drift = reconcile(conn)
+		if drift:
+			cache.invalidate_tags(cache.tags_for_tables(COUNTED_TABLES))
+			logger.warning('Counter drift corrected: %s', drift)
+		click.echo(f'Counters reconciled; drift: {drift or "none"}')
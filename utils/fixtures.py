@@ -0,0 +1,271 @@
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from sqlalchemy import func, select, text
+
+# Named scales -> number of maintenance records; other row counts derive from it
+SCALES = {
+	'10k': 10_000,
+	'100k': 100_000,
+	'1m': 1_000_000,
+	'5m': 5_000_000,
+}
+
+TYPE_NAMES = [
+	'Máy tính', 'Laptop', 'Màn hình', 'Máy in', 'Máy chiếu', 'Thiết bị mạng', 'Điện thoại',
+	'Máy photocopy', 'Máy scan', 'Bàn làm việc', 'Ghế', 'Tủ hồ sơ', 'Điều hòa', 'UPS',
+	'Camera an ninh', 'Phần mềm', 'Máy chủ', 'Thiết bị lưu trữ', 'Dụng cụ', 'Khác'
+]
+STATUSES = ['active'] * 7 + ['maintenance'] * 2 + ['disposed']
+CONDITIONS = ['Còn tốt', 'Bình thường', 'Cần kiểm tra', 'Hỏng nhẹ']
+MAINT_TYPES = ['maintenance', 'repair', 'inspection', 'upgrade', 'replacement']
+MAINT_STATUSES = ['completed'] * 8 + ['scheduled', 'in_progress', 'cancelled']
+VENDORS = ['FPT Services', 'Viettel', 'NCC A', 'NCC B', 'Công ty TNHH ABC', 'Dịch vụ Kỹ thuật số', None]
+PERSONS = ['Nguyễn Văn A', 'Trần Thị B', 'Lê Văn C', 'Phạm Thị D', 'Hoàng Văn E', 'System']
+AUDIT_MODULES = ['assets', 'asset_types', 'users']
+AUDIT_ACTIONS = ['create', 'update', 'update', 'delete']
+
+
+def parse_scale(value: str) -> int:
+	"""'100k', '1m', '250000' -> number of maintenance records."""
+	key = (value or '').strip().lower()
+	if key in SCALES:
+		return SCALES[key]
+	if key.endswith('k'):
+		return int(float(key[:-1]) * 1_000)
+	if key.endswith('m'):
+		return int(float(key[:-1]) * 1_000_000)
+	return int(key)
+
+
+def plan_counts(maintenance: int) -> Dict[str, int]:
+	"""Row counts per table for a given maintenance volume (~20 records per asset)."""
+	assets = max(maintenance // 20, 50)
+	return {
+		'asset_types': len(TYPE_NAMES),
+		'users': max(assets // 5, 10),
+		'assets': assets,
+		'maintenance': maintenance,
+		'audit_logs': max(maintenance // 2, 100),
+	}
+
+
+class _Writer:
+	"""Batched inserts: COPY on Postgres (psycopg2/psycopg), executemany elsewhere."""
+
+	def __init__(self, conn, batch_size: int):
+		self.conn = conn
+		self.batch_size = batch_size
+		self.dialect = conn.dialect.name
+		self.sqlite = self.dialect == 'sqlite'
+
+	def d(self, v: Optional[date]):
+		# SQLite stores dates as text; use SQLAlchemy's own format up front so
+		# rows need no per-value conversion at insert time
+		if self.sqlite and v is not None:
+			return v.isoformat()
+		return v
+
+	def midnight(self, v: date):
+		if self.sqlite:
+			return v.isoformat() + ' 00:00:00.000000'
+		return datetime.combine(v, datetime.min.time())
+
+	def dt(self, v: Optional[datetime]):
+		if self.sqlite and v is not None:
+			return v.strftime('%Y-%m-%d %H:%M:%S.%f')
+		return v
+
+	def write(self, table: str, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+		total = 0
+		it = iter(rows)
+		while True:
+			chunk = list(islice(it, self.batch_size))
+			if not chunk:
+				break
+			if self.dialect == 'postgresql' and self._copy(table, columns, chunk):
+				pass
+			else:
+				self._executemany(table, columns, chunk)
+			total += len(chunk)
+		return total
+
+	def _executemany(self, table, columns, chunk):
+		quoted = ', '.join(f'"{c}"' for c in columns)
+		marks = ', '.join(['?' if self.sqlite else '%s'] * len(columns))
+		stmt = f'INSERT INTO "{table}" ({quoted}) VALUES ({marks})'
+		self.conn.exec_driver_sql(stmt, chunk)
+
+	def _copy(self, table, columns, chunk) -> bool:
+		raw = self.conn.connection.dbapi_connection
+		buf = io.StringIO()
+		writer = csv.writer(buf)
+		for row in chunk:
+			writer.writerow(['\\N' if v is None else v for v in row])
+		buf.seek(0)
+		cols = ', '.join(f'"{c}"' for c in columns)
+		sql = f'COPY "{table}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'
+		cursor = raw.cursor()
+		try:
+			if hasattr(cursor, 'copy_expert'):  # psycopg2
+				cursor.copy_expert(sql, buf)
+				return True
+			if hasattr(cursor, 'copy'):  # psycopg 3
+				with cursor.copy(sql) as copy:
+					copy.write(buf.getvalue())
+				return True
+		finally:
+			cursor.close()
+		return False
+
+
+def _next_id(conn, table) -> int:
+	return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def generate(engine, maintenance: int, seed: int = 42, batch_size: int = 20_000,
+			 password_hash: Optional[str] = None, log: Callable[[str], None] = print) -> Dict[str, int]:
+	"""Bulk-insert a deterministic dataset sized by `maintenance` records.
+
+	Rows are appended after the current max ids, so the generator can run on
+	a database that already has data. Returns the number of rows per table.
+	"""
+	from models import Asset, AssetType, AuditLog, MaintenanceRecord, Role, User
+
+	rng = random.Random(seed)
+	counts = plan_counts(maintenance)
+	today = date.today()
+	now = datetime.utcnow()
+	started = time.perf_counter()
+	inserted: Dict[str, int] = {}
+
+	with engine.begin() as conn:
+		writer = _Writer(conn, batch_size)
+		if writer.sqlite:
+			conn.exec_driver_sql('PRAGMA synchronous = OFF')
+
+		role_ids = dict(conn.execute(select(Role.__table__.c.name, Role.__table__.c.id)).all())
+		for name, desc in (('admin', 'Quản trị'), ('manager', 'Quản lý'), ('user', 'Nhân viên')):
+			if name not in role_ids:
+				conn.execute(Role.__table__.insert().values(name=name, description=desc, created_at=now, updated_at=now))
+		role_ids = dict(conn.execute(select(Role.__table__.c.name, Role.__table__.c.id)).all())
+
+		if password_hash is None:
+			from werkzeug.security import generate_password_hash
+			# One hash for every generated account: hashing is deliberately slow
+			password_hash = generate_password_hash('password123')
+
+		# Asset types
+		type_start = _next_id(conn, AssetType.__table__)
+		type_ids = list(range(type_start, type_start + counts['asset_types']))
+		now_value = writer.dt(now)
+		inserted['asset_types'] = writer.write('asset_type', ('id', 'name', 'description', 'created_at', 'updated_at'), (
+			(tid, f'{TYPE_NAMES[i]} {seed}-{tid}' if type_start > 1 else TYPE_NAMES[i], f'{TYPE_NAMES[i]} - dữ liệu mẫu', now_value, now_value)
+			for i, tid in enumerate(type_ids)
+		))
+
+		# Users
+		user_start = _next_id(conn, User.__table__)
+		user_ids = list(range(user_start, user_start + counts['users']))
+		user_roles = [role_ids['user']] * 8 + [role_ids['manager']]
+
+		def user_rows():
+			for uid in user_ids:
+				created = writer.dt(now - timedelta(days=rng.randint(0, 5 * 365)))
+				yield (uid, f'nv{uid:07d}', password_hash, f'nv{uid:07d}@example.com', rng.choice(user_roles),
+					   True, None, created, created, None)
+		inserted['users'] = writer.write('user', (
+			'id', 'username', 'password_hash', 'email', 'role_id', 'is_active', 'deleted_at',
+			'created_at', 'updated_at', 'last_login'
+		), user_rows())
+
+		# Assets (about 2% already in the trash)
+		asset_start = _next_id(conn, Asset.__table__)
+		asset_ids = range(asset_start, asset_start + counts['assets'])
+		purchase = {}
+
+		def asset_rows():
+			for aid in asset_ids:
+				t = rng.randrange(len(type_ids))
+				bought = today - timedelta(days=rng.randint(30, 8 * 365))
+				purchase[aid] = bought
+				created = datetime.combine(bought, datetime.min.time())
+				deleted = created + timedelta(days=rng.randint(1, 365)) if rng.random() < 0.02 else None
+				status = 'disposed' if deleted else rng.choice(STATUSES)
+				created_value = writer.dt(created)
+				yield (aid, f'{TYPE_NAMES[t]} #{aid}', float(rng.randint(500, 80_000) * 1000), rng.randint(1, 5),
+					   status, writer.d(bought), f'TB-{aid:07d}', rng.choice(CONDITIONS), type_ids[t],
+					   rng.choice(user_ids), None, None, writer.dt(deleted), created_value, created_value)
+		inserted['assets'] = writer.write('asset', (
+			'id', 'name', 'price', 'quantity', 'status', 'purchase_date', 'device_code', 'condition_label',
+			'asset_type_id', 'user_id', 'user_text', 'notes', 'deleted_at', 'created_at', 'updated_at'
+		), asset_rows())
+
+		# Assignments: every asset has 1-2 users
+		def assignment_rows():
+			for aid in asset_ids:
+				for uid in set(rng.sample(user_ids, rng.choice((1, 1, 2)))):
+					yield (aid, uid)
+		inserted['asset_user'] = writer.write('asset_user', ('asset_id', 'user_id'), assignment_rows())
+
+		# Multi-year maintenance history spread over the assets
+		maint_start = _next_id(conn, MaintenanceRecord.__table__)
+		per_asset, extra = divmod(maintenance, counts['assets'])
+
+		def maintenance_rows():
+			mid = maint_start
+			for index, aid in enumerate(asset_ids):
+				n = per_asset + (1 if index < extra else 0)
+				bought = purchase[aid]
+				span = max((today - bought).days, 1)
+				for _ in range(n):
+					mdate = bought + timedelta(days=rng.randint(0, span))
+					status = rng.choice(MAINT_STATUSES)
+					cost = float(rng.randint(1, 50) * 100_000) if rng.random() < 0.8 else 0.0
+					next_due = mdate + timedelta(days=rng.choice((30, 90, 180, 365)))
+					created = writer.midnight(mdate)
+					deleted = writer.midnight(mdate + timedelta(days=rng.randint(1, 90))) if rng.random() < 0.01 else None
+					yield (mid, aid, writer.d(mdate), rng.choice(MAINT_TYPES), f'Bảo trì #{mid} cho tài sản {aid}',
+						   rng.choice(VENDORS), rng.choice(PERSONS), cost, writer.d(next_due), status, deleted, created, created)
+					mid += 1
+		inserted['maintenance'] = writer.write('maintenance_record', (
+			'id', 'asset_id', 'maintenance_date', 'type', 'description', 'vendor', 'person_in_charge',
+			'cost', 'next_due_date', 'status', 'deleted_at', 'created_at', 'updated_at'
+		), maintenance_rows())
+
+		# Audit trail
+		audit_start = _next_id(conn, AuditLog.__table__)
+
+		def audit_rows():
+			for lid in range(audit_start, audit_start + counts['audit_logs']):
+				module = rng.choice(AUDIT_MODULES)
+				entity = rng.choice(asset_ids) if module == 'assets' else (
+					rng.choice(type_ids) if module == 'asset_types' else rng.choice(user_ids))
+				created = writer.dt(now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400)))
+				yield (lid, rng.choice(user_ids), module, rng.choice(AUDIT_ACTIONS), entity, f'id={entity}', created)
+		inserted['audit_logs'] = writer.write('audit_log', (
+			'id', 'user_id', 'module', 'action', 'entity_id', 'details', 'created_at'
+		), audit_rows())
+
+		if writer.dialect == 'postgresql':
+			# Explicit ids bypass the serial sequences; move them past the new rows
+			for table in ('asset_type', 'user', 'asset', 'maintenance_record', 'audit_log'):
+				conn.execute(text(
+					f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT MAX(id) FROM \"{table}\"))"
+				))
+
+		# Rows went in below the ORM, so the dashboard counters are recounted
+		from utils import counters
+		counters.reconcile(conn)
+
+	# Committed on a bare connection: no session fires the written tables' tags
+	from utils import cache
+	cache.invalidate_tags(cache.tags_for_tables(
+		('asset_type', 'user', 'asset', 'maintenance_record', 'audit_log')))
+	log(f'Generated {inserted} in {time.perf_counter() - started:.1f}s')
+	return inserted
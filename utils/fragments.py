@@ -0,0 +1,60 @@
+from typing import Sequence
+
+from flask import Flask, current_app, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from utils import counters
+from utils.cache import get_cache
+
+
+class FragmentCacheExtension(Extension):
+	"""`{% cache key, ..., ttl=600, tables=['asset'] %}...{% endcache %}`
+
+	The rendered block is stored in the 'fragments' LRU under (template, line,
+	key parts, session role, version stamps of `tables`), so the body (and any
+	lazy query it iterates) only runs when one of those changes. Everything the
+	block shows that is not covered by the key (user name, today's date) must be
+	passed as a key part. Set FRAGMENT_CACHE_SIZE=0 while editing templates.
+	"""
+
+	tags = {'cache'}
+
+	def parse(self, parser):
+		lineno = next(parser.stream).lineno
+		parts, options = [], {}
+		while parser.stream.current.type != 'block_end':
+			if parts or options:
+				parser.stream.expect('comma')
+			if parser.stream.current.type == 'name' and parser.stream.look().type == 'assign':
+				name = next(parser.stream).value
+				next(parser.stream)
+				options[name] = parser.parse_expression()
+			else:
+				parts.append(parser.parse_expression())
+		body = parser.parse_statements(('name:endcache',), drop_needle=True)
+		args = [
+			nodes.Const(f'{parser.name}:{lineno}'),
+			nodes.List(parts),
+			options.get('ttl', nodes.Const(None)),
+			options.get('tables', nodes.Const(())),
+		]
+		return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+	def _render(self, location: str, parts: list, ttl, tables: Sequence[str], caller) -> str:
+		size = current_app.config.get('FRAGMENT_CACHE_SIZE', 512)
+		if not size:
+			return caller()
+		cache = get_cache('fragments', size, current_app.config.get('FRAGMENT_CACHE_TTL', 600))
+		stamps = counters.request_version(tables) if tables else ''
+		key = (location, tuple(parts), session.get('role'), stamps)
+		html = cache.get(key)
+		if html is None:
+			html = Markup(caller())
+			cache.set(key, html, ttl)
+		return html
+
+
+def init_app(app: Flask) -> None:
+	app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,313 @@
+import csv
+import io
+import os
+import re
+import zipfile
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import select
+
+from models import Asset, AssetType, AuditLog, User, db
+from utils import counters
+
+# Rows validated, looked up and inserted together: one name lookup per table
+# and one executemany INSERT per batch, below SQLite's 999 bound parameters
+BATCH_SIZE = 500
+EXTENSIONS = ('.csv', '.xlsx')
+# Accepted headers per field: the keys and the Vietnamese headers of the
+# CSV/XLSX export, so an exported file can be imported again
+FIELDS = {
+	'name': ('name', 'tên tài sản'),
+	'asset_type': ('asset_type', 'loại', 'loại tài sản'),
+	'price': ('price', 'giá'),
+	'quantity': ('quantity', 'số lượng'),
+	'purchase_date': ('purchase_date', 'ngày mua'),
+	'device_code': ('device_code', 'mã thiết bị'),
+	'user': ('user', 'người sử dụng'),
+	'status': ('status', 'trạng thái'),
+	'notes': ('notes', 'ghi chú'),
+}
+REQUIRED = ('name', 'asset_type', 'price')
+STATUSES = {
+	'active': 'active', 'đang sử dụng': 'active',
+	'maintenance': 'maintenance', 'bảo trì': 'maintenance',
+	'disposed': 'disposed', 'đã thanh lý': 'disposed',
+}
+REPORT_PREFIX = 'loi_nhap_tai_san_'
+_HEADER_FIELDS = {alias: name for name, aliases in FIELDS.items() for alias in aliases}
+_REPORT_NAME = re.compile(re.escape(REPORT_PREFIX) + r'[0-9_]+\.csv')
+
+
+class RowError(ValueError):
+	pass
+
+
+# Not a CSV/XLSX file after all (bad encoding, broken zip, ...)
+_UNREADABLE = (UnicodeDecodeError, csv.Error, zipfile.BadZipFile, KeyError, OSError)
+
+
+def _rows(stream, filename: str) -> Iterator[Sequence]:
+	"""Rows of the first sheet (XLSX, read-only mode) or of the CSV, one at a time."""
+	if filename.lower().endswith('.xlsx'):
+		from openpyxl import load_workbook
+		workbook = load_workbook(stream, read_only=True, data_only=True)
+		try:
+			yield from workbook.worksheets[0].iter_rows(values_only=True)
+		finally:
+			workbook.close()
+		return
+	text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+	try:
+		yield from csv.reader(text)
+	finally:
+		# Leave the caller's stream open
+		text.detach()
+
+
+def _columns(header: Optional[Sequence]) -> Dict[str, int]:
+	columns = {}
+	for i, title in enumerate(header or ()):
+		name = _HEADER_FIELDS.get(_text(title).lower())
+		if name and name not in columns:
+			columns[name] = i
+	missing = [FIELDS[name][1] for name in REQUIRED if name not in columns]
+	if missing:
+		raise ValueError('Thiếu cột bắt buộc: ' + ', '.join(missing))
+	return columns
+
+
+def _text(value) -> str:
+	if value is None:
+		return ''
+	if isinstance(value, float) and value.is_integer():
+		# Excel stores codes typed as digits as numbers
+		value = int(value)
+	return str(value).strip()
+
+
+def _number(value, label: str, integer: bool = False):
+	if _text(value) == '':
+		return None
+	try:
+		number = float(value)
+	except (TypeError, ValueError):
+		raise RowError(f'{label} không hợp lệ')
+	if integer:
+		if not number.is_integer():
+			raise RowError(f'{label} không hợp lệ')
+		return int(number)
+	return number
+
+
+def _date(value) -> Optional[date]:
+	if isinstance(value, datetime):
+		return value.date()
+	if isinstance(value, date):
+		return value
+	text = _text(value)
+	if not text:
+		return None
+	for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+		try:
+			return datetime.strptime(text, fmt).date()
+		except ValueError:
+			pass
+	raise RowError('Ngày mua không hợp lệ (dd/mm/yyyy)')
+
+
+def _parse(values: Sequence, columns: Dict[str, int]) -> dict:
+	"""Field values of one row, checked like the add form; raises RowError."""
+	get = lambda name: values[columns[name]] if name in columns and columns[name] < len(values) else None  # noqa: E731
+	name = _text(get('name'))
+	if not name:
+		raise RowError('Tên tài sản không được để trống')
+	if not _text(get('asset_type')):
+		raise RowError('Thiếu loại tài sản')
+	price = _number(get('price'), 'Giá')
+	if price is None or price <= 0:
+		raise RowError('Giá phải lớn hơn 0')
+	quantity = _number(get('quantity'), 'Số lượng', integer=True)
+	if quantity is None:
+		quantity = 1
+	if quantity < 1:
+		raise RowError('Số lượng phải >= 1')
+	status = _text(get('status')).lower() or 'active'
+	if status not in STATUSES:
+		raise RowError(f'Trạng thái không hợp lệ: {status}')
+	return {
+		'name': name,
+		'asset_type': _text(get('asset_type')),
+		'user': _text(get('user')),
+		'price': price,
+		'quantity': quantity,
+		'purchase_date': _date(get('purchase_date')),
+		'device_code': _text(get('device_code')) or None,
+		'status': STATUSES[status],
+		'notes': _text(get('notes')) or None,
+	}
+
+
+def _resolve(conn, column, id_column, live, names, known: Dict[str, Optional[int]]) -> None:
+	"""Add ids of names not looked up yet to known (None: no live row), one query."""
+	missing = {n for n in names if n and n not in known}
+	if not missing:
+		return
+	found = dict(conn.execute(select(column, id_column).where(column.in_(missing), live)).all())
+	for n in missing:
+		known[n] = found.get(n)
+
+
+class _Report:
+	"""Error report CSV (original columns + line + reason), created on the first error."""
+
+	def __init__(self, directory: str, header: Sequence):
+		self.directory = directory
+		self.header = [_text(h) for h in header]
+		self.path = None
+		self.file = None
+		self.writer = None
+
+	def add(self, line: int, values: Sequence, reason: str) -> None:
+		if self.writer is None:
+			os.makedirs(self.directory, exist_ok=True)
+			stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+			self.path = os.path.join(self.directory, f'{REPORT_PREFIX}{stamp}.csv')
+			self.file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+			self.writer = csv.writer(self.file)
+			self.writer.writerow(self.header + ['Dòng', 'Lỗi'])
+		row = [_text(v) if not isinstance(v, (date, datetime)) else v.strftime('%d/%m/%Y') for v in values]
+		row += [''] * (len(self.header) - len(row))
+		self.writer.writerow(row[:len(self.header)] + [line, reason])
+
+	def close(self) -> None:
+		if self.file is not None:
+			self.file.close()
+
+
+def report_dir() -> str:
+	"""Error reports live next to the exports (EXPORT_DIR)."""
+	directory = current_app.config.get('EXPORT_DIR', 'instance/exports')
+	if not os.path.isabs(directory):
+		directory = os.path.join(current_app.root_path, directory)
+	return directory
+
+
+def report_path(name: str) -> Optional[str]:
+	"""Path of a generated error report by file name, None for anything else."""
+	if not _REPORT_NAME.fullmatch(name or ''):
+		return None
+	path = os.path.join(report_dir(), name)
+	return path if os.path.isfile(path) else None
+
+
+def import_assets(stream, filename: str, user_id: Optional[int] = None, batch_size: int = BATCH_SIZE,
+				  directory: Optional[str] = None) -> dict:
+	"""Insert the assets of a CSV/XLSX file in the caller's transaction.
+
+	The file is read row by row and handled in batches of batch_size: asset
+	type and user names are resolved with one query per batch, duplicate
+	names are checked against the live names loaded once up front (and the
+	file itself), and the valid rows go in with one executemany INSERT.
+	Invalid rows are written to an error report instead. Writes one audit
+	entry; the caller commits. Raises ValueError for an unreadable file.
+	"""
+	if not filename.lower().endswith(EXTENSIONS):
+		raise ValueError('Chỉ hỗ trợ tệp .csv hoặc .xlsx')
+	rows = _rows(stream, filename)
+	try:
+		header = next(rows, None)
+	except _UNREADABLE as e:
+		raise ValueError(f'Không đọc được tệp: {e}')
+	columns = _columns(header)
+	conn = db.session.connection()
+	a, t, u = Asset.__table__, AssetType.__table__, User.__table__
+	names = set(conn.execute(select(a.c.name).where(a.c.deleted_at.is_(None))).scalars())
+	types: Dict[str, Optional[int]] = {}
+	users: Dict[str, Optional[int]] = {}
+	report = _Report(directory or report_dir(), header)
+	deltas: Counter = Counter()
+	result = {'imported': 0, 'errors': 0}
+
+	def insert(batch: List[tuple]) -> None:
+		parsed, rejected = [], []
+		for line, values in batch:
+			try:
+				parsed.append((line, values, _parse(values, columns)))
+			except RowError as e:
+				rejected.append((line, values, str(e)))
+		_resolve(conn, t.c.name, t.c.id, t.c.deleted_at.is_(None), {p['asset_type'] for _, _, p in parsed}, types)
+		_resolve(conn, u.c.username, u.c.id, u.c.deleted_at.is_(None), {p['user'] for _, _, p in parsed}, users)
+		now = datetime.utcnow()
+		records = []
+		for line, values, p in parsed:
+			if p['name'] in names:
+				reason = 'Tên tài sản đã tồn tại'
+			elif types[p['asset_type']] is None:
+				reason = f"Không có loại tài sản '{p['asset_type']}'"
+			elif p['user'] and users[p['user']] is None:
+				reason = f"Không có người dùng '{p['user']}'"
+			else:
+				names.add(p['name'])
+				records.append({
+					'name': p['name'], 'price': p['price'], 'quantity': p['quantity'], 'status': p['status'],
+					'purchase_date': p['purchase_date'], 'device_code': p['device_code'],
+					'asset_type_id': types[p['asset_type']], 'user_id': users.get(p['user']),
+					'notes': p['notes'], 'created_at': now, 'updated_at': now,
+				})
+				continue
+			rejected.append((line, values, reason))
+		# The report follows the file's line order
+		for line, values, reason in sorted(rejected, key=lambda r: r[0]):
+			report.add(line, values, reason)
+		result['errors'] += len(rejected)
+		if records:
+			conn.execute(a.insert(), records)
+			deltas.update(counters.added(Asset, records))
+			result['imported'] += len(records)
+
+	try:
+		batch = []
+		for line, values in enumerate(rows, start=2):
+			if not any(_text(v) for v in values):
+				continue
+			batch.append((line, values))
+			if len(batch) >= batch_size:
+				insert(batch)
+				batch = []
+		if batch:
+			insert(batch)
+	except _UNREADABLE as e:
+		raise ValueError(f'Không đọc được tệp: {e}')
+	finally:
+		report.close()
+	if result['imported']:
+		counters.apply(conn, deltas, (a.name,), db.session())
+	result['report'] = os.path.basename(report.path) if report.path else None
+	db.session.add(AuditLog(user_id=user_id, module='assets', action='import',
+							details=f"file={os.path.basename(filename)}; imported={result['imported']}, errors={result['errors']}"))
+	return result
+
+
+def init_app(app: Flask) -> None:
+	"""Add `flask import-assets FILE`."""
+
+	@app.cli.command('import-assets')
+	@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+	@click.option('--user', 'username', help='Username recorded in the audit log.')
+	def import_assets_command(path, username):
+		"""Import assets from a CSV/XLSX file (same columns as the export)."""
+		user_id = db.session.execute(select(User.id).where(User.username == username)).scalar() if username else None
+		try:
+			with open(path, 'rb') as stream:
+				result = import_assets(stream, path, user_id=user_id)
+			db.session.commit()
+		except ValueError as e:
+			db.session.rollback()
+			raise click.ClickException(str(e))
+		click.echo(f"Imported {result['imported']} assets, {result['errors']} rows rejected")
+		if result['report']:
+			click.echo(f"Error report: {os.path.join(report_dir(), result['report'])}")
@@ -0,0 +1,45 @@
+import os
+import time
+from typing import Tuple
+
+import click
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+
+
+def _cache_dir(app: Flask) -> str:
+	path = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR', 'instance/jinja_cache')
+	if path and not os.path.isabs(path):
+		path = os.path.join(app.root_path, path)
+	return path
+
+
+def warm_up(app: Flask) -> Tuple[int, float]:
+	"""Compile every template into the environment's in-memory cache.
+
+	Templates already loaded are returned from that cache, so calling this again
+	(e.g. in a worker forked from a warmed master) costs almost nothing. With the
+	bytecode cache, a cold process unmarshals code instead of parsing sources.
+	Returns (templates, elapsed ms).
+	"""
+	started = time.perf_counter()
+	env = app.jinja_env
+	names = [n for n in env.list_templates() if n.endswith('.html')]
+	for name in names:
+		env.get_template(name)
+	return len(names), (time.perf_counter() - started) * 1000.0
+
+
+def init_app(app: Flask) -> None:
+	"""Bytecode cache under instance/ and `flask precompile-templates`."""
+	cache_dir = _cache_dir(app)
+	if cache_dir:
+		os.makedirs(cache_dir, exist_ok=True)
+		app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+	@app.cli.command('precompile-templates')
+	def precompile_templates_command():
+		"""Compile all templates into the bytecode cache (run at deploy/image build)."""
+		count, elapsed_ms = warm_up(app)
+		target = cache_dir or 'memory only (TEMPLATE_BYTECODE_CACHE_DIR is empty)'
+		click.echo(f'Compiled {count} templates in {elapsed_ms:.0f} ms -> {target}')
@@ -0,0 +1,150 @@
+import math
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+from typing import Optional
+
+from flask import Flask, current_app, g, make_response, session
+
+from config import parse_counts
+from utils import metrics
+
+# fcntl is POSIX only: on Windows (dev server, single process) each class falls
+# back to a semaphore shared by the threads of this process.
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+	fcntl = None
+
+# Requests one user may run at once per class, across all workers; more get 429
+PER_USER = {'export': 1}
+
+
+class FileSemaphore:
+	"""Counting semaphore shared by every process on the host: slot i is an
+	exclusive flock on <directory>/<name>.<i>.lock. The kernel drops the lock
+	when the holder exits, so a killed worker never leaks a slot."""
+
+	def __init__(self, directory: str, name: str, size: int):
+		os.makedirs(directory, exist_ok=True)
+		self.paths = [os.path.join(directory, f'{name}.{i}.lock') for i in range(size)]
+
+	def try_acquire(self) -> Optional[int]:
+		for path in self.paths:
+			fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+			try:
+				fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+				return fd
+			except OSError:
+				os.close(fd)
+		return None
+
+	def release(self, fd: int) -> None:
+		fcntl.flock(fd, fcntl.LOCK_UN)
+		os.close(fd)
+
+
+class LocalSemaphore:
+	"""Same interface for platforms without flock (per process only)."""
+
+	def __init__(self, directory: str, name: str, size: int):
+		self._semaphore = threading.BoundedSemaphore(size)
+
+	def try_acquire(self) -> Optional[bool]:
+		return True if self._semaphore.acquire(blocking=False) else None
+
+	def release(self, token) -> None:
+		self._semaphore.release()
+
+
+def _acquire(semaphore, timeout: float):
+	"""Poll for a slot until timeout (the short queue before rejecting)."""
+	deadline = time.monotonic() + timeout
+	delay = 0.005
+	while True:
+		token = semaphore.try_acquire()
+		if token is not None or time.monotonic() >= deadline:
+			return token
+		time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+		delay = min(delay * 2, 0.1)
+
+
+def _reject(name: str, status: int):
+	retry_after = current_app.config.get('CONCURRENCY_RETRY_AFTER', 5)
+	if status == 429:
+		message = 'Bạn đang có một yêu cầu cùng loại đang xử lý. Vui lòng đợi hoàn tất rồi thử lại.'
+	else:
+		message = 'Hệ thống đang bận xử lý các yêu cầu nặng. Vui lòng thử lại sau ít giây.'
+	response = make_response(message, status)
+	response.headers['Retry-After'] = str(int(math.ceil(retry_after)))
+	metrics.observe_rejected(name, status)
+	return response
+
+
+def limited(name: str):
+	"""Run the view only while holding a slot of concurrency class `name`.
+
+	Requests wait up to CONCURRENCY_QUEUE_TIMEOUT for a slot, then get 503
+	with Retry-After; a user over their PER_USER share gets 429 at once.
+	Slots are released at request teardown. For bodies streamed with
+	stream_with_context that is after the last chunk (or the client going
+	away); file downloads (send_file / X-Accel-Redirect) free the slot as
+	soon as the view returns.
+	"""
+	def decorator(view):
+		@wraps(view)
+		def wrapped(*args, **kwargs):
+			semaphores = current_app.extensions.get('concurrency', {})
+			if name not in semaphores:
+				return view(*args, **kwargs)
+			held = g.setdefault('_concurrency_slots', [])
+			user_id = session.get('user_id')
+			if name in PER_USER and user_id is not None:
+				user_semaphore = _user_semaphore(name, user_id)
+				token = user_semaphore.try_acquire()
+				if token is None:
+					return _reject(name, 429)
+				held.append((user_semaphore, token))
+			semaphore = semaphores[name]
+			token = _acquire(semaphore, current_app.config.get('CONCURRENCY_QUEUE_TIMEOUT', 2.0))
+			if token is None:
+				_release(held)
+				return _reject(name, 503)
+			held.append((semaphore, token))
+			return view(*args, **kwargs)
+		return wrapped
+	return decorator
+
+
+def _release(held) -> None:
+	while held:
+		semaphore, token = held.pop()
+		semaphore.release(token)
+
+
+def _user_semaphore(name: str, user_id):
+	factory = FileSemaphore if fcntl is not None else LocalSemaphore
+	key = f'{name}.user.{user_id}'
+	semaphores = current_app.extensions['concurrency_users']
+	if key not in semaphores:
+		semaphores[key] = factory(current_app.config['CONCURRENCY_LOCK_DIR'], key, PER_USER[name])
+	return semaphores[key]
+
+
+def init_app(app: Flask) -> None:
+	"""Create one cross-worker semaphore per class in CONCURRENCY_LIMITS."""
+	lock_dir = app.config.get('CONCURRENCY_LOCK_DIR') or os.path.join(tempfile.gettempdir(), 'qlts-limits')
+	app.config['CONCURRENCY_LOCK_DIR'] = lock_dir
+	factory = FileSemaphore if fcntl is not None else LocalSemaphore
+	app.extensions['concurrency'] = {
+		name: factory(lock_dir, name, size)
+		for name, size in parse_counts(app.config.get('CONCURRENCY_LIMITS', '')).items()
+		if size > 0
+	}
+	app.extensions['concurrency_users'] = {}
+
+	@app.teardown_request
+	def _release_slots(exc) -> None:
+		_release(g.pop('_concurrency_slots', []))
@@ -0,0 +1,367 @@
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# Office-hours mix: (action, weight). Reads dominate; writes and exports are occasional
+DEFAULT_MIX = [
+	('assets_list', 25),
+	('assets_filter', 12),
+	('maintenance_list', 12),
+	('maintenance_filter', 8),
+	('dashboard', 12),
+	('maintenance_dashboard', 8),
+	('maintenance_report', 4),
+	('maintenance_view', 6),
+	('maintenance_add', 6),
+	('maintenance_edit', 4),
+	('export_csv', 2),
+	('export_json', 1),
+]
+
+SEARCH_TERMS = ['Laptop', 'Máy', 'TB-00', 'Ghế', 'Camera', 'in']
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+_ASSET_OPTION = re.compile(r'<option value="(\d+)"[^>]*>#\d+ - ')
+_TYPE_OPTION = re.compile(r'<option value="(\d+)"[^>]*>(?!#)')
+_EDIT_LINK = re.compile(r'/maintenance/edit/(\d+)')
+
+
+def parse_users(spec: str) -> List[str]:
+	"""'a,b,c' or a zero-padded range 'nv0000002..nv0000201'."""
+	users: List[str] = []
+	for part in (p.strip() for p in spec.split(',')):
+		if not part:
+			continue
+		if '..' in part:
+			first, last = part.split('..', 1)
+			prefix = first.rstrip('0123456789')
+			width = len(first) - len(prefix)
+			start, end = int(first[len(prefix):]), int(last[len(prefix):])
+			users.extend(f'{prefix}{n:0{width}d}' for n in range(start, end + 1))
+		else:
+			users.append(part)
+	return users
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+	"""Nearest-rank percentile of already sorted samples."""
+	if not samples:
+		return 0.0
+	rank = max(int(round(pct / 100.0 * len(samples) + 0.5)) - 1, 0)
+	return samples[min(rank, len(samples) - 1)]
+
+
+class Session:
+	"""One simulated user: a keep-alive connection plus the Flask session cookie."""
+
+	def __init__(self, base_url: str, timeout: float = 30.0):
+		parts = urlsplit(base_url)
+		self.https = parts.scheme == 'https'
+		self.host = parts.hostname or 'localhost'
+		self.port = parts.port or (443 if self.https else 80)
+		self.prefix = parts.path.rstrip('/')
+		self.timeout = timeout
+		self.cookies: Dict[str, str] = {}
+		self.conn: Optional[http.client.HTTPConnection] = None
+
+	def _connect(self):
+		cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+		self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+	def close(self):
+		if self.conn is not None:
+			self.conn.close()
+			self.conn = None
+
+	def request(self, method: str, path: str, form: Optional[dict] = None) -> Tuple[int, Dict[str, str], bytes]:
+		headers = {'Accept': 'text/html,application/json', 'Connection': 'keep-alive'}
+		body = None
+		if form is not None:
+			body = urlencode(form)
+			headers['Content-Type'] = 'application/x-www-form-urlencoded'
+		if self.cookies:
+			headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+		for attempt in (0, 1):
+			if self.conn is None:
+				self._connect()
+			try:
+				self.conn.request(method, self.prefix + path, body=body, headers=headers)
+				resp = self.conn.getresponse()
+				data = resp.read()
+				break
+			except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+				# Server closed an idle keep-alive connection (e.g. worker recycled); retry once
+				self.close()
+				if attempt:
+					raise
+		for raw in resp.headers.get_all('Set-Cookie') or []:
+			cookie = SimpleCookie()
+			cookie.load(raw)
+			for key, morsel in cookie.items():
+				self.cookies[key] = morsel.value
+		if resp.getheader('Connection', '').lower() == 'close':
+			self.close()
+		return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
+
+	def login(self, username: str, password: str) -> bool:
+		status, headers, _ = self.request('POST', '/login', {'username': username, 'password': password})
+		return status == 302 and '/login' not in headers.get('location', '')
+
+
+class Scenario:
+	"""Builds concrete requests for each action from ids discovered on the site."""
+
+	def __init__(self, asset_ids: List[int], type_ids: List[int], maintenance_ids: List[int], rng: random.Random):
+		self.asset_ids = asset_ids or [1]
+		self.type_ids = type_ids
+		self.maintenance_ids = maintenance_ids or [1]
+		self.rng = rng
+
+	@classmethod
+	def discover(cls, session: Session, rng: random.Random) -> 'Scenario':
+		_, _, maint_page = session.request('GET', '/maintenance')
+		_, _, assets_page = session.request('GET', '/assets')
+		text = maint_page.decode('utf-8', 'replace')
+		return cls(
+			asset_ids=sorted({int(x) for x in _ASSET_OPTION.findall(text)}),
+			type_ids=sorted({int(x) for x in _TYPE_OPTION.findall(assets_page.decode('utf-8', 'replace'))}),
+			maintenance_ids=sorted({int(x) for x in _EDIT_LINK.findall(text)}),
+			rng=rng,
+		)
+
+	def _maintenance_form(self) -> dict:
+		rng = self.rng
+		day = date.today() - timedelta(days=rng.randint(0, 60))
+		return {
+			'asset_id': rng.choice(self.asset_ids),
+			'maintenance_date': day.isoformat(),
+			'type': rng.choice(['maintenance', 'repair', 'inspection']),
+			'description': 'Kiểm thử tải',
+			'vendor': 'NCC A',
+			'person_in_charge': 'Load test',
+			'cost': rng.randint(1, 20) * 100_000,
+			'next_due_date': (day + timedelta(days=180)).isoformat(),
+			'status': 'completed',
+		}
+
+	def build(self, action: str) -> List[Tuple[str, str, Optional[dict]]]:
+		"""Requests (method, path, form) for one action; all count towards its latency."""
+		rng = self.rng
+		if action == 'assets_list':
+			return [('GET', f'/assets?page={rng.randint(1, 5)}', None)]
+		if action == 'assets_filter':
+			params = {'search': rng.choice(SEARCH_TERMS), 'status': rng.choice(['active', 'maintenance', ''])}
+			if self.type_ids:
+				params['type_id'] = rng.choice(self.type_ids)
+			return [('GET', '/assets?' + urlencode(params), None)]
+		if action == 'maintenance_list':
+			return [('GET', f'/maintenance?page={rng.randint(1, 5)}', None)]
+		if action == 'maintenance_filter':
+			params = rng.choice([
+				{'year': date.today().year, 'month': rng.randint(1, 12)},
+				{'overdue': 1},
+				{'due_30': 1},
+				{'asset_id': rng.choice(self.asset_ids)},
+				{'search': rng.choice(['NCC', 'Viettel', 'Bảo trì'])},
+			])
+			return [('GET', '/maintenance?' + urlencode(params), None)]
+		if action == 'dashboard':
+			return [('GET', '/', None)]
+		if action == 'maintenance_dashboard':
+			return [('GET', '/maintenance/dashboard', None)]
+		if action == 'maintenance_report':
+			return [('GET', f'/maintenance/report?year={date.today().year - rng.randint(0, 2)}', None)]
+		if action == 'maintenance_view':
+			return [('GET', f'/maintenance/view/{rng.choice(self.maintenance_ids)}', None)]
+		if action == 'maintenance_add':
+			return [('GET', '/maintenance/add', None), ('POST', '/maintenance/add', self._maintenance_form())]
+		if action == 'maintenance_edit':
+			rid = rng.choice(self.maintenance_ids)
+			return [('GET', f'/maintenance/edit/{rid}', None), ('POST', f'/maintenance/edit/{rid}', self._maintenance_form())]
+		if action == 'export_csv':
+			return [('GET', '/assets/export/csv', None)]
+		if action == 'export_json':
+			return [('GET', '/assets/export/json', None)]
+		raise ValueError(f'Unknown action: {action}')
+
+
+class _Recorder:
+	"""Per-thread results, merged once the run finishes (no lock on the hot path)."""
+
+	def __init__(self):
+		self.latencies: Dict[str, List[float]] = {}
+		self.errors: Dict[str, int] = {}
+		self.queries: Dict[str, List[int]] = {}
+		self.error_samples: List[str] = []
+
+	def add(self, action: str, ms: float, error: Optional[str], queries: Optional[int]):
+		self.latencies.setdefault(action, []).append(ms)
+		if error:
+			self.errors[action] = self.errors.get(action, 0) + 1
+			if len(self.error_samples) < 20:
+				self.error_samples.append(f'{action}: {error}')
+		if queries is not None:
+			self.queries.setdefault(action, []).append(queries)
+
+
+def _check(method: str, status: int, headers: Dict[str, str]) -> Optional[str]:
+	if status >= 400:
+		return f'HTTP {status}'
+	if status in (301, 302, 303):
+		location = headers.get('location', '')
+		if '/login' in location:
+			return 'session lost (redirect to /login)'
+		if method == 'GET':
+			# Views redirect on missing records or refused access; the page was not served
+			return f'unexpected redirect to {location}'
+	return None
+
+
+def _worker(base_url: str, username: str, password: str, scenario_seed: int, ids: Scenario,
+			actions: List[str], weights: List[int], deadline: float, think: float,
+			recorder: _Recorder, stop: threading.Event):
+	rng = random.Random(scenario_seed)
+	scenario = Scenario(ids.asset_ids, ids.type_ids, ids.maintenance_ids, rng)
+	session = Session(base_url)
+	try:
+		if not session.login(username, password):
+			recorder.add('login', 0.0, f'login failed for {username}', None)
+			return
+		while not stop.is_set() and time.monotonic() < deadline:
+			action = rng.choices(actions, weights)[0]
+			started = time.perf_counter()
+			error = None
+			queries = 0
+			try:
+				for method, path, form in scenario.build(action):
+					status, headers, _ = session.request(method, path, form)
+					error = _check(method, status, headers)
+					match = _QUERIES.search(headers.get('server-timing', ''))
+					queries += int(match.group(1)) if match else 0
+					if error:
+						break
+			except (OSError, http.client.HTTPException) as exc:
+				session.close()
+				error = f'{type(exc).__name__}: {exc}'
+			recorder.add(action, (time.perf_counter() - started) * 1000, error, queries if not error else None)
+			if think > 0:
+				stop.wait(rng.expovariate(1.0 / think))
+	finally:
+		session.close()
+
+
+def run(base_url: str, users: List[str], password: str, concurrency: int = 10, duration: float = 60.0,
+		ramp_up: float = 5.0, think: float = 1.0, mix: Optional[List[Tuple[str, int]]] = None,
+		seed: int = 1, log: Callable[[str], None] = print) -> dict:
+	"""Run `concurrency` simulated users for `duration` seconds and return the report dict."""
+	if not users:
+		raise ValueError('At least one user is required')
+	mix = mix or DEFAULT_MIX
+	actions = [a for a, _ in mix]
+	weights = [w for _, w in mix]
+
+	probe = Session(base_url)
+	if not probe.login(users[0], password):
+		raise RuntimeError(f'Cannot log in as {users[0]} at {base_url}')
+	ids = Scenario.discover(probe, random.Random(seed))
+	probe.close()
+	log(f'Discovered {len(ids.asset_ids)} assets, {len(ids.type_ids)} types, '
+		f'{len(ids.maintenance_ids)} maintenance records')
+
+	stop = threading.Event()
+	recorders = [_Recorder() for _ in range(concurrency)]
+	started = time.monotonic()
+	deadline = started + ramp_up + duration
+	threads = []
+	for i in range(concurrency):
+		t = threading.Thread(
+			target=_worker, name=f'load-{i}', daemon=True,
+			args=(base_url, users[i % len(users)], password, seed * 1000 + i, ids, actions, weights,
+				  deadline, think, recorders[i], stop),
+		)
+		threads.append(t)
+		t.start()
+		if ramp_up > 0 and concurrency > 1:
+			time.sleep(ramp_up / concurrency)
+	try:
+		for t in threads:
+			t.join(max(deadline - time.monotonic(), 0) + 60)
+	except KeyboardInterrupt:
+		stop.set()
+		log('Interrupted, collecting partial results')
+		for t in threads:
+			t.join(5)
+	stop.set()
+	return summarize(recorders, time.monotonic() - started)
+
+
+def summarize(recorders: List[_Recorder], elapsed: float) -> dict:
+	merged = _Recorder()
+	for rec in recorders:
+		for action, values in rec.latencies.items():
+			merged.latencies.setdefault(action, []).extend(values)
+		for action, count in rec.errors.items():
+			merged.errors[action] = merged.errors.get(action, 0) + count
+		for action, values in rec.queries.items():
+			merged.queries.setdefault(action, []).extend(values)
+		merged.error_samples.extend(rec.error_samples)
+
+	def describe(values: List[float], errors: int, queries: List[int]) -> dict:
+		values = sorted(values)
+		return {
+			'requests': len(values),
+			'errors': errors,
+			'error_rate': round(errors / len(values), 4) if values else 0.0,
+			'rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+			'mean_ms': round(sum(values) / len(values), 2) if values else 0.0,
+			'p50_ms': round(percentile(values, 50), 2),
+			'p90_ms': round(percentile(values, 90), 2),
+			'p95_ms': round(percentile(values, 95), 2),
+			'p99_ms': round(percentile(values, 99), 2),
+			'max_ms': round(values[-1], 2) if values else 0.0,
+			'avg_queries': round(sum(queries) / len(queries), 1) if queries else None,
+		}
+
+	endpoints = {
+		action: describe(values, merged.errors.get(action, 0), merged.queries.get(action, []))
+		for action, values in sorted(merged.latencies.items())
+	}
+	all_values = [v for values in merged.latencies.values() for v in values]
+	return {
+		'elapsed_s': round(elapsed, 2),
+		'total': describe(all_values, sum(merged.errors.values()), []),
+		'endpoints': endpoints,
+		'error_samples': merged.error_samples[:20],
+	}
+
+
+def format_report(report: dict) -> str:
+	header = f"{'endpoint':<24}{'req':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}{'sql':>7}"
+	lines = [header, '-' * len(header)]
+
+	def row(name, s):
+		sql = '' if s.get('avg_queries') is None else f"{s['avg_queries']:.0f}"
+		lines.append(
+			f"{name:<24}{s['requests']:>7}{s['error_rate'] * 100:>6.1f}%{s['rps']:>8.1f}"
+			f"{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}{sql:>7}"
+		)
+
+	for name, stats in report['endpoints'].items():
+		row(name, stats)
+	lines.append('-' * len(header))
+	row('TOTAL', report['total'])
+	lines.append(f"Elapsed {report['elapsed_s']}s; latency in ms; sql = average queries per action (Server-Timing)")
+	for sample in report.get('error_samples', []):
+		lines.append(f'  ! {sample}')
+	return '\n'.join(lines)
+
+
+def dump(report: dict, path: str, label: str = '', settings: Optional[dict] = None) -> None:
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump({'label': label, 'settings': settings or {}, **report}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,163 @@
+import os
+import time
+from typing import Optional
+
+from flask import Flask, Response, g, request
+
+# prometheus_client is optional: without it /metrics answers 503 and the
+# request hooks are not installed at all.
+try:
+	import prometheus_client  # type: ignore
+	from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram  # type: ignore
+	from prometheus_client import multiprocess  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+	prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REQUEST_LATENCY = None
+REQUESTS_IN_PROGRESS = None
+DB_POOL_CHECKED_OUT = None
+DB_POOL_OVERFLOW = None
+DB_POOL_SIZE = None
+EXPORT_DURATION = None
+CACHE_REQUESTS = None
+CACHE_ENTRIES = None
+LIMITER_REJECTED = None
+
+
+def multiprocess_enabled() -> bool:
+	return bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def _create_metrics() -> None:
+	global REQUEST_LATENCY, REQUESTS_IN_PROGRESS, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_SIZE, EXPORT_DURATION
+	global CACHE_REQUESTS, CACHE_ENTRIES, LIMITER_REJECTED
+	if REQUEST_LATENCY is not None:
+		return
+	REQUEST_LATENCY = Histogram(
+		'qlts_http_request_duration_seconds', 'Request latency by endpoint and status',
+		['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+	)
+	REQUESTS_IN_PROGRESS = Gauge(
+		'qlts_http_requests_in_progress', 'Requests currently being handled',
+		multiprocess_mode='livesum'
+	)
+	DB_POOL_CHECKED_OUT = Gauge(
+		'qlts_db_pool_checked_out', 'DB connections checked out of the pool',
+		multiprocess_mode='livesum'
+	)
+	DB_POOL_OVERFLOW = Gauge(
+		'qlts_db_pool_overflow', 'DB connections opened beyond pool_size',
+		multiprocess_mode='livesum'
+	)
+	DB_POOL_SIZE = Gauge(
+		'qlts_db_pool_size', 'Configured DB pool size per worker',
+		multiprocess_mode='livesum'
+	)
+	EXPORT_DURATION = Histogram(
+		'qlts_export_duration_seconds', 'Time to build an asset export',
+		['format'], buckets=EXPORT_BUCKETS
+	)
+	# Hit ratio = rate(result="hit") / rate(all) per cache
+	CACHE_REQUESTS = Counter(
+		'qlts_cache_requests_total', 'Cache lookups by result',
+		['cache', 'result']
+	)
+	CACHE_ENTRIES = Gauge(
+		'qlts_cache_entries', 'Entries held by each in-process cache',
+		['cache'], multiprocess_mode='livesum'
+	)
+	LIMITER_REJECTED = Counter(
+		'qlts_limiter_rejected_total', 'Requests turned away by the concurrency limiter',
+		['limit', 'status']
+	)
+
+
+def observe_export(fmt: str, seconds: float) -> None:
+	if EXPORT_DURATION is not None:
+		EXPORT_DURATION.labels(format=fmt).observe(seconds)
+
+
+def observe_rejected(limit: str, status: int) -> None:
+	if LIMITER_REJECTED is not None:
+		LIMITER_REJECTED.labels(limit=limit, status=str(status)).inc()
+
+
+def observe_cache(name: str, hit: bool) -> None:
+	if CACHE_REQUESTS is not None:
+		CACHE_REQUESTS.labels(cache=name, result='hit' if hit else 'miss').inc()
+
+
+def set_cache_entries(name: str, size: int) -> None:
+	if CACHE_ENTRIES is not None:
+		CACHE_ENTRIES.labels(cache=name).set(size)
+
+
+def _update_pool_gauges() -> None:
+	from models import db
+	try:
+		pool = db.engine.pool
+	except Exception:
+		return
+	if hasattr(pool, 'checkedout'):
+		DB_POOL_CHECKED_OUT.set(pool.checkedout())
+	if hasattr(pool, 'overflow'):
+		DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+	if hasattr(pool, 'size'):
+		DB_POOL_SIZE.set(pool.size())
+
+
+def _start_request():
+	g._metrics_start = time.perf_counter()
+	REQUESTS_IN_PROGRESS.inc()
+
+
+def _finish_request(response):
+	started: Optional[float] = g.get('_metrics_start')
+	if started is not None:
+		latency = REQUEST_LATENCY.labels(
+			endpoint=request.endpoint or 'unknown',
+			method=request.method,
+			status=str(response.status_code)
+		)
+		if response.is_streamed:
+			# Streamed bodies are rendered after this hook; time them to the last byte
+			response.call_on_close(lambda: latency.observe(time.perf_counter() - started))
+		else:
+			latency.observe(time.perf_counter() - started)
+		_update_pool_gauges()
+	return response
+
+
+def _teardown_request(exc):
+	if g.pop('_metrics_start', None) is not None:
+		REQUESTS_IN_PROGRESS.dec()
+
+
+def render_metrics() -> Response:
+	"""Text exposition of all metrics; aggregates worker files in multiprocess mode."""
+	if prometheus_client is None:
+		return Response('prometheus_client is not installed\n', status=503, mimetype='text/plain')
+	if multiprocess_enabled():
+		registry = CollectorRegistry()
+		multiprocess.MultiProcessCollector(registry)
+	else:
+		registry = prometheus_client.REGISTRY
+	return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int) -> None:
+	"""Called by the gunicorn master when a worker exits (multiprocess mode)."""
+	if prometheus_client is not None and multiprocess_enabled():
+		multiprocess.mark_process_dead(pid)
+
+
+def init_app(app: Flask) -> None:
+	if prometheus_client is None or not app.config.get('METRICS_ENABLED', True):
+		return
+	_create_metrics()
+	app.before_request(_start_request)
+	app.after_request(_finish_request)
+	app.teardown_request(_teardown_request)
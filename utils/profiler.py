@@ -0,0 +1,132 @@
+import cProfile
+import os
+import pstats
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app, g, render_template, request, session
+
+from utils import sql_stats
+
+# Call-tree nodes below this share of the total time are folded away
+_MIN_SHARE = 0.01
+_MAX_DEPTH = 14
+
+
+def _func_label(func) -> str:
+	filename, line, name = func
+	if filename == '~':
+		return name
+	return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def _call_tree(st: pstats.Stats, total: float) -> List[dict]:
+	"""Approximate call tree (flame graph data) from cProfile caller edges."""
+	callees: Dict[tuple, Dict[tuple, float]] = {}
+	for func, (_cc, _nc, _tt, _ct, callers) in st.stats.items():
+		for caller, edge in callers.items():
+			callees.setdefault(caller, {})[func] = edge[3]
+	roots = [f for f, v in st.stats.items() if not v[4]]
+
+	def build(func, cumtime, depth, path):
+		node = {'label': _func_label(func), 'time': cumtime, 'share': cumtime / total if total else 0, 'children': []}
+		if depth >= _MAX_DEPTH:
+			return node
+		for child, child_time in sorted(callees.get(func, {}).items(), key=lambda kv: kv[1], reverse=True):
+			if child in path or child_time < total * _MIN_SHARE:
+				continue
+			child_node = build(child, min(child_time, cumtime), depth + 1, path | {child})
+			child_node['share'] = child_node['time'] / cumtime if cumtime else 0
+			node['children'].append(child_node)
+		return node
+
+	nodes = []
+	for root in roots:
+		ct = st.stats[root][3]
+		if ct >= total * _MIN_SHARE:
+			nodes.append(build(root, ct, 0, {root}))
+	nodes.sort(key=lambda n: n['time'], reverse=True)
+	for n in nodes:
+		n['share'] = n['time'] / total if total else 0
+	return nodes
+
+
+def _wants_profile() -> bool:
+	return (
+		current_app.config.get('PROFILER_ENABLED', True)
+		and request.args.get('_profile') == '1'
+		and session.get('role') == 'admin'
+	)
+
+
+def _start_profile():
+	if _wants_profile():
+		profile = cProfile.Profile()
+		g._profiler = profile
+		profile.enable()
+
+
+def _finish_profile(response):
+	profile: Optional[cProfile.Profile] = g.pop('_profiler', None)
+	if profile is None:
+		return response
+	# Streamed bodies are produced after the view returns; run them while the
+	# profiler is still on so they show up in the report. iter_encoded(): the
+	# streamed templates yield str chunks
+	if response.is_streamed:
+		b''.join(response.iter_encoded())
+	profile.disable()
+
+	st = pstats.Stats(profile)
+	total = sum(v[2] for v in st.stats.values())
+	st.sort_stats('cumulative')
+	rows = []
+	for func in st.fcn_list[:40]:
+		cc, nc, tt, ct, _callers = st.stats[func]
+		rows.append({
+			'function': _func_label(func),
+			'ncalls': nc if nc == cc else f'{nc}/{cc}',
+			'tottime': tt * 1000,
+			'cumtime': ct * 1000,
+			'percall': (ct / nc * 1000) if nc else 0,
+		})
+	stats = sql_stats.current_stats()
+	sql_rows = []
+	if stats is not None:
+		sql_rows = sorted(
+			({'sql': fp, 'count': c, 'ms': ms} for fp, (c, ms) in stats.statements.items()),
+			key=lambda r: r['ms'], reverse=True
+		)
+
+	profile_dir = current_app.config.get('PROFILE_DIR', 'instance/profiles')
+	if not os.path.isabs(profile_dir):
+		profile_dir = os.path.join(current_app.root_path, profile_dir)
+	os.makedirs(profile_dir, exist_ok=True)
+	base = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}_{request.endpoint or 'unknown'}"
+	st.dump_stats(os.path.join(profile_dir, base + '.prof'))
+
+	html = render_template(
+		'dev/profile.html',
+		path=request.full_path.rstrip('?'),
+		status=response.status_code,
+		total_ms=total * 1000,
+		rows=rows,
+		tree=_call_tree(st, total),
+		sql_rows=sql_rows,
+		sql_count=stats.count if stats else 0,
+		sql_ms=stats.total_ms if stats else 0,
+		prof_file=base + '.prof',
+	)
+	with open(os.path.join(profile_dir, base + '.html'), 'w', encoding='utf-8') as f:
+		f.write(html)
+	response = current_app.response_class(html, mimetype='text/html')
+	response.headers['Cache-Control'] = 'no-store'
+	return response
+
+
+def init_app(app: Flask) -> None:
+	"""Admins can append ?_profile=1 to any URL to get a cProfile report."""
+	if not app.config.get('PROFILER_ENABLED', True):
+		return
+	app.before_request(_start_profile)
+	app.after_request(_finish_profile)
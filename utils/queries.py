@@ -0,0 +1,250 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, String, cast, func, literal, select, tuple_, union_all
+
+from models import Asset, AssetType, AuditLog, MaintenanceRecord, User, db
+from utils import counters
+
+# Filters are written as plain comparisons on indexed columns so the planner
+# can use a range scan. Wrapping a column in a function (extract, date, lower)
+# forces a full scan; test/test_query_plans.py guards against that.
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+	"""Half-open [first day, first day of next month)."""
+	start = date(year, month, 1)
+	end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+	return start, end
+
+
+def year_range(year: int) -> Tuple[date, date]:
+	return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def _asset_criteria(search: str = '', type_id: Optional[int] = None, status: Optional[str] = None,
+					condition: Optional[str] = None, year: Optional[int] = None, exclude: str = '') -> list:
+	"""WHERE clauses of the asset list; `exclude` drops one facet's own filter."""
+	criteria = []
+	if search:
+		criteria.append(Asset.name.ilike(f'%{search}%'))
+	if type_id and exclude != 'type':
+		criteria.append(Asset.asset_type_id == type_id)
+	if status and exclude != 'status':
+		criteria.append(Asset.status == status)
+	if condition and exclude != 'condition':
+		criteria.append(Asset.condition_label == condition)
+	if year and exclude != 'year':
+		start, end = year_range(year)
+		criteria.extend([Asset.purchase_date >= start, Asset.purchase_date < end])
+	return criteria
+
+
+def asset_list_query(search: str = '', type_id: Optional[int] = None, status: Optional[str] = None,
+					 condition: Optional[str] = None, year: Optional[int] = None):
+	query = Asset.query.filter(*_asset_criteria(search, type_id, status, condition, year))
+	# Stable order: assigned_users is subquery-loaded by re-running this query, which
+	# must return the same page (without ORDER BY SQLite may walk a different index)
+	return query.order_by(Asset.id)
+
+
+ASSET_FACETS = ('type', 'status', 'condition', 'year')
+
+
+def asset_facet_counts(search: str = '', type_id: Optional[int] = None, status: Optional[str] = None,
+					   condition: Optional[str] = None, year: Optional[int] = None) -> Dict[str, List[Tuple[str, int]]]:
+	"""Counts per value of each facet in one UNION ALL of grouped selects.
+
+	Each branch applies every active filter except its own facet, so the panel
+	shows how many results picking another value of that facet would give.
+	GROUPING SETS would need one shared WHERE and is missing on SQLite. The
+	soft-delete criterion is spelled out: the global one (utils/soft_delete.py)
+	only reaches ORM entity selects, not a UNION of column selects.
+	"""
+	columns = {
+		'type': Asset.asset_type_id,
+		'status': Asset.status,
+		'condition': Asset.condition_label,
+		'year': db.extract('year', Asset.purchase_date),
+	}
+	branches = []
+	for facet in ASSET_FACETS:
+		column = columns[facet]
+		branches.append(
+			select(literal(facet).label('facet'), cast(column, String).label('value'), func.count().label('n'))
+			.where(Asset.deleted_at.is_(None), *_asset_criteria(search, type_id, status, condition, year, exclude=facet))
+			.group_by(column)
+		)
+	result: Dict[str, List[Tuple[str, int]]] = {facet: [] for facet in ASSET_FACETS}
+	for facet, value, n in db.session.execute(union_all(*branches)):
+		if value is not None:
+			result[facet].append((value, n))
+	for facet in ASSET_FACETS:
+		result[facet].sort(key=lambda item: -item[1])
+	return result
+
+
+def maintenance_window(start: date, end: date):
+	"""Records with maintenance_date in [start, end) (calendar, dashboard, report)."""
+	return MaintenanceRecord.query.filter(
+		MaintenanceRecord.maintenance_date >= start,
+		MaintenanceRecord.maintenance_date < end,
+	)
+
+
+def overdue_query(today: date):
+	return MaintenanceRecord.query.filter(
+		MaintenanceRecord.next_due_date.isnot(None),
+		MaintenanceRecord.next_due_date < today,
+	)
+
+
+def due_within_query(today: date, days: int = 30):
+	return MaintenanceRecord.query.filter(
+		MaintenanceRecord.next_due_date.isnot(None),
+		MaintenanceRecord.next_due_date.between(today, today + timedelta(days=days)),
+	)
+
+
+def maintenance_list_query(search: str = '', asset_id: Optional[int] = None, month: Optional[int] = None,
+						   year: Optional[int] = None, overdue: bool = False, due_30: bool = False,
+						   status: Optional[str] = None, has_cost: bool = False, today: Optional[date] = None):
+	today = today or datetime.utcnow().date()
+	if overdue:
+		query = overdue_query(today)
+	elif due_30:
+		query = due_within_query(today)
+	else:
+		query = MaintenanceRecord.query
+	if asset_id:
+		query = query.filter(MaintenanceRecord.asset_id == asset_id)
+	if search:
+		like = f'%{search}%'
+		query = query.filter(
+			MaintenanceRecord.description.ilike(like)
+			| MaintenanceRecord.vendor.ilike(like)
+			| MaintenanceRecord.person_in_charge.ilike(like)
+		)
+	if year:
+		start, end = month_range(year, month) if month else year_range(year)
+		query = query.filter(MaintenanceRecord.maintenance_date >= start, MaintenanceRecord.maintenance_date < end)
+	elif month:
+		# Same month in every year has no single range; rare, so left unindexed
+		query = query.filter(db.extract('month', MaintenanceRecord.maintenance_date) == month)
+	if status:
+		query = query.filter(MaintenanceRecord.status == status)
+	if has_cost:
+		return query.filter(MaintenanceRecord.cost > 0).order_by(MaintenanceRecord.cost.desc())
+	return query.order_by(MaintenanceRecord.maintenance_date.desc())
+
+
+def schedule_missing_maintenance(today: date) -> int:
+	"""Add a yearly scheduled record for every live asset without a due date >= today.
+
+	One INSERT ... SELECT with NOT EXISTS instead of a lookup per asset. Runs in the
+	session's transaction; counters are adjusted since the ORM does not see the rows.
+	"""
+	m = MaintenanceRecord.__table__
+	has_future = select(m.c.id).where(
+		m.c.asset_id == Asset.id, m.c.deleted_at.is_(None), m.c.next_due_date >= today,
+	).exists()
+	now = datetime.utcnow()
+	source = select(
+		Asset.id,
+		literal(today, Date),
+		literal('maintenance'),
+		literal('Lịch bảo trì định kỳ (tự động)'),
+		literal('System'),
+		literal(0.0),
+		literal(today + timedelta(days=365), Date),
+		literal('scheduled'),
+		literal(now, DateTime),
+		literal(now, DateTime),
+	).where(Asset.deleted_at.is_(None), ~has_future)
+	stmt = m.insert().from_select(
+		['asset_id', 'maintenance_date', 'type', 'description', 'person_in_charge', 'cost',
+		 'next_due_date', 'status', 'created_at', 'updated_at'],
+		source,
+	)
+	conn = db.session.connection()
+	created = conn.execute(stmt).rowcount or 0
+	if created:
+		counters.apply(conn, {'maintenance': created}, (m.name,), db.session())
+	return created
+
+
+def audit_log_query(user_id: Optional[int] = None, module: str = '', date_from: Optional[date] = None,
+					date_to: Optional[date] = None):
+	"""Newest first; date_to is inclusive (whole day)."""
+	query = AuditLog.query
+	if user_id:
+		query = query.filter(AuditLog.user_id == user_id)
+	if module:
+		query = query.filter(AuditLog.module == module)
+	if date_from:
+		query = query.filter(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
+	if date_to:
+		query = query.filter(AuditLog.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+	return query.order_by(AuditLog.created_at.desc())
+
+
+TRASH_MODULES = {
+	'assets': Asset,
+	'asset_types': AssetType,
+	'users': User,
+	'maintenance': MaintenanceRecord,
+}
+
+
+def trash_counts() -> Dict[str, int]:
+	"""Trashed rows per module in one UNION ALL of counts, each on its trash index."""
+	branches = [
+		select(literal(module).label('module'), func.count().label('n'))
+		.select_from(model.__table__)
+		.where(model.__table__.c.deleted_at.isnot(None))
+		for module, model in TRASH_MODULES.items()
+	]
+	return {module: n for module, n in db.session.execute(union_all(*branches))}
+
+
+def _encode_cursor(row) -> str:
+	return f'{row.deleted_at.isoformat()}_{row.id}'
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+	try:
+		deleted_at, row_id = cursor.rsplit('_', 1)
+		return datetime.fromisoformat(deleted_at), int(row_id)
+	except (AttributeError, ValueError):
+		return None
+
+
+class KeysetPage:
+	"""One page of a trash module, most recently deleted first.
+
+	The position is a cursor (deleted_at, id) of the last row shown instead of an
+	OFFSET, so later pages cost the same as the first one: the trash index is
+	entered at the cursor. The query runs when rows is first read, which keeps
+	it inside the streamed body.
+	"""
+
+	def __init__(self, model, after: Optional[str] = None, per_page: int = 50, options=()):
+		self.per_page = per_page
+		self.after = after if _decode_cursor(after) else None
+		query = model.query.execution_options(include_deleted=True) \
+			.filter(model.deleted_at.isnot(None)).options(*options)
+		if self.after:
+			query = query.filter(tuple_(model.deleted_at, model.id) < tuple_(*_decode_cursor(self.after)))
+		self._query = query.order_by(model.deleted_at.desc(), model.id.desc()).limit(per_page + 1)
+		self._rows = None
+
+	@property
+	def rows(self) -> list:
+		if self._rows is None:
+			self._rows = self._query.all()
+		return self._rows[:self.per_page]
+
+	@property
+	def next_cursor(self) -> Optional[str]:
+		rows = self.rows
+		return _encode_cursor(rows[-1]) if len(self._rows) > self.per_page else None
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from flask import Flask, current_app
+
+# fcntl is POSIX only: without it calls are coalesced within the process only
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+	fcntl = None
+
+logger = logging.getLogger('qlts.singleflight')
+
+T = TypeVar('T')
+_MISSING = object()
+# Files of finished flights are removed when later results are written
+RESULT_MAX_AGE = 600
+LOCK_FILE_MAX_AGE = 24 * 3600
+
+
+class _Call:
+	def __init__(self):
+		self.done = threading.Event()
+		self.result: Any = None
+		self.error: Any = None
+
+
+_calls: Dict[str, _Call] = {}
+_calls_lock = threading.Lock()
+# Directory -> whether results may be read from it (checked once per process)
+_private_dirs: Dict[str, bool] = {}
+
+
+def do(key: Hashable, fn: Callable[[], T]) -> T:
+	"""Run fn once for all concurrent callers with the same key; share its result.
+
+	Within a worker, threads asking for a key already being computed wait for
+	that computation. Across workers, the computing thread holds an flock on
+	<SINGLE_FLIGHT_DIR>/<key hash>.lock and leaves the pickled result next to
+	it, so workers that queued on the lock meanwhile read it instead of
+	computing again. Callers arriving after a flight has landed start a new
+	one: this coalesces, it does not cache. Keys must carry everything the
+	result depends on (endpoint, parameters and data version stamps). A waiter
+	that times out (SINGLE_FLIGHT_TIMEOUT) computes on its own rather than
+	failing.
+	"""
+	digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+	timeout = current_app.config.get('SINGLE_FLIGHT_TIMEOUT', 30)
+	with _calls_lock:
+		call = _calls.get(digest)
+		leader = call is None
+		if leader:
+			call = _calls[digest] = _Call()
+	if not leader:
+		if not call.done.wait(timeout):
+			return fn()
+		if call.error is not None:
+			raise call.error
+		return call.result
+	try:
+		call.result = _shared(digest, fn, timeout)
+		return call.result
+	except BaseException as exc:
+		call.error = exc
+		raise
+	finally:
+		with _calls_lock:
+			_calls.pop(digest, None)
+		call.done.set()
+
+
+def _shared(digest: str, fn: Callable[[], T], timeout: float) -> T:
+	directory = current_app.config.get('SINGLE_FLIGHT_DIR')
+	if not directory or fcntl is None or not _private(directory):
+		return fn()
+	path = os.path.join(directory, digest)
+	waiting_since = time.time_ns()
+	fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+	try:
+		locked = _lock(fd, timeout)
+		# A worker that held the lock while we queued left its result: share it.
+		# Results older than our arrival belong to an earlier flight and are ignored
+		result = _read(path, waiting_since)
+		if result is _MISSING:
+			result = fn()
+			if locked:
+				_write(path, result)
+		return result
+	finally:
+		fcntl.flock(fd, fcntl.LOCK_UN)
+		os.close(fd)
+
+
+def _private(directory: str) -> bool:
+	"""Results are unpickled, so they are only read from a directory owned by
+	this user and closed to everyone else (a planted file could run code)."""
+	private = _private_dirs.get(directory)
+	if private is None:
+		try:
+			st = os.stat(directory)
+			private = stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+		except OSError:
+			private = False
+		if not private:
+			logger.warning('SINGLE_FLIGHT_DIR %s is missing, not owned by this user or open to others '
+						   '(needs mode 0700); coalescing within each worker only', directory)
+		_private_dirs[directory] = private
+	return private
+
+
+def _lock(fd: int, timeout: float) -> bool:
+	deadline = time.monotonic() + timeout
+	delay = 0.005
+	while True:
+		try:
+			fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+			return True
+		except OSError:
+			if time.monotonic() >= deadline:
+				return False
+			time.sleep(delay)
+			delay = min(delay * 2, 0.1)
+
+
+def _read(path: str, not_before_ns: int):
+	try:
+		if os.stat(path).st_mtime_ns < not_before_ns:
+			return _MISSING
+		with open(path, 'rb') as f:
+			return pickle.load(f)
+	except (OSError, EOFError, pickle.UnpicklingError):
+		return _MISSING
+
+
+def _write(path: str, result: Any) -> None:
+	try:
+		tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+		with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+			pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_path, path)
+	except (OSError, pickle.PicklingError, TypeError, AttributeError):
+		# Unpicklable results are simply not shared across workers
+		return
+	_prune(os.path.dirname(path))
+
+
+def _prune(directory: str) -> None:
+	now = time.time()
+	for entry in os.scandir(directory):
+		try:
+			max_age = LOCK_FILE_MAX_AGE if entry.name.endswith('.lock') else RESULT_MAX_AGE
+			if now - entry.stat().st_mtime > max_age:
+				os.remove(entry.path)
+		except OSError:
+			continue
+
+
+def init_app(app: Flask) -> None:
+	"""Create SINGLE_FLIGHT_DIR, mode 0700 (default instance/singleflight; empty = per process)."""
+	if app.config.get('SINGLE_FLIGHT_DIR') is None:
+		app.config['SINGLE_FLIGHT_DIR'] = os.path.join(app.instance_path, 'singleflight')
+	directory = app.config['SINGLE_FLIGHT_DIR']
+	if directory:
+		os.makedirs(directory, mode=0o700, exist_ok=True)
+		if os.stat(directory).st_uid == os.getuid():
+			os.chmod(directory, 0o700)
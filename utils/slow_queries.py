@@ -0,0 +1,160 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from flask import Flask, has_request_context, request
+
+from utils import background, sql_stats
+
+logger = logging.getLogger('qlts.slow_sql')
+
+_threshold_ms = 0.0
+_log_path = ''
+_explain_ttl = 600.0
+# fingerprint -> (captured_at, plan lines); one EXPLAIN per shape per TTL
+_plan_cache: Dict[str, tuple] = {}
+_plan_lock = threading.Lock()
+
+_EXPLAINABLE = ('select', 'with', 'update', 'delete', 'insert')
+
+
+def param_shapes(parameters, executemany: bool = False):
+	"""Types of the bound parameters (never their values)."""
+	if executemany and isinstance(parameters, (list, tuple)) and parameters:
+		return {'rows': len(parameters), 'row': param_shapes(parameters[0])}
+	if isinstance(parameters, dict):
+		return {k: type(v).__name__ for k, v in parameters.items()}
+	if isinstance(parameters, (list, tuple)):
+		return [type(v).__name__ for v in parameters]
+	return type(parameters).__name__ if parameters is not None else None
+
+
+def explain(engine, statement: str, parameters) -> List[str]:
+	"""Plan of statement on its own connection: SQLite QUERY PLAN, Postgres without ANALYZE."""
+	dialect = engine.dialect.name
+	if dialect == 'sqlite':
+		prefix = 'EXPLAIN QUERY PLAN '
+	elif dialect == 'postgresql':
+		prefix = 'EXPLAIN (ANALYZE off) '
+	else:
+		prefix = 'EXPLAIN '
+	with engine.connect() as conn:
+		rows = conn.exec_driver_sql(prefix + statement, parameters if parameters else ()).fetchall()
+	if dialect == 'sqlite':
+		# (id, parent, notused, detail)
+		return [str(r[-1]) for r in rows]
+	return [str(r[0]) for r in rows]
+
+
+def _capture(engine, record: dict, statement: str, parameters) -> None:
+	fp = record['sql']
+	now = time.monotonic()
+	with _plan_lock:
+		cached = _plan_cache.get(fp)
+	if cached and now - cached[0] < _explain_ttl:
+		record['plan'] = cached[1]
+	else:
+		try:
+			plan = explain(engine, statement, parameters)
+		except Exception as e:
+			plan = [f'EXPLAIN failed: {e}']
+		with _plan_lock:
+			_plan_cache[fp] = (now, plan)
+		record['plan'] = plan
+	logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def _on_statement(conn, statement, parameters, elapsed_ms):
+	if _threshold_ms <= 0 or elapsed_ms < _threshold_ms:
+		return
+	stripped = statement.lstrip()
+	if stripped[:7].upper() == 'EXPLAIN':
+		return
+	executemany = isinstance(parameters, list) and parameters and isinstance(parameters[0], (list, tuple, dict))
+	record = {
+		'ts': datetime.utcnow().isoformat(timespec='seconds'),
+		'ms': round(elapsed_ms, 2),
+		'sql': sql_stats.fingerprint(statement),
+		'params': param_shapes(parameters, bool(executemany)),
+		'route': request.endpoint if has_request_context() else 'cli',
+		'pid': os.getpid(),
+	}
+	explainable = stripped.split(None, 1)[0].lower() in _EXPLAINABLE if stripped else False
+	if not explainable or executemany:
+		record['plan'] = None
+		logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+		return
+	# EXPLAIN runs off the request path on a separate pooled connection
+	background.submit(_capture, conn.engine, record, statement, parameters)
+
+
+def top_offenders(limit: int = 50) -> List[dict]:
+	"""Aggregate the slow-query log files (all workers) by fingerprint."""
+	if not _log_path:
+		return []
+	groups: Dict[str, dict] = {}
+	for path in sorted(glob.glob(_log_path + '*')):
+		try:
+			with open(path, encoding='utf-8') as f:
+				for line in f:
+					try:
+						rec = json.loads(line)
+					except ValueError:
+						continue
+					g = groups.get(rec.get('sql'))
+					if g is None:
+						g = groups[rec.get('sql')] = {
+							'sql': rec.get('sql'), 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+							'routes': set(), 'last_seen': '', 'plan': None, 'params': None
+						}
+					g['count'] += 1
+					g['total_ms'] += rec.get('ms', 0)
+					g['max_ms'] = max(g['max_ms'], rec.get('ms', 0))
+					g['routes'].add(rec.get('route') or '')
+					if rec.get('ts', '') >= g['last_seen']:
+						g['last_seen'] = rec.get('ts', '')
+						g['plan'] = rec.get('plan') or g['plan']
+						g['params'] = rec.get('params')
+		except OSError:
+			continue
+	result = sorted(groups.values(), key=lambda x: x['total_ms'], reverse=True)[:limit]
+	for g in result:
+		g['avg_ms'] = round(g['total_ms'] / g['count'], 2)
+		g['total_ms'] = round(g['total_ms'], 2)
+		g['routes'] = sorted(g['routes'])
+	return result
+
+
+def init_app(app: Flask) -> None:
+	"""Log statements slower than SLOW_QUERY_MS (0 disables) with their plan."""
+	global _threshold_ms, _log_path, _explain_ttl
+	_threshold_ms = float(app.config.get('SLOW_QUERY_MS', 0) or 0)
+	if _threshold_ms <= 0:
+		return
+	_explain_ttl = float(app.config.get('SLOW_QUERY_EXPLAIN_TTL', 600))
+	log_path = app.config.get('SLOW_QUERY_LOG', 'instance/logs/slow_queries.log')
+	if not os.path.isabs(log_path):
+		log_path = os.path.join(app.root_path, log_path)
+	os.makedirs(os.path.dirname(log_path), exist_ok=True)
+	_log_path = log_path
+	if not any(isinstance(h, RotatingFileHandler) for h in logger.handlers):
+		# One JSON object per line. Several workers may append to the same
+		# file; a line or two can be lost around a rotation, which is fine for
+		# diagnostics.
+		handler = RotatingFileHandler(
+			log_path,
+			maxBytes=int(app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024)),
+			backupCount=int(app.config.get('SLOW_QUERY_LOG_BACKUPS', 3)),
+			encoding='utf-8'
+		)
+		handler.setFormatter(logging.Formatter('%(message)s'))
+		logger.addHandler(handler)
+		logger.setLevel(logging.WARNING)
+		logger.propagate = False
+	sql_stats.add_statement_listener(_on_statement)
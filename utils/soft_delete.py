@@ -0,0 +1,95 @@
+from functools import lru_cache
+from typing import Set
+
+from flask import Flask
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from sqlalchemy.sql import Select
+
+from models import SoftDeleteMixin
+
+
+def _live(cls):
+	return cls.deleted_at.is_(None)
+
+
+def _soft_deletable_entities(statement) -> list:
+	"""Soft-deletable entities (classes or aliases) selected at the top level of statement."""
+	entities = []
+	for description in getattr(statement, 'column_descriptions', ()):
+		entity = description.get('entity')
+		if entity is not None and issubclass(inspect(entity).mapper.class_, SoftDeleteMixin) \
+				and entity not in entities:
+			entities.append(entity)
+	return entities
+
+
+def _root_classes(statement) -> Set[type]:
+	return {inspect(entity).mapper.class_ for entity in _soft_deletable_entities(statement)}
+
+
+def _counted_query(statement):
+	"""The query inside Query.count()'s SELECT count(*) FROM (<query>) AS anon_1, or None."""
+	if not isinstance(statement, Select) or statement.whereclause is not None:
+		return None
+	if len(statement.selected_columns) != 1 or _root_classes(statement):
+		return None
+	# The explicit FROM list: get_final_froms() would build the subquery's
+	# column collection, over 100 KB per count of the asset list
+	froms = statement._from_obj
+	if len(froms) != 1:
+		return None
+	inner = froms[0]
+	while not isinstance(inner, Select) and hasattr(inner, 'element'):
+		inner = inner.element
+	return inner if isinstance(inner, Select) else None
+
+
+@lru_cache(maxsize=None)
+def _criteria(cls):
+	# Options are immutable: one per class keeps per-query work to the cache key
+	return with_loader_criteria(cls, _live, include_aliases=True, propagate_to_loaders=False)
+
+
+def live_only(statement, classes=None):
+	"""statement restricted to live rows of its (or the given) soft-deletable classes."""
+	if classes is None:
+		counted = _counted_query(statement)
+		if counted is not None:
+			# Filter inside the subquery with a plain WHERE: loader criteria do not
+			# reach into subqueries, and on the outer select they make the ORM
+			# adapt the whole inner query on every execution
+			entities = _soft_deletable_entities(counted)
+			if not entities:
+				return statement
+			inner = counted.where(*(_live(entity) for entity in entities))
+			return select(*statement.selected_columns).select_from(inner.subquery()) \
+				.execution_options(**statement.get_execution_options())
+		classes = _root_classes(statement)
+	if not classes:
+		return statement
+	return statement.options(*(_criteria(cls) for cls in sorted(classes, key=lambda c: c.__name__)))
+
+
+def _do_orm_execute(state: ORMExecuteState) -> None:
+	if not state.is_select or state.is_column_load or state.execution_options.get('include_deleted'):
+		return
+	if state.is_relationship_load:
+		# Collections (type.assets, user.assets, assigned users) list live rows;
+		# many-to-one references (record.asset) still resolve to trashed parents
+		prop = getattr(state.loader_strategy_path, 'prop', None)
+		target = prop.mapper.class_ if prop is not None and prop.uselist else None
+		if target is not None and issubclass(target, SoftDeleteMixin):
+			state.statement = live_only(state.statement, {target})
+		return
+	# Only the selected entities: joined eager loads (asset.asset_type) keep
+	# trashed parents, like the lazy loads above
+	state.statement = live_only(state.statement)
+
+
+def init_app(app: Flask) -> None:
+	"""Hide soft-deleted rows from ORM selects unless run with
+	execution_options(include_deleted=True) (trash, restore)."""
+	if not getattr(init_app, '_listening', False):
+		event.listen(Session, 'do_orm_execute', _do_orm_execute)
+		init_app._listening = True
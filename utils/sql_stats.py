@@ -0,0 +1,182 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('qlts.sql')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_LIST_RE = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+|%s))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+# Rolling per-endpoint window: endpoint -> deque of (queries, db_ms, duration_ms)
+_lock = threading.Lock()
+_windows: Dict[str, Deque[Tuple[int, float, float]]] = {}
+_window_size = 100
+
+# Extra callbacks fn(conn, statement, parameters, elapsed_ms) run after every
+# timed statement (used by utils/slow_queries.py)
+_statement_listeners = []
+
+
+def fingerprint(statement: str) -> str:
+	"""Normalize a SQL statement so that repeated shapes compare equal."""
+	sql = _STRING_RE.sub('?', statement)
+	sql = _NUMBER_RE.sub('?', sql)
+	sql = _PARAM_LIST_RE.sub('(?)', sql)
+	return _SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestQueryStats:
+	"""Query counters collected for one request."""
+
+	def __init__(self):
+		self.started = time.perf_counter()
+		self.count = 0
+		self.total_ms = 0.0
+		# fingerprint -> [count, total_ms]
+		self.statements: Dict[str, list] = {}
+
+	def record(self, statement: str, elapsed_ms: float) -> None:
+		self.count += 1
+		self.total_ms += elapsed_ms
+		entry = self.statements.setdefault(fingerprint(statement), [0, 0.0])
+		entry[0] += 1
+		entry[1] += elapsed_ms
+
+	def repeated(self, threshold: int):
+		"""Fingerprints executed at least `threshold` times (likely N+1)."""
+		return sorted(
+			((fp, c, ms) for fp, (c, ms) in self.statements.items() if c >= threshold),
+			key=lambda item: item[1], reverse=True
+		)
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+	if not has_request_context():
+		return None
+	return g.get('_sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	conn.info.setdefault('_qlts_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	starts = conn.info.get('_qlts_query_start')
+	if not starts:
+		return
+	elapsed_ms = (time.perf_counter() - starts.pop()) * 1000.0
+	stats = current_stats()
+	if stats is not None:
+		stats.record(statement, elapsed_ms)
+	for listener in _statement_listeners:
+		listener(conn, statement, parameters, elapsed_ms)
+
+
+def add_statement_listener(fn) -> None:
+	if fn not in _statement_listeners:
+		_statement_listeners.append(fn)
+
+
+def _start_request():
+	g._sql_stats = RequestQueryStats()
+
+
+def _finish_request(response):
+	stats = g.get('_sql_stats')
+	if stats is None:
+		return response
+	duration_ms = (time.perf_counter() - stats.started) * 1000.0
+	# Streamed bodies run their queries after the headers are sent: the header
+	# then covers the work done up to the first byte and the log line (written
+	# when the stream closes) has the full count.
+	response.headers.add(
+		'Server-Timing',
+		f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", app;dur={duration_ms:.2f}'
+	)
+	from flask import current_app
+	threshold = current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+	info = (request.endpoint or 'unknown', request.method, request.path, response.status_code, threshold)
+	if response.is_streamed:
+		response.call_on_close(lambda: _record(stats, *info))
+	else:
+		g.pop('_sql_stats', None)
+		_record(stats, *info)
+	return response
+
+
+def _record(stats: RequestQueryStats, endpoint: str, method: str, path: str, status: int, threshold: int) -> None:
+	duration_ms = (time.perf_counter() - stats.started) * 1000.0
+	repeated = stats.repeated(threshold)
+	with _lock:
+		window = _windows.get(endpoint)
+		if window is None:
+			window = _windows[endpoint] = deque(maxlen=_window_size)
+		window.append((stats.count, stats.total_ms, duration_ms))
+
+	record = {
+		'event': 'request_sql',
+		'endpoint': endpoint,
+		'method': method,
+		'path': path,
+		'status': status,
+		'queries': stats.count,
+		'db_ms': round(stats.total_ms, 2),
+		'duration_ms': round(duration_ms, 2),
+	}
+	if repeated:
+		record['n_plus_one'] = [{'sql': fp[:200], 'count': c, 'ms': round(ms, 2)} for fp, c, ms in repeated[:5]]
+		logger.warning(json.dumps(record, ensure_ascii=False))
+	else:
+		logger.info(json.dumps(record, ensure_ascii=False))
+
+
+def endpoint_summary() -> Dict[str, dict]:
+	"""Rolling aggregates per endpoint (this worker process only)."""
+	with _lock:
+		snapshot = {k: list(v) for k, v in _windows.items()}
+	summary = {}
+	for endpoint, samples in sorted(snapshot.items()):
+		queries = [s[0] for s in samples]
+		db_ms = [s[1] for s in samples]
+		durations = sorted(s[2] for s in samples)
+		summary[endpoint] = {
+			'requests': len(samples),
+			'avg_queries': round(sum(queries) / len(samples), 1),
+			'max_queries': max(queries),
+			'avg_db_ms': round(sum(db_ms) / len(samples), 2),
+			'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2),
+		}
+	return summary
+
+
+def reset() -> None:
+	with _lock:
+		_windows.clear()
+
+
+def init_app(app: Flask) -> None:
+	"""Attach query counting to every engine and per-request hooks to app."""
+	global _window_size
+	if not app.config.get('SQL_STATS_ENABLED', True):
+		return
+	_window_size = app.config.get('SQL_STATS_WINDOW', 100)
+	if not logger.handlers:
+		handler = logging.StreamHandler()
+		handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+		logger.addHandler(handler)
+		logger.setLevel(logging.INFO)
+	if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+		event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+		event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+	app.before_request(_start_request)
+	app.after_request(_finish_request)
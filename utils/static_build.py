@@ -0,0 +1,219 @@
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, Optional
+
+from flask import Flask, url_for
+
+try:
+	import brotli
+except ImportError:  # .br siblings are skipped; nginx still has the .gz ones
+	brotli = None
+try:
+	import rcssmin
+except ImportError:
+	rcssmin = None
+try:
+	import rjsmin
+except ImportError:
+	rjsmin = None
+
+# Third-party files the templates used to load from CDNs. Each is downloaded
+# once at build time into static/vendor/<lib>/<version>/ (version in the path,
+# so the files can be cached forever); url() references inside CSS (fonts,
+# icons) are fetched alongside. Until a build has run, vendor_url() falls back
+# to the CDN so a fresh checkout still renders.
+VENDOR = {
+	'jquery.js': ('https://code.jquery.com/jquery-3.6.0.min.js', 'jquery/3.6.0/jquery.min.js'),
+	'bootstrap.js': ('https://cdn.jsdelivr.net/npm/bootstrap@4.6.0/dist/js/bootstrap.bundle.min.js',
+	                 'bootstrap/4.6.0/bootstrap.bundle.min.js'),
+	'adminlte.css': ('https://cdn.jsdelivr.net/npm/admin-lte@3.2/dist/css/adminlte.min.css', 'admin-lte/3.2/css/adminlte.min.css'),
+	'adminlte.js': ('https://cdn.jsdelivr.net/npm/admin-lte@3.2/dist/js/adminlte.min.js', 'admin-lte/3.2/js/adminlte.min.js'),
+	'fontawesome.css': ('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+	                    'font-awesome/6.0.0/css/all.min.css'),
+	'flag-icons.css': ('https://cdn.jsdelivr.net/npm/flag-icons@6.6.6/css/flag-icons.min.css',
+	                   'flag-icons/6.6.6/css/flag-icons.min.css'),
+	'source-sans-pro.css': ('https://fonts.googleapis.com/css?family=Source+Sans+Pro:300,400,400i,700&display=fallback',
+	                        'source-sans-pro/1/source-sans-pro.css'),
+	'fullcalendar.css': ('https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/main.min.css', 'fullcalendar/5.11.3/main.min.css'),
+	'fullcalendar.js': ('https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/main.min.js', 'fullcalendar/5.11.3/main.min.js'),
+	'fullcalendar-vi.js': ('https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/locales/vi.js', 'fullcalendar/5.11.3/locales/vi.js'),
+}
+# Our own files: minified, content-hashed into static/dist/ and resolved by
+# url_for('static', filename=...) through the manifest
+BUNDLES = ('css/custom.css', 'js/custom.js')
+MANIFEST = 'dist/manifest.json'
+VENDOR_PREFIX = 'vendor:'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.ttf', '.eot', '.map')
+# Google Fonts picks the font format from the User-Agent; ask for woff2
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+_CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+|[{};,>]|[^"\'/\s{};,>]+|/', re.S)
+_CSS_TIGHT = set('{};,>')
+
+
+def minify_css(text: str) -> str:
+	"""rcssmin when installed; otherwise drop comments and collapse whitespace
+	outside strings (strings, e.g. inline SVG data URIs, are copied verbatim)."""
+	if rcssmin is not None:
+		return rcssmin.cssmin(text)
+	out = []
+	for token in _CSS_TOKEN_RE.findall(text):
+		if token.startswith('/*'):
+			continue
+		if token.isspace():
+			if out and out[-1] not in _CSS_TIGHT and out[-1] != ' ':
+				out.append(' ')
+			continue
+		if token in _CSS_TIGHT and out and out[-1] == ' ':
+			out.pop()
+		if token == '}' and out and out[-1] == ';':
+			out.pop()
+		out.append(token)
+	return ''.join(out).strip()
+
+
+def minify_js(text: str) -> str:
+	"""rjsmin when installed; without a real tokenizer only blank lines and
+	indentation are removed (gzip/brotli recover most of the rest)."""
+	if rjsmin is not None:
+		return rjsmin.jsmin(text)
+	return '\n'.join(line.strip() for line in text.splitlines() if line.strip()) + '\n'
+
+
+def compress(path: str) -> None:
+	"""Write .gz (and .br when brotli is installed) next to path for nginx *_static."""
+	with open(path, 'rb') as f:
+		data = f.read()
+	with open(path + '.gz', 'wb') as f:
+		# mtime=0 keeps rebuilds byte-identical
+		f.write(gzip.compress(data, compresslevel=9, mtime=0))
+	if brotli is not None:
+		with open(path + '.br', 'wb') as f:
+			f.write(brotli.compress(data, quality=11))
+
+
+def _fetch(url: str) -> bytes:
+	request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+	with urllib.request.urlopen(request, timeout=30) as response:
+		return response.read()
+
+
+def _vendor_css(css: str, source_url: str, target: str, vendor_dir: str, fetch, seen: set) -> str:
+	"""Download every url() of a stylesheet; relative ones keep their layout,
+	absolute ones (other hosts) go to files/ and are rewritten."""
+	base_dir = posixpath.dirname(target)
+
+	def replace(match):
+		ref = match.group(2).strip()
+		if ref.startswith(('data:', '#')):
+			return match.group(0)
+		clean = ref.split('#', 1)[0].split('?', 1)[0]
+		absolute = urllib.parse.urljoin(source_url, ref)
+		if '://' in ref or ref.startswith('//'):
+			local = posixpath.join(base_dir, 'files', posixpath.basename(urllib.parse.urlsplit(absolute).path))
+			rewritten = posixpath.relpath(local, base_dir)
+		else:
+			local = posixpath.normpath(posixpath.join(base_dir, clean))
+			rewritten = ref
+		if local not in seen:
+			seen.add(local)
+			_write(os.path.join(vendor_dir, local), fetch(absolute.split('#', 1)[0]))
+		return f'url({rewritten})'
+
+	return _CSS_URL_RE.sub(replace, css)
+
+
+def _write(path: str, data: bytes) -> None:
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	with open(path, 'wb') as f:
+		f.write(data)
+	if path.endswith(COMPRESSIBLE):
+		compress(path)
+
+
+def build(static_dir: str, vendor: bool = True, fetch: Callable[[str], bytes] = _fetch,
+          log: Callable[[str], None] = print) -> Dict[str, str]:
+	"""Build static/dist (and static/vendor) and write the manifest; returns it."""
+	dist_dir = os.path.join(static_dir, 'dist')
+	previous = load_manifest(static_dir)
+	shutil.rmtree(dist_dir, ignore_errors=True)
+	manifest: Dict[str, str] = {}
+	for name in BUNDLES:
+		with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+			source = f.read()
+		minified = minify_css(source) if name.endswith('.css') else minify_js(source)
+		data = minified.encode('utf-8')
+		stem, ext = posixpath.splitext(posixpath.basename(name))
+		hashed = f'dist/{posixpath.dirname(name)}/{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+		_write(os.path.join(static_dir, hashed), data)
+		manifest[name] = hashed
+		log(f'{name} -> {hashed} ({len(source.encode("utf-8"))} -> {len(data)} bytes)')
+
+	if vendor:
+		vendor_dir = os.path.join(static_dir, 'vendor')
+		seen: set = set()
+		for key, (url, target) in VENDOR.items():
+			data = fetch(url)
+			if target.endswith('.css'):
+				data = _vendor_css(data.decode('utf-8'), url, target, vendor_dir, fetch, seen).encode('utf-8')
+			_write(os.path.join(vendor_dir, target), data)
+			manifest[VENDOR_PREFIX + key] = f'vendor/{target}'
+			log(f'{key} <- {url}')
+		if seen:
+			log(f'{len(seen)} files referenced from vendored CSS')
+	else:
+		# Keep libraries vendored by an earlier build (e.g. an offline rebuild)
+		manifest.update({k: v for k, v in previous.items()
+		                 if k.startswith(VENDOR_PREFIX) and os.path.exists(os.path.join(static_dir, v))})
+
+	os.makedirs(dist_dir, exist_ok=True)
+	with open(os.path.join(static_dir, MANIFEST), 'w', encoding='utf-8') as f:
+		json.dump(manifest, f, indent=2, sort_keys=True)
+	return manifest
+
+
+def load_manifest(static_dir: str) -> Dict[str, str]:
+	try:
+		with open(os.path.join(static_dir, MANIFEST), encoding='utf-8') as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {}
+
+
+def init_app(app: Flask) -> None:
+	"""Resolve url_for('static') through the manifest and add vendor_url()."""
+	manifest = load_manifest(app.static_folder)
+	# While developing, serve the sources being edited rather than a stale build
+	hashed = {} if app.debug else {k: v for k, v in manifest.items() if not k.startswith(VENDOR_PREFIX)}
+	immutable_max_age = app.config.get('STATIC_IMMUTABLE_MAX_AGE', 31536000)
+
+	@app.url_defaults
+	def _hashed_static(endpoint: str, values: dict) -> None:
+		if endpoint == 'static':
+			filename = values.get('filename')
+			if filename in hashed:
+				values['filename'] = hashed[filename]
+
+	def vendor_url(key: str) -> str:
+		path = manifest.get(VENDOR_PREFIX + key)
+		return url_for('static', filename=path) if path else VENDOR[key][0]
+
+	app.jinja_env.globals['vendor_url'] = vendor_url
+
+	# When Flask serves static itself (no nginx), hashed/versioned files are immutable too
+	default_max_age = app.get_send_file_max_age
+
+	def get_send_file_max_age(filename: Optional[str]) -> Optional[int]:
+		if filename and filename.startswith(('dist/', 'vendor/')):
+			return immutable_max_age
+		return default_max_age(filename)
+
+	app.get_send_file_max_age = get_send_file_max_age
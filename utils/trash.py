@@ -0,0 +1,198 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import case, exists, func, select
+
+from models import Asset, AssetType, AuditLog, MaintenanceRecord, User, asset_user, db
+from utils import counters
+from utils.queries import TRASH_MODULES
+
+logger = logging.getLogger('qlts.trash')
+
+# Ids per statement: below SQLite's 999 bound parameters, short enough to keep
+# each statement's locks brief. All batches share the caller's transaction.
+BATCH_SIZE = 500
+# Retention purge order: records before assets, assets before the types they use
+PURGE_ORDER = ('maintenance', 'assets', 'users', 'asset_types')
+
+
+def _batches(model, ids: Optional[Iterable[int]]) -> Iterator[List[int]]:
+	"""Trashed ids of model in batches: the given ids, or every trashed row (ids=None)."""
+	t = model.__table__
+	if ids is not None:
+		ids = sorted(set(ids))
+		for i in range(0, len(ids), BATCH_SIZE):
+			yield ids[i:i + BATCH_SIZE]
+		return
+	# "Select all matching": walk the trash index by id instead of loading every id at once
+	conn = db.session.connection()
+	last = 0
+	while True:
+		batch = conn.execute(
+			select(t.c.id).where(t.c.deleted_at.isnot(None), t.c.id > last).order_by(t.c.id).limit(BATCH_SIZE)
+		).scalars().all()
+		if not batch:
+			return
+		yield batch
+		last = batch[-1]
+
+
+def restore(module: str, ids: Optional[Iterable[int]] = None) -> int:
+	"""UPDATE ... SET deleted_at = NULL for trashed rows of module; returns rows restored.
+
+	Mirrors the models' restore(): assets marked disposed by soft_delete()
+	become active again, users are re-enabled.
+	"""
+	model = TRASH_MODULES[module]
+	t = model.__table__
+	values = {'deleted_at': None}
+	if model is Asset:
+		values['status'] = case((t.c.status == 'disposed', 'active'), else_=t.c.status)
+	elif model is User:
+		values['is_active'] = True
+	conn = db.session.connection()
+	restored = 0
+	deltas: Counter = Counter()
+	for batch in _batches(model, ids):
+		# Only rows still in the trash: ids of live rows in the selection must
+		# not be counted again
+		trashed = conn.execute(
+			select(t.c.id).where(t.c.id.in_(batch), t.c.deleted_at.isnot(None))
+		).scalars().all()
+		if not trashed:
+			continue
+		restored += conn.execute(t.update().where(t.c.id.in_(trashed)).values(**values)).rowcount
+		# Rows are live now: what they add to the dashboard counters is the delta
+		deltas.update(counters.subset(conn, model, trashed))
+	if restored:
+		counters.apply(conn, deltas, (t.name,), db.session())
+	return restored
+
+
+def purge(module: str, ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+	"""DELETE trashed rows of module for good, children first; returns rows deleted per table.
+
+	- assets: their asset_user links and maintenance records go first
+	- users: assets and audit entries keep no reference (user_id set to NULL)
+	- asset types still used by any asset (even a trashed one) are kept;
+	  their number is returned as 'skipped'
+	"""
+	model = TRASH_MODULES[module]
+	t = model.__table__
+	m = MaintenanceRecord.__table__
+	a = Asset.__table__
+	conn = db.session.connection()
+	deleted: Counter = Counter()
+	deltas: Counter = Counter()
+	touched = {t.name}
+	for batch in _batches(model, ids):
+		trashed = select(t.c.id).where(t.c.id.in_(batch), t.c.deleted_at.isnot(None))
+		if model is Asset:
+			# Records of a trashed asset may still be live: they leave the counters
+			deltas['maintenance'] -= counters.subset(conn, MaintenanceRecord, select(m.c.id).where(
+				m.c.asset_id.in_(trashed)))['maintenance']
+			conn.execute(asset_user.delete().where(asset_user.c.asset_id.in_(trashed)))
+			deleted[m.name] += conn.execute(m.delete().where(m.c.asset_id.in_(trashed))).rowcount
+			touched.update((m.name, asset_user.name))
+		elif model is User:
+			conn.execute(a.update().where(a.c.user_id.in_(trashed)).values(user_id=None))
+			conn.execute(asset_user.delete().where(asset_user.c.user_id.in_(trashed)))
+			al = AuditLog.__table__
+			conn.execute(al.update().where(al.c.user_id.in_(trashed)).values(user_id=None))
+			touched.update((a.name, asset_user.name, al.name))
+		if model is AssetType:
+			in_use = exists().where(a.c.asset_type_id == t.c.id)
+			deleted['skipped'] += conn.execute(
+				select(func.count()).select_from(t).where(t.c.id.in_(batch), t.c.deleted_at.isnot(None), in_use)
+			).scalar()
+			deleted[t.name] += conn.execute(
+				t.delete().where(t.c.id.in_(batch), t.c.deleted_at.isnot(None), ~in_use)
+			).rowcount
+		else:
+			deleted[t.name] += conn.execute(t.delete().where(t.c.id.in_(batch), t.c.deleted_at.isnot(None))).rowcount
+	if deleted[t.name] or deleted[m.name]:
+		counters.apply(conn, deltas, touched, db.session())
+	return dict(deleted)
+
+
+def audit(user_id: Optional[int], action: str, module: str, result) -> None:
+	"""One summarized audit entry for a bulk trash action (not one per row)."""
+	if isinstance(result, dict):
+		details = ', '.join(f'{key}={n}' for key, n in sorted(result.items()) if n)
+	else:
+		details = f'{module}={result}'
+	db.session.add(AuditLog(user_id=user_id, module='trash', action=action, details=f'module={module}; {details}'))
+
+
+def _expired_ids(module: str, cutoff: datetime, after: int, limit: int) -> List[int]:
+	t = TRASH_MODULES[module].__table__
+	return db.session.execute(
+		select(t.c.id).where(t.c.deleted_at.isnot(None), t.c.deleted_at < cutoff, t.c.id > after)
+		.order_by(t.c.id).limit(limit)
+	).scalars().all()
+
+
+def purge_expired(retention: Dict[str, int], batch_size: int = 200, pause: float = 0.5,
+				  now: Optional[datetime] = None, dry_run: bool = False,
+				  log: Callable[[str], None] = logger.info) -> Dict[str, int]:
+	"""Hard-delete rows trashed longer than retention[module] days; returns rows deleted per table.
+
+	Each batch of batch_size ids is purged and committed in its own short
+	transaction, with `pause` seconds between batches, so the job never holds
+	write locks for long and live traffic interleaves with it. Dependent rows
+	go with their parents as in purge(). Modules without a retention (or 0)
+	are kept forever.
+	"""
+	now = now or datetime.utcnow()
+	totals: Counter = Counter()
+	for module in PURGE_ORDER:
+		days = retention.get(module)
+		if not days:
+			continue
+		cutoff = now - timedelta(days=days)
+		last = 0
+		while True:
+			ids = _expired_ids(module, cutoff, last, batch_size)
+			if not ids:
+				break
+			last = ids[-1]
+			if dry_run:
+				totals[TRASH_MODULES[module].__tablename__] += len(ids)
+				continue
+			try:
+				totals.update(purge(module, ids))
+				db.session.commit()
+			except Exception:
+				db.session.rollback()
+				raise
+			time.sleep(pause)
+		log(f'{module}: trashed before {cutoff:%Y-%m-%d} done')
+	db.session.rollback()
+	return {key: n for key, n in totals.items() if n}
+
+
+def init_app(app: Flask) -> None:
+	"""Add `flask purge-trash` (run from cron, like reconcile-stats)."""
+
+	@app.cli.command('purge-trash')
+	@click.option('--dry-run', is_flag=True, help='Only count what would be deleted.')
+	def purge_trash_command(dry_run):
+		"""Hard-delete trash older than TRASH_RETENTION_DAYS, in small batches."""
+		config = current_app.config
+		# Parsed by Config: {'assets': 90, ...}
+		retention = config.get('TRASH_RETENTION_DAYS') or {}
+		if not retention:
+			click.echo('TRASH_RETENTION_DAYS is empty: nothing is purged.')
+			return
+		result = purge_expired(retention, batch_size=config.get('TRASH_PURGE_BATCH_SIZE', 200),
+							   pause=config.get('TRASH_PURGE_PAUSE', 0.5), dry_run=dry_run, log=click.echo)
+		if not dry_run and any(result.values()):
+			audit(None, 'retention', ','.join(m for m in PURGE_ORDER if retention.get(m)), result)
+			db.session.commit()
+		summary = ', '.join(f'{key}={n}' for key, n in sorted(result.items()) if n) or 'nothing'
+		click.echo(f"{'Would purge' if dry_run else 'Purged'}: {summary}")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Entry point WSGI cho môi trường production (gunicorn -c gunicorn.conf.py wsgi:app)
+"""
+
+import gc
+
+from app import app, db
+from run import bootstrap_database
+from utils.jinja_cache import warm_up
+
+# Chạy bootstrap một lần trong master (preload_app) thay vì ở từng worker
+bootstrap_database()
+
+# Do not hand pooled DB connections opened by the master to forked workers
+with app.app_context():
+    db.engine.dispose()
+
+# Compile templates once here so every worker (including ones recycled by
+# max_requests) starts with them already loaded
+if app.config.get('TEMPLATE_WARMUP', True):
+    count, elapsed_ms = warm_up(app)
+    print(f'[Templates] {count} templates compiled in {elapsed_ms:.0f} ms')
+
+# Move everything imported so far into the permanent generation so the
+# garbage collector does not touch (and copy-on-write) those pages in workers
+gc.collect()
+gc.freeze()